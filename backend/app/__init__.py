@@ -1,18 +1,24 @@
 from flask import Flask
 from app.config import config
-from app.extensions import db, migrate, jwt
+from app.extensions import db, migrate, jwt, metrics, sql_profiler, compressor
+from app.utils.json_provider import create_json_provider
 from flask_cors import CORS
 
 def create_app(config_name='default'):
     app = Flask(__name__)
     app.config.from_object(config[config_name])
+    app.json = create_json_provider(app)
     
     CORS(app)
     
-    # Initialize extensions
+    # Initialize extensions (metrics first: it picks the engine's pool class)
+    metrics.init_app(app)
     db.init_app(app)
     migrate.init_app(app, db)
     jwt.init_app(app)
+    sql_profiler.init_app(app)
+    # Registered last so it runs first, before the profiler and metrics hooks see the response
+    compressor.init_app(app)
     
     # Register blueprints
     from app.routes.parking_lots import parking_lots_bp
@@ -29,4 +35,20 @@ def create_app(config_name='default'):
     app.register_blueprint(occupancy_bp, url_prefix='/api/occupancy')
     app.register_blueprint(billing_bp, url_prefix='/api/billing')
     
+    if app.config['SQL_PROFILING']:
+        from app.routes.debug import debug_bp
+        app.register_blueprint(debug_bp, url_prefix='/api/debug')
+    
+    # Availability stream (its snapshot thread starts with the first subscriber of each process)
+    from app.services.availability_broadcaster import availability_broadcaster
+    availability_broadcaster.init_app(app)
+    
+    # Gate event queue (the server starts its drain threads in each worker, see GateQueue.start_workers)
+    from app.services.gate_queue import gate_queue
+    gate_queue.init_app(app)
+    
+    # Register CLI commands
+    from app.cli import seed_command
+    app.cli.add_command(seed_command)
+    
     return app
\ No newline at end of file
@@ -0,0 +1,312 @@
+from a2wsgi import WSGIMiddleware
+from app import create_app
+from app.models.parking_lot import ParkingLot
+from app.models.parking_space import ParkingSpace, SpaceType
+from app.services.availability_broadcaster import availability_broadcaster, format_sse
+from app.services.gate_queue import gate_queue
+from app.services.parking_service import ParkingService
+from app.utils.compression import ResponseCompressor, compress_body
+from app.utils.fields import field_columns, parse_fields, row_serializer
+from app.utils.http_cache import collection_aggregate, is_fresh, latest_update, summed_lot_version, validator_headers, validators_from_row, validators_query
+from app.utils.metrics import observe_request
+from app.utils.sql_profiler import RequestProfile, SQLProfiler, async_profile
+from sqlalchemy import select
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from starlette.applications import Starlette
+from starlette.responses import Response, StreamingResponse
+from starlette.routing import Mount, Route
+from werkzeug.exceptions import NotFound
+from werkzeug.http import parse_accept_header
+import asyncio
+import contextlib
+import time
+
+# Sync driver of SQLALCHEMY_DATABASE_URI -> async driver for the same database
+ASYNC_DRIVERS = {
+    'postgresql': 'postgresql+asyncpg',
+    'postgresql+psycopg2': 'postgresql+asyncpg',
+    'sqlite': 'sqlite+aiosqlite',
+    'sqlite+pysqlite': 'sqlite+aiosqlite',
+}
+
+def create_async_read_engine(config):
+    """Async engine for the database of a Flask config"""
+    url = make_url(config['SQLALCHEMY_DATABASE_URI'])
+    if url.drivername not in ASYNC_DRIVERS:
+        raise ValueError(f'No async driver configured for {url.drivername}')
+    url = url.set(drivername=ASYNC_DRIVERS[url.drivername])
+    
+    options = {}
+    if url.get_backend_name() == 'postgresql':
+        # asyncpg takes ssl as a connect argument and rejects libpq-only parameters like sslmode
+        sslmode = url.query.get('sslmode')
+        url = url.difference_update_query(['sslmode', 'channel_binding'])
+        if sslmode:
+            options['connect_args'] = {'ssl': sslmode}
+        options.update(
+            pool_size=config['ASYNC_DB_POOL_SIZE'],
+            max_overflow=config['ASYNC_DB_MAX_OVERFLOW'],
+            pool_timeout=config['ASYNC_DB_POOL_TIMEOUT'],
+            pool_recycle=300,
+            pool_pre_ping=True
+        )
+    return create_async_engine(url, **options)
+
+def _json(request, content, status_code=200, headers=None):
+    """JSON response encoded by the Flask app's JSON provider, as jsonify() would"""
+    body = request.app.state.flask_app.json.dumps(content) + '\n'
+    return Response(body, status_code=status_code, headers=headers, media_type='application/json')
+
+def _error(request, e, status):
+    return _json(request, {
+        'success': False,
+        'error': str(e)
+    }, status_code=status)
+
+def _compress(config, request, response):
+    """Brotli or gzip compression of a buffered response, on the rules of ResponseCompressor"""
+    if (request.method == 'HEAD' or not 200 <= response.status_code < 300 or response.status_code == 204
+            or response.media_type not in config['COMPRESS_MIMETYPES']
+            or 'content-encoding' in response.headers):
+        return
+    
+    response.headers.append('Vary', 'Accept-Encoding')
+    if len(response.body) < config['COMPRESS_MIN_SIZE']:
+        return
+    encoding = ResponseCompressor.choose_encoding(parse_accept_header(request.headers.get('accept-encoding')))
+    if encoding is None:
+        return
+    
+    compressed = compress_body(response.body, encoding, config['COMPRESS_GZIP_LEVEL'], config['COMPRESS_BROTLI_QUALITY'])
+    if len(compressed) >= len(response.body):
+        return
+    response.body = compressed
+    response.headers['Content-Length'] = str(len(compressed))
+    response.headers['Content-Encoding'] = encoding
+
+def _with_request_hooks(endpoint, handler):
+    """handler plus what the Flask app adds to its own responses
+    
+    Compression (buffered responses only), the SQL profile and the request
+    metrics, labelled with the endpoint name of the matching Flask route so
+    both modes report the same series.
+    """
+    blueprint = endpoint.partition('.')[0]
+    
+    async def hooked(request):
+        flask_app = request.app.state.flask_app
+        config = flask_app.config
+        started = time.perf_counter()
+        profile = RequestProfile() if config['SQL_PROFILING'] else None
+        token = async_profile.set(profile)
+        try:
+            response = await handler(request)
+        finally:
+            async_profile.reset(token)
+        
+        if config['COMPRESS_ENABLED'] and not isinstance(response, StreamingResponse):
+            _compress(config, request, response)
+        if profile is not None:
+            path = request.url.path + (f'?{request.url.query}' if request.url.query else '')
+            response.headers.append('Server-Timing', SQLProfiler.report(
+                flask_app, profile, request.method, path, endpoint, response.status_code
+            ))
+        if config['METRICS_ENABLED']:
+            observe_request(blueprint, endpoint, request.method, response.status_code, time.perf_counter() - started)
+        return response
+    
+    return hooked
+
+async def get_parking_lots(request):
+    """Get all parking lots with availability info, or only the columns and counts in ?fields="""
+    try:
+        fields = parse_fields(request.query_params.get('fields'), ParkingLot, ParkingLot.EMPTY_AVAILABILITY)
+        async with request.app.state.sessions() as session:
+            etag, last_modified = validators_from_row((await session.execute(validators_query(
+                collection_aggregate(ParkingLot), summed_lot_version(), latest_update(ParkingSpace)
+            ))).one())
+            headers = validator_headers(etag, last_modified)
+            if is_fresh(request.headers, etag, last_modified):
+                return Response(status_code=304, headers=headers)
+            
+            if fields:
+                rows = (await session.execute(
+                    select(*field_columns(ParkingLot, fields, required=[ParkingLot.id]))
+                )).all()
+            else:
+                lots = (await session.execute(select(ParkingLot))).scalars().all()
+            availability = None
+            if not fields or any(name in ParkingLot.EMPTY_AVAILABILITY for name in fields):
+                availability = ParkingLot.availability_from_rows(
+                    await session.execute(ParkingLot.availability_query())
+                )
+        
+        if fields:
+            columns = [name for name in fields if name not in ParkingLot.EMPTY_AVAILABILITY]
+            data = ParkingLot.sparse_dicts(rows, row_serializer(columns), fields, availability)
+        else:
+            data = [lot.to_dict_with_availability(availability) for lot in lots]
+        
+        return _json(request, {
+            'success': True,
+            'data': data,
+            'count': len(data)
+        }, headers=headers)
+    except ValueError as e:
+        return _error(request, e, 400)
+    except Exception as e:
+        return _error(request, e, 500)
+
+async def get_parking_lot(request):
+    """Get a specific parking lot by ID"""
+    try:
+        lot_id = request.path_params['lot_id']
+        async with request.app.state.sessions() as session:
+            lot = await session.get(ParkingLot, lot_id)
+            if lot is None:
+                raise NotFound()
+            availability = ParkingLot.availability_from_rows(
+                await session.execute(ParkingLot.availability_query([lot_id]))
+            )
+        
+        return _json(request, {
+            'success': True,
+            'data': lot.to_dict_with_availability(availability)
+        })
+    except Exception as e:
+        return _error(request, e, 404)
+
+async def get_lot_spaces(request):
+    """Get all parking spaces for a specific lot"""
+    try:
+        lot_id = request.path_params['lot_id']
+        async with request.app.state.sessions() as session:
+            etag, last_modified = validators_from_row((await session.execute(validators_query(
+                collection_aggregate(ParkingLot, ParkingLot.id == lot_id),
+                summed_lot_version(ParkingLot.id == lot_id),
+                latest_update(ParkingSpace, ParkingSpace.lot_id == lot_id)
+            ))).one())
+            headers = validator_headers(etag, last_modified)
+            if is_fresh(request.headers, etag, last_modified):
+                return Response(status_code=304, headers=headers)
+            
+            if await session.get(ParkingLot, lot_id) is None:
+                raise NotFound()
+            spaces = (await session.execute(
+                select(ParkingSpace).where(ParkingSpace.lot_id == lot_id)
+            )).scalars().all()
+        
+        return _json(request, {
+            'success': True,
+            'data': [space.to_dict() for space in spaces],
+            'count': len(spaces)
+        }, headers=headers)
+    except Exception as e:
+        return _error(request, e, 500)
+
+async def get_available_spaces(request):
+    """Get available parking spaces with filters"""
+    try:
+        try:
+            lot_id = int(request.query_params['lot_id'])
+        except (KeyError, ValueError):
+            lot_id = None
+        space_type = request.query_params.get('space_type')
+        
+        if space_type:
+            space_type = SpaceType(space_type)
+        
+        async with request.app.state.sessions() as session:
+            available_spaces = (await session.execute(
+                ParkingService.available_spaces_query(lot_id=lot_id, space_type=space_type)
+            )).scalars().all()
+        
+        return _json(request, {
+            'success': True,
+            'data': [space.to_dict() for space in available_spaces],
+            'count': len(available_spaces)
+        })
+    except Exception as e:
+        return _error(request, e, 500)
+
+async def stream_availability(request):
+    """Stream per-lot availability changes as Server-Sent Events
+    
+    The same stream as the Flask route, served on the event loop: an open
+    stream holds no thread, only its subscription queue, so one process
+    serves up to SSE_MAX_SUBSCRIBERS viewers.
+    """
+    config = request.app.state.flask_app.config
+    try:
+        lot_ids = None
+        if request.query_params.get('lot_id'):
+            lot_ids = [int(lot_id) for lot_id in request.query_params['lot_id'].split(',')]
+    except ValueError:
+        return _error(request, 'lot_id must be a comma separated list of integers', 400)
+    
+    try:
+        if availability_broadcaster.subscriber_count >= config['SSE_MAX_SUBSCRIBERS']:
+            return _error(request, 'Too many availability subscribers, poll /api/parking-lots/ instead', 503)
+        
+        # Read before subscribing, as the Flask route does
+        async with request.app.state.sessions() as session:
+            snapshot = ParkingLot.availability_from_rows(
+                await session.execute(ParkingLot.availability_query(lot_ids, all_lots=True))
+            )
+        subscription = availability_broadcaster.subscribe(
+            lot_ids, max_queue=config['SSE_SUBSCRIBER_QUEUE_SIZE'], loop=asyncio.get_running_loop()
+        )
+    except Exception as e:
+        return _error(request, e, 500)
+    
+    heartbeat = config['SSE_HEARTBEAT_SECONDS']
+    
+    async def generate():
+        try:
+            yield format_sse('snapshot', snapshot)
+            while True:
+                yield await subscription.next_message_async(heartbeat)
+        finally:
+            availability_broadcaster.unsubscribe(subscription)
+    
+    return StreamingResponse(generate(), media_type='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
+def create_asgi_app(config_name='default'):
+    """ASGI application serving the read-heavy endpoints asynchronously
+    
+    The lot listing, lot detail, lot spaces and available spaces reads run
+    on an async engine, so a single process keeps many of them waiting on
+    the database at once without a thread each. They are encoded,
+    compressed, profiled and counted like the Flask routes. Every other
+    route, including all writes, is passed through to the unchanged Flask
+    app on a bounded thread pool.
+    """
+    flask_app = create_app(config_name)
+    engine = create_async_read_engine(flask_app.config)
+    if flask_app.config['SQL_PROFILING']:
+        SQLProfiler.listen(engine.sync_engine)
+    
+    @contextlib.asynccontextmanager
+    async def lifespan(app):
+        gate_queue.start_workers()
+        yield
+        await engine.dispose()
+    
+    app = Starlette(routes=[
+        Route('/api/parking-lots/', _with_request_hooks('parking_lots.get_parking_lots', get_parking_lots), methods=['GET']),
+        Route('/api/parking-lots/availability/stream',
+              _with_request_hooks('parking_lots.stream_availability', stream_availability), methods=['GET']),
+        Route('/api/parking-lots/{lot_id:int}', _with_request_hooks('parking_lots.get_parking_lot', get_parking_lot), methods=['GET']),
+        Route('/api/parking-lots/{lot_id:int}/spaces',
+              _with_request_hooks('parking_lots.get_lot_spaces', get_lot_spaces), methods=['GET']),
+        Route('/api/parking-spaces/available',
+              _with_request_hooks('parking_spaces.get_available_spaces', get_available_spaces), methods=['GET']),
+        Mount('/', app=WSGIMiddleware(flask_app, workers=flask_app.config['ASGI_WSGI_THREADS'])),
+    ], lifespan=lifespan)
+    app.state.sessions = async_sessionmaker(engine)
+    app.state.flask_app = flask_app
+    return app
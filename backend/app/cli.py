@@ -0,0 +1,354 @@
+from app.extensions import db
+from app.models.billing import Billing, PaymentStatus
+from app.models.occupancy import Occupancy, OccupancyStatus
+from app.models.parking_lot import ParkingLot
+from app.models.parking_space import ParkingSpace, SpaceType, SpaceState
+from app.models.user import User, UserRole
+from app.models.vehicle import Vehicle, VehicleType, normalize_plate
+from app.services.billing_service import BillingService
+from datetime import datetime, timedelta
+from decimal import Decimal
+from flask.cli import with_appcontext
+from sqlalchemy import create_engine, func
+import click
+import csv
+import enum
+import io
+import multiprocessing
+import random
+import time
+
+SEED_TABLES = [User, Vehicle, ParkingLot, ParkingSpace, Occupancy, Billing]
+
+LOT_RATES = [2, 3, 5, 8, 10]
+SPACE_EXTRA_CHARGES = [0, 0, 0.5, 1, 2]
+
+def _space_type(index):
+    """Every fourth space (and owned vehicle) is a two-wheeler"""
+    return SpaceType.TWO_WHEELER if index % 4 == 0 else SpaceType.FOUR_WHEELER
+
+def _owned_vehicle(rng, space_type, owned):
+    """Pick the offset of an owned vehicle whose type matches the space"""
+    two_wheelers = (owned + 3) // 4
+    if space_type == SpaceType.TWO_WHEELER or two_wheelers == owned:
+        return 4 * rng.randrange(two_wheelers)
+    # The n-th offset that is not a multiple of four
+    n = rng.randrange(owned - two_wheelers)
+    return n + n // 3 + 1
+
+def _plate(prefix, vehicle_id):
+    return f'{prefix}{vehicle_id:010d}'
+
+def _copy_value(value):
+    if value is None:
+        return None
+    if isinstance(value, enum.Enum):
+        # SQLAlchemy persists enum members by name
+        return value.name
+    if isinstance(value, datetime):
+        return value.isoformat(sep=' ')
+    return value
+
+def load_rows(connection, table, rows):
+    """Bulk-load dict rows: COPY on PostgreSQL (psycopg2), executemany elsewhere"""
+    if not rows:
+        return
+    
+    columns = list(rows[0])
+    cursor = None
+    if connection.dialect.name == 'postgresql':
+        cursor = connection.connection.dbapi_connection.cursor()
+    
+    if cursor is not None and hasattr(cursor, 'copy_expert'):
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for row in rows:
+            writer.writerow([_copy_value(row[column]) for column in columns])
+        buffer.seek(0)
+        cursor.copy_expert(
+            f'COPY {table.name} ({", ".join(columns)}) FROM STDIN WITH (FORMAT csv)',
+            buffer
+        )
+        cursor.close()
+    else:
+        connection.execute(table.insert(), rows)
+
+def _next_ids(connection):
+    """First free id of every seeded table"""
+    return {
+        model.__tablename__: (connection.execute(db.select(func.max(model.id))).scalar() or 0) + 1
+        for model in SEED_TABLES
+    }
+
+def _reset_sequences(connection):
+    """Move the PostgreSQL id sequences past the ids assigned by the seeder"""
+    if connection.dialect.name != 'postgresql':
+        return
+    for model in SEED_TABLES:
+        table = model.__tablename__
+        connection.execute(db.text(
+            f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), "
+            f"(SELECT COALESCE(MAX(id), 1) FROM {table}))"
+        ))
+
+def seed_lot(connection, task):
+    """Generate and load one lot's spaces, occupancy history and billing
+    
+    Ids come from the ranges reserved for this lot, so lots can be loaded in
+    parallel without coordinating with each other or the database.
+    """
+    rng = random.Random(task['seed'] * 1000003 + task['index'])
+    end = task['end']
+    window_start = end - timedelta(days=task['days'])
+    window = (end - timedelta(hours=1) - window_start).total_seconds()
+    counts = {'vehicles': 0, 'parking_spaces': 0, 'occupancies': 0, 'billing': 0}
+    
+    # Spaces, plus a walk-in vehicle and an active stay for each occupied one
+    spaces = []
+    space_rows = []
+    walk_in_rows = []
+    active_rows = []
+    for offset in range(task['spaces']):
+        space_id = task['space_base'] + offset
+        space_type = _space_type(offset)
+        extra_charge = rng.choice(SPACE_EXTRA_CHARGES)
+        occupied = rng.random() < task['occupied_ratio']
+        spaces.append((space_id, space_type, extra_charge))
+        space_rows.append({
+            'id': space_id,
+            'lot_id': task['lot_id'],
+            'space_type': space_type,
+            'state': SpaceState.OCCUPIED if occupied else SpaceState.UNOCCUPIED,
+            'extra_charge': extra_charge,
+            'created_at': window_start,
+            'updated_at': end
+        })
+        
+        if occupied:
+            vehicle_id = task['walk_in_base'] + offset
+            entry = end - timedelta(seconds=rng.uniform(60, 3600))
+            walk_in_rows.append({
+                'id': vehicle_id,
+                'vehicle_id': _plate(task['plate_prefix'], vehicle_id),
+                'plate_normalized': normalize_plate(_plate(task['plate_prefix'], vehicle_id)),
+                'owner_id': None,
+                'vehicle_type': VehicleType(space_type.value),
+                'created_at': entry,
+                'updated_at': entry
+            })
+            active_rows.append({
+                'id': task['occupancy_base'] + task['history'] + offset,
+                'space_id': space_id,
+                'vehicle_id': vehicle_id,
+                'user_id': None,
+                'entry_time': entry,
+                'exit_time': None,
+                'status': OccupancyStatus.ACTIVE,
+                'created_at': entry,
+                'updated_at': entry
+            })
+    
+    load_rows(connection, ParkingSpace.__table__, space_rows)
+    load_rows(connection, Vehicle.__table__, walk_in_rows)
+    load_rows(connection, Occupancy.__table__, active_rows)
+    counts['parking_spaces'] += len(space_rows)
+    counts['vehicles'] += len(walk_in_rows)
+    counts['occupancies'] += len(active_rows)
+    
+    # Completed stays with their bills, loaded in chunks to bound memory
+    occupancy_rows = []
+    billing_rows = []
+    occupancy_id = task['occupancy_base']
+    for offset, (space_id, space_type, extra_charge) in enumerate(spaces):
+        stays = task['history'] // len(spaces) + (1 if offset < task['history'] % len(spaces) else 0)
+        
+        # One stay per equal slice of the window, so stays on a space never overlap
+        slot = window / stays if stays else 0
+        for number in range(stays):
+            slot_start = window_start + timedelta(seconds=slot * number)
+            entry = slot_start + timedelta(seconds=rng.uniform(0, slot / 2))
+            remaining = (slot_start + timedelta(seconds=slot) - entry).total_seconds()
+            exit_time = entry + timedelta(seconds=min(rng.uniform(0.1, 1.0) * remaining, rng.uniform(1800, 43200)))
+            
+            vehicle_offset = _owned_vehicle(rng, space_type, task['owned_vehicles'])
+            owner_id = task['user_base'] + vehicle_offset // task['vehicles_per_user']
+            paid = rng.random() >= task['pending_ratio']
+            payment_time = exit_time + timedelta(seconds=rng.uniform(10, 600)) if paid else None
+            amount = BillingService.compute_charge(task['base_rate'], extra_charge, entry, exit_time)
+            
+            occupancy_rows.append({
+                'id': occupancy_id,
+                'space_id': space_id,
+                'vehicle_id': task['vehicle_base'] + vehicle_offset,
+                'user_id': owner_id,
+                'entry_time': entry,
+                'exit_time': exit_time,
+                'status': OccupancyStatus.COMPLETED,
+                'created_at': entry,
+                'updated_at': exit_time
+            })
+            billing_rows.append({
+                'id': task['billing_base'] + occupancy_id - task['occupancy_base'],
+                'occupancy_id': occupancy_id,
+                'user_id': owner_id,
+                'amount': Decimal(str(amount)).quantize(Decimal('0.01')),
+                'payment_time': payment_time,
+                'payment_status': PaymentStatus.PAID if paid else PaymentStatus.PENDING,
+                'created_at': exit_time,
+                'updated_at': payment_time or exit_time
+            })
+            occupancy_id += 1
+            
+            if len(occupancy_rows) >= task['chunk_size']:
+                load_rows(connection, Occupancy.__table__, occupancy_rows)
+                load_rows(connection, Billing.__table__, billing_rows)
+                counts['occupancies'] += len(occupancy_rows)
+                counts['billing'] += len(billing_rows)
+                occupancy_rows.clear()
+                billing_rows.clear()
+    
+    load_rows(connection, Occupancy.__table__, occupancy_rows)
+    load_rows(connection, Billing.__table__, billing_rows)
+    counts['occupancies'] += len(occupancy_rows)
+    counts['billing'] += len(billing_rows)
+    return counts
+
+_worker_engine = None
+
+def _init_worker(database_url):
+    global _worker_engine
+    _worker_engine = create_engine(database_url)
+
+def _seed_lot_in_worker(task):
+    with _worker_engine.begin() as connection:
+        return seed_lot(connection, task)
+
+@click.command('seed')
+@click.option('--lots', default=10, show_default=True, help='Parking lots to create')
+@click.option('--spaces', default=200, show_default=True, help='Spaces per lot')
+@click.option('--history', default=10000, show_default=True, help='Completed occupancies (with bills) per lot')
+@click.option('--users', default=5000, show_default=True, help='Customers owning the returning vehicles')
+@click.option('--vehicles-per-user', default=2, show_default=True)
+@click.option('--days', default=365, show_default=True, help='Length of the history window')
+@click.option('--occupied-ratio', default=0.3, show_default=True, help='Share of spaces currently occupied')
+@click.option('--pending-ratio', default=0.02, show_default=True, help='Share of bills left unpaid')
+@click.option('--seed', 'seed_value', default=1, show_default=True, help='Random seed; the same seed gives the same data')
+@click.option('--workers', default=None, type=int, help='Parallel loader processes (default: one per CPU, 1 on SQLite)')
+@click.option('--chunk-size', default=50000, show_default=True, help='Rows per COPY/executemany batch')
+@with_appcontext
+def seed_command(lots, spaces, history, users, vehicles_per_user, days, occupied_ratio,
+                 pending_ratio, seed_value, workers, chunk_size):
+    """Generate a large, consistent synthetic data set for load testing
+    
+    Creates customers and their vehicles, lots and spaces, completed
+    occupancies with matching bills priced by BillingService, and active
+    stays for the occupied spaces. Ids are reserved up front so each lot
+    loads independently; run it against an otherwise idle database.
+    """
+    owned = users * vehicles_per_user
+    if lots < 1 or spaces < 1:
+        raise click.UsageError('--lots and --spaces must be at least 1')
+    if history and owned < 2:
+        raise click.UsageError('At least two vehicles (--users x --vehicles-per-user) are needed for history')
+    
+    rng = random.Random(seed_value)
+    end = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    plate_prefix = f'SD{seed_value % 1000:03d}'
+    started = time.perf_counter()
+    
+    connection = db.session.connection()
+    dialect = connection.dialect.name
+    ids = _next_ids(connection)
+    
+    # Id ranges: owned vehicles first, then one block of walk-ins per lot
+    vehicle_base = ids['vehicles']
+    user_rows = [{
+        'id': ids['users'] + n,
+        'name': f'Seed Customer {ids["users"] + n}',
+        'contact_no': f'9{ids["users"] + n:09d}',
+        'role': UserRole.CUSTOMER,
+        'created_at': end - timedelta(days=days),
+        'updated_at': end - timedelta(days=days)
+    } for n in range(users)]
+    vehicle_rows = [{
+        'id': vehicle_base + n,
+        'vehicle_id': _plate(plate_prefix, vehicle_base + n),
+        'plate_normalized': normalize_plate(_plate(plate_prefix, vehicle_base + n)),
+        'owner_id': ids['users'] + n // vehicles_per_user,
+        'vehicle_type': VehicleType(_space_type(n).value),
+        'created_at': end - timedelta(days=days),
+        'updated_at': end - timedelta(days=days)
+    } for n in range(owned)]
+    lot_rows = [{
+        'id': ids['parking_lots'] + n,
+        'name': f'Seed Lot {ids["parking_lots"] + n}',
+        'location': f'{rng.randint(1, 999)} Seed Street',
+        'capacity': spaces,
+        'base_rate': rng.choice(LOT_RATES),
+        'geo_location': f'{rng.uniform(-60, 60):.4f},{rng.uniform(-180, 180):.4f}',
+        'created_at': end - timedelta(days=days),
+        'updated_at': end - timedelta(days=days)
+    } for n in range(lots)]
+    
+    for table, rows in ((User.__table__, user_rows), (Vehicle.__table__, vehicle_rows), (ParkingLot.__table__, lot_rows)):
+        for start in range(0, len(rows), chunk_size):
+            load_rows(connection, table, rows[start:start + chunk_size])
+    db.session.commit()
+    
+    per_lot_occupancies = history + spaces
+    tasks = [{
+        'index': n,
+        'seed': seed_value,
+        'lot_id': lot['id'],
+        'base_rate': lot['base_rate'],
+        'spaces': spaces,
+        'history': history,
+        'days': days,
+        'end': end,
+        'occupied_ratio': occupied_ratio,
+        'pending_ratio': pending_ratio,
+        'chunk_size': chunk_size,
+        'plate_prefix': plate_prefix,
+        'user_base': ids['users'],
+        'vehicle_base': vehicle_base,
+        'owned_vehicles': owned,
+        'vehicles_per_user': vehicles_per_user,
+        'walk_in_base': vehicle_base + owned + n * spaces,
+        'space_base': ids['parking_spaces'] + n * spaces,
+        'occupancy_base': ids['occupancies'] + n * per_lot_occupancies,
+        'billing_base': ids['billing'] + n * per_lot_occupancies
+    } for n, lot in enumerate(lot_rows)]
+    
+    if dialect == 'sqlite':
+        workers = 1
+    workers = min(lots, workers or multiprocessing.cpu_count())
+    
+    totals = {'users': len(user_rows), 'vehicles': len(vehicle_rows), 'parking_lots': len(lot_rows),
+              'parking_spaces': 0, 'occupancies': 0, 'billing': 0}
+    if workers == 1:
+        for task in tasks:
+            for table, count in seed_lot(db.session.connection(), task).items():
+                totals[table] += count
+            db.session.commit()
+            click.echo(f'  lot {task["lot_id"]} loaded')
+    else:
+        database_url = db.engine.url.render_as_string(hide_password=False)
+        db.session.remove()
+        # Spawned workers open their own connections instead of inheriting ours
+        with multiprocessing.get_context('spawn').Pool(
+            workers, initializer=_init_worker, initargs=(database_url,)
+        ) as pool:
+            for counts in pool.imap_unordered(_seed_lot_in_worker, tasks):
+                for table, count in counts.items():
+                    totals[table] += count
+    
+    _reset_sequences(db.session.connection())
+    db.session.commit()
+    
+    from app.services.revenue_service import RevenueService
+    RevenueService.rebuild_daily_rollups()
+    
+    elapsed = time.perf_counter() - started
+    rows = sum(totals.values())
+    click.echo(', '.join(f'{count} {table}' for table, count in totals.items()))
+    click.echo(f'Seeded {rows} rows in {elapsed:.1f} s ({rows / elapsed:,.0f} rows/s) with {workers} worker(s)')
@@ -3,6 +3,29 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
+def worker_pool_limits(pool_size, max_overflow, max_connections=0, workers=1):
+    """Pool size and overflow of one process so that all workers together stay within max_connections"""
+    if not max_connections:
+        return pool_size, max_overflow
+    if workers > max_connections:
+        # Even one connection per worker would exceed the limit
+        raise ValueError(
+            f'{workers} workers cannot share DATABASE_MAX_CONNECTIONS={max_connections}; '
+            'lower WEB_CONCURRENCY or raise DATABASE_MAX_CONNECTIONS'
+        )
+    per_worker = max_connections // max(1, workers)
+    pool_size = min(pool_size, per_worker)
+    return pool_size, min(max_overflow, per_worker - pool_size)
+
+# With DATABASE_MAX_CONNECTIONS set, the pool below is shrunk so that
+# WEB_CONCURRENCY worker processes never open more connections than that
+POOL_SIZE, MAX_OVERFLOW = worker_pool_limits(
+    int(os.environ.get('DATABASE_POOL_SIZE', 5)),
+    int(os.environ.get('DATABASE_MAX_OVERFLOW', 10)),
+    int(os.environ.get('DATABASE_MAX_CONNECTIONS', 0)),
+    int(os.environ.get('WEB_CONCURRENCY', 1))
+)
+
 class Config:
     """Base configuration"""
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'dev-secret-key'
@@ -16,10 +39,72 @@ class Config:
     SQLALCHEMY_ENGINE_OPTIONS = {
         'pool_recycle': 300,
         'pool_pre_ping': True,
-        'pool_size': int(os.environ.get('DATABASE_POOL_SIZE', 5)),
-        'max_overflow': int(os.environ.get('DATABASE_MAX_OVERFLOW', 10)),
+        'pool_size': POOL_SIZE,
+        'max_overflow': MAX_OVERFLOW,
         'pool_timeout': 30,
     }
+    
+    # Seconds before the in-memory space allocator rebuilds a lot's free lists
+    SPACE_ALLOCATOR_MAX_AGE = int(os.environ.get('SPACE_ALLOCATOR_MAX_AGE', 60))
+    
+    # Per-process cache of lot/space rates used to price check-outs
+    RATE_CACHE_SIZE = int(os.environ.get('RATE_CACHE_SIZE', 10000))
+    RATE_CACHE_TTL = int(os.environ.get('RATE_CACHE_TTL', 300))
+    
+    # Per-process cache of registered vehicles by normalized plate used at the gates
+    PLATE_CACHE_SIZE = int(os.environ.get('PLATE_CACHE_SIZE', 10000))
+    PLATE_CACHE_TTL = int(os.environ.get('PLATE_CACHE_TTL', 300))
+    
+    # Zone in which lot tariff time bands are read, and compiled tariff cache lifetime
+    TARIFF_TIMEZONE = os.environ.get('TARIFF_TIMEZONE', 'UTC')
+    TARIFF_CACHE_TTL = int(os.environ.get('TARIFF_CACHE_TTL', 300))
+    
+    # Gate event queue: events journaled to a local SQLite file (default instance/gate_queue.sqlite3)
+    # and applied in batches by GATE_QUEUE_WORKERS threads per process. Off unless enabled, so CLI
+    # commands and scripts start no threads; gunicorn.conf.py enables it for the server
+    GATE_QUEUE_ENABLED = os.environ.get('GATE_QUEUE_ENABLED', 'false').lower() in ('1', 'true', 'yes')
+    GATE_QUEUE_PATH = os.environ.get('GATE_QUEUE_PATH')
+    GATE_QUEUE_WORKERS = int(os.environ.get('GATE_QUEUE_WORKERS', 2))
+    GATE_QUEUE_BATCH_SIZE = int(os.environ.get('GATE_QUEUE_BATCH_SIZE', 50))
+    GATE_QUEUE_MAX_DEPTH = int(os.environ.get('GATE_QUEUE_MAX_DEPTH', 10000))
+    GATE_QUEUE_RETRY_AFTER = int(os.environ.get('GATE_QUEUE_RETRY_AFTER', 5))
+    GATE_QUEUE_LEASE_SECONDS = int(os.environ.get('GATE_QUEUE_LEASE_SECONDS', 60))
+    GATE_QUEUE_MAX_ATTEMPTS = int(os.environ.get('GATE_QUEUE_MAX_ATTEMPTS', 5))
+    GATE_QUEUE_POLL_SECONDS = float(os.environ.get('GATE_QUEUE_POLL_SECONDS', 1))
+    GATE_QUEUE_RETENTION_SECONDS = int(os.environ.get('GATE_QUEUE_RETENTION_SECONDS', 86400))
+    
+    # Server-Sent Events availability stream. SSE_MAX_SUBSCRIBERS bounds the streams (and their
+    # queues' memory) per process; asgi.py serves them on its event loop. The Flask route also
+    # holds a request thread per stream, so it keeps SSE_RESERVED_THREADS of GUNICORN_THREADS free
+    SSE_MAX_SUBSCRIBERS = int(os.environ.get('SSE_MAX_SUBSCRIBERS', 10000))
+    SSE_MAX_THREAD_STREAMS = max(
+        0, int(os.environ.get('GUNICORN_THREADS', 4)) - int(os.environ.get('SSE_RESERVED_THREADS', 1))
+    )
+    SSE_SUBSCRIBER_QUEUE_SIZE = int(os.environ.get('SSE_SUBSCRIBER_QUEUE_SIZE', 100))
+    SSE_HEARTBEAT_SECONDS = int(os.environ.get('SSE_HEARTBEAT_SECONDS', 15))
+    SSE_SNAPSHOT_SECONDS = int(os.environ.get('SSE_SNAPSHOT_SECONDS', 10))
+    
+    # Per-request SQL statistics (Server-Timing header and /api/debug/sql)
+    SQL_PROFILING = os.environ.get('SQL_PROFILING', '').lower() in ('1', 'true', 'yes')
+    SQL_PROFILE_BUFFER_SIZE = int(os.environ.get('SQL_PROFILE_BUFFER_SIZE', 500))
+    SQL_N_PLUS_ONE_THRESHOLD = int(os.environ.get('SQL_N_PLUS_ONE_THRESHOLD', 5))
+    
+    # Async serving mode (asgi.py): read engine pool and threads for the wrapped Flask app
+    ASYNC_DB_POOL_SIZE = int(os.environ.get('ASYNC_DB_POOL_SIZE', 20))
+    ASYNC_DB_MAX_OVERFLOW = int(os.environ.get('ASYNC_DB_MAX_OVERFLOW', 30))
+    ASYNC_DB_POOL_TIMEOUT = int(os.environ.get('ASYNC_DB_POOL_TIMEOUT', 30))
+    ASGI_WSGI_THREADS = int(os.environ.get('ASGI_WSGI_THREADS', 10))
+    
+    # JSON encoder ('orjson', or 'stdlib') and compression of buffered responses
+    JSON_PROVIDER = os.environ.get('JSON_PROVIDER', 'orjson')
+    COMPRESS_ENABLED = os.environ.get('COMPRESS_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+    COMPRESS_MIN_SIZE = int(os.environ.get('COMPRESS_MIN_SIZE', 1024))
+    COMPRESS_GZIP_LEVEL = int(os.environ.get('COMPRESS_GZIP_LEVEL', 6))
+    COMPRESS_BROTLI_QUALITY = int(os.environ.get('COMPRESS_BROTLI_QUALITY', 4))
+    
+    # Prometheus /metrics endpoint
+    METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+    METRICS_DOMAIN_CACHE_SECONDS = int(os.environ.get('METRICS_DOMAIN_CACHE_SECONDS', 10))
 
 class DevelopmentConfig(Config):
     """Development configuration"""
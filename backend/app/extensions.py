@@ -1,7 +1,13 @@
 from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
 from flask_jwt_extended import JWTManager
+from app.utils.compression import ResponseCompressor
+from app.utils.metrics import PrometheusMetrics
+from app.utils.sql_profiler import SQLProfiler
 
 db = SQLAlchemy()
 migrate = Migrate()
-jwt = JWTManager()
\ No newline at end of file
+jwt = JWTManager()
+sql_profiler = SQLProfiler()
+metrics = PrometheusMetrics()
+compressor = ResponseCompressor()
\ No newline at end of file
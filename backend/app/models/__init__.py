@@ -4,5 +4,8 @@ from app.models.user import User
 from app.models.vehicle import Vehicle
 from app.models.occupancy import Occupancy
 from app.models.billing import Billing
+from app.models.revenue import RevenueDaily
+from app.models.tariff import Tariff
+from app.models.gate_event import ProcessedGateEvent
 
-__all__ = ['ParkingLot', 'ParkingSpace', 'User', 'Vehicle', 'Occupancy', 'Billing']
\ No newline at end of file
+__all__ = ['ParkingLot', 'ParkingSpace', 'User', 'Vehicle', 'Occupancy', 'Billing', 'RevenueDaily', 'Tariff', 'ProcessedGateEvent']
\ No newline at end of file
@@ -17,6 +17,14 @@ class Billing(BaseModel):
     payment_time = db.Column(db.DateTime)
     payment_status = db.Column(db.Enum(PaymentStatus), default=PaymentStatus.PENDING)
     
+    # Indexes for the hot query paths (see migration add_hot_path_indexes)
+    __table_args__ = (
+        db.Index('ix_billing_payment_status_created_at_id', 'payment_status', 'created_at', 'id'),
+        db.Index('ix_billing_payment_status_payment_time_id', 'payment_status', 'payment_time', 'id'),
+        db.Index('ix_billing_created_at_id', 'created_at', 'id'),
+        db.Index('ix_billing_occupancy_id', 'occupancy_id'),
+    )
+    
     # Relationships
     user = db.relationship('User', backref='bills', lazy=True)
     
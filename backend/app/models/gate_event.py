@@ -0,0 +1,30 @@
+from app.extensions import db
+from app.models.base import BaseModel
+
+class ProcessedGateEvent(BaseModel):
+    """Outcome of a queued gate event, committed with the changes it made
+    
+    The gate queue delivers events at least once; a redelivered event whose
+    key is found here returns this result instead of being applied again.
+    """
+    __tablename__ = 'processed_gate_events'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    event_key = db.Column(db.String(64), nullable=False, unique=True)  # '<journal id>:<event id>'
+    result = db.Column(db.JSON, nullable=False)  # the process_batch() result of the first delivery
+    
+    __table_args__ = (
+        db.Index('ix_processed_gate_events_created_at', 'created_at'),
+    )
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'event_key': self.event_key,
+            'result': self.result,
+            'created_at': self.created_at.isoformat(),
+            'updated_at': self.updated_at.isoformat()
+        }
+    
+    def __repr__(self):
+        return f'<ProcessedGateEvent {self.event_key}>'
@@ -17,6 +17,14 @@ class Occupancy(BaseModel):
     exit_time = db.Column(db.DateTime)
     status = db.Column(db.Enum(OccupancyStatus), default=OccupancyStatus.ACTIVE)
     
+    # Indexes for the hot query paths (see migration add_hot_path_indexes)
+    __table_args__ = (
+        db.Index('ix_occupancies_status_space_id', 'status', 'space_id'),
+        db.Index('ix_occupancies_vehicle_id_status', 'vehicle_id', 'status'),
+        db.Index('ix_occupancies_entry_time_id', 'entry_time', 'id'),
+        db.Index('ix_occupancies_status_entry_time_id', 'status', 'entry_time', 'id'),
+    )
+    
     # Relationships
     billing = db.relationship('Billing', backref='occupancy', uselist=False, lazy=True)
     user = db.relationship('User', backref='occupancies', lazy=True)
@@ -1,6 +1,7 @@
 from app.extensions import db
 from app.models.base import BaseModel
 from app.models.parking_space import ParkingSpace, SpaceType, SpaceState
+from sqlalchemy import and_, case, func
 
 class ParkingLot(BaseModel):
     __tablename__ = 'parking_lots'
@@ -11,6 +12,15 @@ class ParkingLot(BaseModel):
     capacity = db.Column(db.Integer, nullable=False)
     base_rate = db.Column(db.Numeric(10, 2), nullable=False)  # hourly rate
     geo_location = db.Column(db.String(100))
+    # Bumped by every commit that changes the lot or its spaces (app.services.lot_versions)
+    version = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    
+    # Counts added by to_dict_with_availability() for a lot without free spaces
+    EMPTY_AVAILABILITY = {
+        'available_2w_spaces': 0,
+        'available_4w_spaces': 0,
+        'total_available_spaces': 0
+    }
     
     # Relationships
     parking_spaces = db.relationship('ParkingSpace', backref='parking_lot', lazy=True, cascade='all, delete-orphan')
@@ -40,12 +50,77 @@ class ParkingLot(BaseModel):
         
         return query.count()
 
-    def to_dict_with_availability(self):
-        """Enhanced to_dict with availability counts"""
+    @staticmethod
+    def availability_query(lot_ids=None, all_lots=False):
+        """Grouped query of available space counts per lot
+
+        Lots without a free space have no row unless all_lots is set, which
+        reads every lot and gives those zero counts.
+        """
+        counts = (
+            func.sum(case((ParkingSpace.space_type == SpaceType.TWO_WHEELER, 1), else_=0)),
+            func.sum(case((ParkingSpace.space_type == SpaceType.FOUR_WHEELER, 1), else_=0)),
+            func.count(ParkingSpace.id)
+        )
+        free = ParkingSpace.state == SpaceState.UNOCCUPIED
+        
+        if all_lots:
+            lot_id = ParkingLot.id
+            query = db.select(lot_id, *counts).outerjoin(
+                ParkingSpace, and_(ParkingSpace.lot_id == ParkingLot.id, free)
+            )
+        else:
+            lot_id = ParkingSpace.lot_id
+            query = db.select(lot_id, *counts).where(free)
+        
+        if lot_ids is not None:
+            query = query.where(lot_id.in_(lot_ids))
+        
+        return query.group_by(lot_id)
+    
+    @staticmethod
+    def availability_from_rows(rows):
+        """Map the rows of availability_query() to counts by lot id"""
+        return {
+            lot_id: {
+                'available_2w_spaces': int(two_wheeler or 0),
+                'available_4w_spaces': int(four_wheeler or 0),
+                'total_available_spaces': int(total or 0)
+            }
+            for lot_id, two_wheeler, four_wheeler, total in rows
+        }
+
+    @staticmethod
+    def get_availability_by_lot(lot_ids=None, all_lots=False):
+        """Get available space counts for many lots in a single grouped query"""
+        return ParkingLot.availability_from_rows(
+            db.session.execute(ParkingLot.availability_query(lot_ids, all_lots))
+        )
+
+    def to_dict_with_availability(self, availability=None):
+        """Enhanced to_dict with availability counts
+
+        Pass the result of get_availability_by_lot() when serializing many
+        lots so the counts are not queried once per lot.
+        """
+        if availability is None:
+            availability = ParkingLot.get_availability_by_lot([self.id])
+        
         data = self.to_dict()
-        data['available_2w_spaces'] = self.get_available_spaces_count(SpaceType.TWO_WHEELER)
-        data['available_4w_spaces'] = self.get_available_spaces_count(SpaceType.FOUR_WHEELER)
-        data['total_available_spaces'] = self.get_available_spaces_count()
+        data.update(availability.get(self.id, ParkingLot.EMPTY_AVAILABILITY))
+        return data
+    
+    @staticmethod
+    def sparse_dicts(rows, serialize, fields, availability=None):
+        """Serialize rows of selected lot columns, adding the availability counts named in fields"""
+        counts = [name for name in fields if name in ParkingLot.EMPTY_AVAILABILITY]
+        data = []
+        for row in rows:
+            item = serialize(row)
+            if counts:
+                lot_availability = availability.get(row.id, ParkingLot.EMPTY_AVAILABILITY)
+                item.update({name: lot_availability[name] for name in counts})
+            data.append(item)
         return data
 
     def __repr__(self):
@@ -21,6 +21,17 @@ class ParkingSpace(BaseModel):
     state = db.Column(db.Enum(SpaceState), default=SpaceState.UNOCCUPIED)
     extra_charge = db.Column(db.Numeric(10, 2), default=0.0)
     
+    # Indexes for the hot query paths (see migration add_hot_path_indexes)
+    __table_args__ = (
+        db.Index('ix_parking_spaces_lot_id_state_space_type', 'lot_id', 'state', 'space_type'),
+        db.Index('ix_parking_spaces_free_lot_id_space_type', 'lot_id', 'space_type',
+                 postgresql_where=db.text("state = 'UNOCCUPIED'")),
+        # Conditional GET validators of a lot's spaces (see migration add_space_updated_at_index)
+        db.Index('ix_parking_spaces_lot_id_updated_at', 'lot_id', 'updated_at'),
+        # Latest change to any space, for the validators of the lot and space listings
+        db.Index('ix_parking_spaces_updated_at', 'updated_at'),
+    )
+    
     # Relationships
     occupancies = db.relationship('Occupancy', backref='parking_space', lazy=True)
     
@@ -0,0 +1,30 @@
+from app.extensions import db
+from app.models.base import BaseModel
+
+class RevenueDaily(BaseModel):
+    """Paid revenue per lot per UTC day, maintained as bills are paid"""
+    __tablename__ = 'revenue_daily'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    day = db.Column(db.Date, nullable=False)
+    lot_id = db.Column(db.Integer, db.ForeignKey('parking_lots.id'), nullable=False)
+    total_amount = db.Column(db.Numeric(12, 2), nullable=False, default=0)
+    transaction_count = db.Column(db.Integer, nullable=False, default=0)
+    
+    __table_args__ = (
+        db.UniqueConstraint('day', 'lot_id', name='_revenue_day_lot_uc'),
+    )
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'day': self.day.isoformat(),
+            'lot_id': self.lot_id,
+            'total_amount': float(self.total_amount),
+            'transaction_count': self.transaction_count,
+            'created_at': self.created_at.isoformat(),
+            'updated_at': self.updated_at.isoformat()
+        }
+    
+    def __repr__(self):
+        return f'<RevenueDaily {self.day} - lot {self.lot_id}>'
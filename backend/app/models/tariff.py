@@ -0,0 +1,29 @@
+from app.extensions import db
+from app.models.base import BaseModel
+
+class Tariff(BaseModel):
+    """Time-of-day pricing rules of a parking lot (see app.services.tariff_service)"""
+    __tablename__ = 'tariffs'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    lot_id = db.Column(db.Integer, db.ForeignKey('parking_lots.id'), nullable=False, unique=True)
+    rules = db.Column(db.JSON, nullable=False, default=list)  # [{days, start, end, rate}], later rules win
+    grace_minutes = db.Column(db.Integer, nullable=False, default=0)
+    daily_cap = db.Column(db.Numeric(10, 2))  # max charge per 24 hours parked
+    
+    # Relationships
+    lot = db.relationship('ParkingLot', backref=db.backref('tariff', uselist=False, cascade='all, delete-orphan'))
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'lot_id': self.lot_id,
+            'rules': self.rules,
+            'grace_minutes': self.grace_minutes,
+            'daily_cap': float(self.daily_cap) if self.daily_cap is not None else None,
+            'created_at': self.created_at.isoformat(),
+            'updated_at': self.updated_at.isoformat()
+        }
+    
+    def __repr__(self):
+        return f'<Tariff lot {self.lot_id}>'
@@ -1,6 +1,19 @@
 from app.extensions import db
 from app.models.base import BaseModel
+from sqlalchemy.orm import validates
 import enum
+import re
+
+# Separators that cameras and people write differently for the same plate
+PLATE_SEPARATORS = re.compile(r'[\s\-]+')
+
+def normalize_plate(registration):
+    """Canonical form of a registration number: upper case, without spaces or dashes"""
+    return PLATE_SEPARATORS.sub('', str(registration)).upper()
+
+def _default_plate_normalized(context):
+    # Core inserts (bulk loads) that leave the column out
+    return normalize_plate(context.get_current_parameters()['vehicle_id'])
 
 class VehicleType(enum.Enum):
     TWO_WHEELER = '2W'
@@ -12,12 +25,34 @@ class Vehicle(BaseModel):
     # Using registration number as primary key - but we need to ensure it's properly handled
     id = db.Column(db.Integer, primary_key=True)  # Add integer PK for FK relationships
     vehicle_id = db.Column(db.String(20), unique=True, nullable=False)  # Registration number
+    # normalize_plate(vehicle_id), the column all registration lookups go through
+    plate_normalized = db.Column(db.String(20), nullable=False, default=_default_plate_normalized)
     owner_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True)  # Nullable for walk-ins
     vehicle_type = db.Column(db.Enum(VehicleType), nullable=False)
     
+    # Indexes for the hot query paths (see migration add_hot_path_indexes)
+    __table_args__ = (
+        db.Index('ix_vehicles_owner_id', 'owner_id'),
+        db.Index('ix_vehicles_plate_normalized', 'plate_normalized', unique=True),
+    )
+    
     # Relationships
     occupancies = db.relationship('Occupancy', backref='vehicle', lazy=True)
     
+    @validates('vehicle_id')
+    def _set_plate_normalized(self, key, registration):
+        plate = normalize_plate(registration)
+        if not plate:
+            # Would collide with every other such registration on the unique plate index
+            raise ValueError('Vehicle registration must contain letters or digits')
+        self.plate_normalized = plate
+        return registration
+    
+    @classmethod
+    def find_by_plate(cls, registration):
+        """The vehicle registered as registration, however it is spaced, dashed or cased; None if unknown"""
+        return cls.query.filter_by(plate_normalized=normalize_plate(registration)).first()
+    
     def to_dict(self):
         return {
             'id': self.id,
@@ -2,13 +2,17 @@ from flask import Blueprint, request, jsonify
 from app.extensions import db
 from app.models.billing import Billing, PaymentStatus
 from app.services.billing_service import BillingService
+from app.services.revenue_service import RevenueService
+from app.utils.fields import get_fields_arg, select_fields
+from app.utils.pagination import get_page_args, paginate, stream_response
 
 billing_bp = Blueprint('billing', __name__)
 
 @billing_bp.route('/', methods=['GET'])
 def get_billing_records():
-    """Get all billing records with optional filtering"""
+    """Get all billing records with optional filtering, or only the columns in ?fields="""
     try:
+        fields = get_fields_arg(Billing)
         payment_status = request.args.get('payment_status')
         occupancy_id = request.args.get('occupancy_id', type=int)
         user_id = request.args.get('user_id', type=int)  # Filter by bill owner (user)
@@ -22,14 +26,32 @@ def get_billing_records():
         if user_id:
             query = query.filter(Billing.user_id == user_id)
         
-        billing_records = query.order_by(Billing.created_at.desc()).all()
+        serialize = Billing.to_dict
+        if fields:
+            # The pagination keys are always selected; the cursor is built from them
+            query, serialize = select_fields(query, Billing, fields,
+                                             required=[Billing.created_at, Billing.id])
+        
+        limit, cursor, stream = get_page_args()
+        if stream:
+            return stream_response(query, Billing.created_at, Billing.id,
+                                   serialize, cursor=cursor)
+        
+        billing_records, next_cursor = paginate(query, Billing.created_at, Billing.id,
+                                                serialize, limit, cursor)
         
         return jsonify({
             'success': True,
-            'data': [bill.to_dict() for bill in billing_records],
-            'count': len(billing_records)
+            'data': billing_records,
+            'count': len(billing_records),
+            'next_cursor': next_cursor
         })
         
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
     except Exception as e:
         return jsonify({
             'success': False,
@@ -104,12 +126,15 @@ def update_payment_status(billing_id):
                 'error': 'Missing payment_status field'
             }), 400
         
+        old_status, old_payment_time = billing.payment_status, billing.payment_time
         billing.payment_status = PaymentStatus(data['payment_status'])
         
         if data['payment_status'] == 'paid' and not billing.payment_time:
             from datetime import datetime
             billing.payment_time = datetime.utcnow()
         
+        RevenueService.record_status_change(billing, old_status, old_payment_time)
+        
         db.session.commit()
         
         return jsonify({
@@ -129,16 +154,28 @@ def update_payment_status(billing_id):
 def get_pending_payments():
     """Get all pending payments"""
     try:
-        pending_bills = Billing.query.filter(
-            Billing.payment_status == PaymentStatus.PENDING
-        ).order_by(Billing.created_at.desc()).all()
+        query = Billing.query.filter(Billing.payment_status == PaymentStatus.PENDING)
+        
+        limit, cursor, stream = get_page_args()
+        if stream:
+            return stream_response(query, Billing.created_at, Billing.id,
+                                   Billing.to_dict, cursor=cursor)
+        
+        pending_bills, next_cursor = paginate(query, Billing.created_at, Billing.id,
+                                              Billing.to_dict, limit, cursor)
         
         return jsonify({
             'success': True,
-            'data': [bill.to_dict() for bill in pending_bills],
-            'count': len(pending_bills)
+            'data': pending_bills,
+            'count': len(pending_bills),
+            'next_cursor': next_cursor
         })
         
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
     except Exception as e:
         return jsonify({
             'success': False,
@@ -165,24 +202,162 @@ def get_revenue_report():
             end_date_obj = datetime.fromisoformat(end_date)
             query = query.filter(Billing.payment_time <= end_date_obj)
         
-        # Calculate total revenue
-        total_revenue = db.session.query(func.sum(Billing.amount)).filter(
-            Billing.payment_status == PaymentStatus.PAID
-        ).scalar() or 0.0
+        # Calculate total revenue over the same date range as the transactions
+        total_revenue = query.with_entities(func.sum(Billing.amount)).scalar() or 0.0
+        
+        # Transactions are paged on payment_time, the column they are filtered by
+        limit, cursor, stream = get_page_args()
+        if stream:
+            return stream_response(
+                query, Billing.payment_time, Billing.id, Billing.to_dict, cursor=cursor,
+                head=f'{{"success": true, "data": {{"total_revenue": {float(total_revenue)}, "transactions": [',
+                tail=lambda count: f'], "transaction_count": {count}}}}}'
+            )
         
-        paid_bills = query.order_by(Billing.payment_time.desc()).all()
+        paid_bills, next_cursor = paginate(query, Billing.payment_time, Billing.id,
+                                           Billing.to_dict, limit, cursor)
         
         return jsonify({
             'success': True,
             'data': {
                 'total_revenue': float(total_revenue),
-                'transactions': [bill.to_dict() for bill in paid_bills],
-                'transaction_count': len(paid_bills)
+                'transactions': paid_bills,
+                'transaction_count': len(paid_bills),
+                'next_cursor': next_cursor
             }
         })
         
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@billing_bp.route('/revenue/summary', methods=['GET'])
+def get_revenue_summary():
+    """Get paid revenue grouped by day, week or month and by lot"""
+    try:
+        from datetime import date
+        
+        start_date = request.args.get('start_date')
+        end_date = request.args.get('end_date')
+        by_lot = request.args.get('by_lot', 'true').lower() not in ('0', 'false', 'no')
+        
+        summary = RevenueService.get_revenue_summary(
+            group_by=request.args.get('group_by', 'day'),
+            start_date=date.fromisoformat(start_date[:10]) if start_date else None,
+            end_date=date.fromisoformat(end_date[:10]) if end_date else None,
+            lot_id=request.args.get('lot_id', type=int),
+            by_lot=by_lot
+        )
+        
+        return jsonify({
+            'success': True,
+            'data': summary
+        })
+        
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
     except Exception as e:
         return jsonify({
             'success': False,
             'error': str(e)
-        }), 500
\ No newline at end of file
+        }), 500
+
+@billing_bp.route('/revenue/rebuild', methods=['POST'])
+def rebuild_revenue_rollups():
+    """Recompute the daily revenue rollup from billing records"""
+    try:
+        from datetime import date
+        
+        data = request.get_json(silent=True) or {}
+        
+        RevenueService.rebuild_daily_rollups(
+            start_date=date.fromisoformat(data['start_date'][:10]) if data.get('start_date') else None,
+            end_date=date.fromisoformat(data['end_date'][:10]) if data.get('end_date') else None
+        )
+        
+        return jsonify({
+            'success': True,
+            'message': 'Revenue rollups rebuilt successfully'
+        })
+        
+    except ValueError as e:
+        db.session.rollback()
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@billing_bp.route('/simulate', methods=['POST'])
+def simulate_rates():
+    """Simulate the revenue impact of new base rates over past completed stays"""
+    try:
+        from datetime import datetime
+        from app.services.pricing_engine import PricingEngine
+        
+        data = request.get_json(silent=True) or {}
+        
+        result = PricingEngine.simulate_rates(
+            base_rates=data.get('base_rates'),
+            multiplier=float(data.get('multiplier', 1.0)),
+            start_time=datetime.fromisoformat(data['start_date']) if data.get('start_date') else None,
+            end_time=datetime.fromisoformat(data['end_date']) if data.get('end_date') else None,
+            lot_ids=data.get('lot_ids')
+        )
+        
+        return jsonify({
+            'success': True,
+            'data': result
+        })
+        
+    except (ValueError, TypeError) as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@billing_bp.route('/reprice-pending', methods=['POST'])
+def reprice_pending_bills():
+    """Recompute all pending bills at the current lot and space rates"""
+    try:
+        from app.services.pricing_engine import PricingEngine
+        
+        data = request.get_json(silent=True) or {}
+        
+        result = PricingEngine.reprice_pending_bills(
+            lot_ids=data.get('lot_ids'),
+            dry_run=bool(data.get('dry_run', False))
+        )
+        
+        return jsonify({
+            'success': True,
+            'data': result,
+            'message': f"{result['changed_bills']} pending bills repriced"
+        })
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
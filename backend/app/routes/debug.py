@@ -0,0 +1,29 @@
+from flask import Blueprint, request, jsonify
+from app.extensions import sql_profiler
+
+debug_bp = Blueprint('debug', __name__)
+
+@debug_bp.route('/sql', methods=['GET'])
+def get_sql_profiles():
+    """Get recent per-request SQL statistics and a per-endpoint summary"""
+    try:
+        limit = request.args.get('limit', 50, type=int)
+        endpoint = request.args.get('endpoint')
+        n_plus_one = request.args.get('n_plus_one', 'false').lower() == 'true'
+        
+        requests = sql_profiler.recent(limit=limit, endpoint=endpoint, n_plus_one=n_plus_one)
+        
+        return jsonify({
+            'success': True,
+            'data': {
+                'summary': sql_profiler.summary(),
+                'requests': requests
+            },
+            'count': len(requests)
+        })
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
@@ -1,16 +1,23 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, current_app, request, jsonify, url_for
 from app.extensions import db
 from app.models.occupancy import Occupancy, OccupancyStatus
+from app.models.parking_space import SpaceType
 from app.services.parking_service import ParkingService
 from app.services.occupancy_service import OccupancyService
+from app.services.gate_queue import gate_queue, QueueFull
+from app.utils.fields import get_fields_arg, select_fields
+from app.utils.pagination import get_page_args, paginate, stream_response
 from datetime import datetime
 
 occupancy_bp = Blueprint('occupancy', __name__)
 
+MAX_BATCH_OPERATIONS = 500
+
 @occupancy_bp.route('/', methods=['GET'])
 def get_occupancies():
-    """Get all occupancies with optional filtering"""
+    """Get all occupancies with optional filtering, or only the columns in ?fields="""
     try:
+        fields = get_fields_arg(Occupancy)
         status = request.args.get('status')
         space_id = request.args.get('space_id', type=int)
         vehicle_id = request.args.get('vehicle_id', type=int)
@@ -24,14 +31,33 @@ def get_occupancies():
         if vehicle_id:
             query = query.filter(Occupancy.vehicle_id == vehicle_id)
         
-        occupancies = query.order_by(Occupancy.entry_time.desc()).all()
+        if fields:
+            # The pagination keys are always selected; the cursor is built from them
+            query, serialize = select_fields(query, Occupancy, fields,
+                                             required=[Occupancy.entry_time, Occupancy.id])
+        else:
+            query, serialize = OccupancyService.with_vehicle_details(query), Occupancy.to_dict
+        
+        limit, cursor, stream = get_page_args()
+        if stream:
+            return stream_response(query, Occupancy.entry_time, Occupancy.id,
+                                   serialize, cursor=cursor)
+        
+        occupancies, next_cursor = paginate(query, Occupancy.entry_time, Occupancy.id,
+                                            serialize, limit, cursor)
         
         return jsonify({
             'success': True,
-            'data': [occ.to_dict() for occ in occupancies],
-            'count': len(occupancies)
+            'data': occupancies,
+            'count': len(occupancies),
+            'next_cursor': next_cursor
         })
         
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
     except Exception as e:
         return jsonify({
             'success': False,
@@ -60,7 +86,7 @@ def get_active_occupancies():
 def get_occupancy(occupancy_id):
     """Get a specific occupancy by ID"""
     try:
-        occupancy = Occupancy.query.get_or_404(occupancy_id)
+        occupancy = OccupancyService.with_vehicle_details(Occupancy.query).get_or_404(occupancy_id)
         return jsonify({
             'success': True,
             'data': occupancy.to_dict()
@@ -171,6 +197,63 @@ def check_in_vehicle():
             'error': str(e)
         }), 500
 
+@occupancy_bp.route('/lots/<int:lot_id>/check-in', methods=['POST'])
+def check_in_to_lot(lot_id):
+    """Check in a vehicle to a lot, automatically assigning a free space"""
+    try:
+        data = request.get_json()
+        
+        required_fields = ['vehicle_registration']
+        for field in required_fields:
+            if field not in data:
+                return jsonify({
+                    'success': False,
+                    'error': f'Missing required field: {field}'
+                }), 400
+        
+        entry_time = None
+        if 'entry_time' in data:
+            entry_time = datetime.fromisoformat(data['entry_time'])
+        
+        space_type = None
+        if data.get('space_type'):
+            space_type = SpaceType(data['space_type'])
+        
+        occupancy, message = ParkingService.check_in_to_lot(
+            lot_id=lot_id,
+            vehicle_registration=data['vehicle_registration'],
+            space_type=space_type,
+            entry_time=entry_time,
+            user_id=data.get('user_id')
+        )
+        
+        if not occupancy:
+            return jsonify({
+                'success': False,
+                'error': message
+            }), 400
+        
+        return jsonify({
+            'success': True,
+            'data': {
+                'space': occupancy.parking_space.to_dict(),
+                'occupancy': occupancy.to_dict()
+            },
+            'message': message
+        }), 201
+        
+    except ValueError as e:
+        # An unknown space_type or a malformed entry_time
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
 @occupancy_bp.route('/<int:occupancy_id>/check-out', methods=['POST'])
 def check_out_vehicle(occupancy_id):
     """Check out a vehicle from parking"""
@@ -208,6 +291,158 @@ def check_out_vehicle(occupancy_id):
             'error': str(e)
         }), 500
 
+@occupancy_bp.route('/batch', methods=['POST'])
+def process_batch():
+    """Apply a batch of check-in/check-out operations in one transaction"""
+    try:
+        data = request.get_json()
+        
+        operations = data.get('operations') if isinstance(data, dict) else None
+        if not isinstance(operations, list) or not operations:
+            return jsonify({
+                'success': False,
+                'error': 'Missing required field: operations'
+            }), 400
+        
+        if len(operations) > MAX_BATCH_OPERATIONS:
+            return jsonify({
+                'success': False,
+                'error': f'A batch can contain at most {MAX_BATCH_OPERATIONS} operations'
+            }), 400
+        
+        results = ParkingService.process_batch(operations)
+        succeeded = sum(1 for result in results if result['success'])
+        
+        return jsonify({
+            'success': True,
+            'data': results,
+            'succeeded': succeeded,
+            'failed': len(results) - succeeded
+        })
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+def _gate_queue_disabled():
+    return jsonify({
+        'success': False,
+        'error': 'The gate event queue is disabled'
+    }), 404
+
+@occupancy_bp.route('/gate-events', methods=['POST'])
+def submit_gate_events():
+    """Accept one gate event, or a list under operations, for asynchronous processing
+    
+    Events take the batch operation format and are acknowledged with 202 as
+    soon as they are journaled; their outcome is read from GET
+    /gate-events/<id>. A full queue answers 503 with Retry-After.
+    """
+    if not gate_queue.enabled:
+        return _gate_queue_disabled()
+    try:
+        data = request.get_json()
+        
+        single = isinstance(data, dict) and 'operations' not in data
+        operations = [data] if single else (data.get('operations') if isinstance(data, dict) else None)
+        if not isinstance(operations, list) or not operations:
+            return jsonify({
+                'success': False,
+                'error': 'Missing required field: operations'
+            }), 400
+        
+        if len(operations) > MAX_BATCH_OPERATIONS:
+            return jsonify({
+                'success': False,
+                'error': f'A batch can contain at most {MAX_BATCH_OPERATIONS} operations'
+            }), 400
+        
+        event_ids, depth = gate_queue.submit(operations)
+        events = [{'id': event_id, 'status': 'queued'} for event_id in event_ids]
+        
+        response = jsonify({
+            'success': True,
+            'data': events[0] if single else events,
+            'queue_depth': depth,
+            'message': 'Gate events accepted'
+        })
+        response.status_code = 202
+        if single:
+            response.headers['Location'] = url_for('occupancy.get_gate_event', event_id=event_ids[0])
+        return response
+        
+    except QueueFull as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 503, {'Retry-After': str(current_app.config['GATE_QUEUE_RETRY_AFTER'])}
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@occupancy_bp.route('/gate-events', methods=['GET'])
+def get_gate_events():
+    """Get the status of the gate events listed in ?ids=1,2,3"""
+    if not gate_queue.enabled:
+        return _gate_queue_disabled()
+    try:
+        event_ids = [int(event_id) for event_id in request.args.get('ids', '').split(',') if event_id.strip()]
+        if not event_ids or len(event_ids) > MAX_BATCH_OPERATIONS:
+            raise ValueError(f'ids must list between 1 and {MAX_BATCH_OPERATIONS} event ids')
+        
+        events = gate_queue.journal.get(event_ids)
+        return jsonify({
+            'success': True,
+            'data': events,
+            'count': len(events),
+            'queue_depth': gate_queue.journal.depth()
+        })
+        
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@occupancy_bp.route('/gate-events/<int:event_id>', methods=['GET'])
+def get_gate_event(event_id):
+    """Get the status of a gate event, with its result once it has been processed"""
+    if not gate_queue.enabled:
+        return _gate_queue_disabled()
+    try:
+        events = gate_queue.journal.get([event_id])
+        if not events:
+            return jsonify({
+                'success': False,
+                'error': 'Gate event not found'
+            }), 404
+        
+        return jsonify({
+            'success': True,
+            'data': events[0]
+        })
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
 @occupancy_bp.route('/reserve-and-checkin', methods=['POST'])
 def reserve_and_checkin():
     """Reserve a parking space and check in vehicle in one operation"""
@@ -273,18 +508,32 @@ def get_occupancy_history():
         if end_date:
             end_date_obj = datetime.fromisoformat(end_date)
         
-        history = OccupancyService.get_occupancy_history(
+        query = OccupancyService.occupancy_history_query(
             vehicle_id=vehicle_id,
             start_date=start_date_obj,
             end_date=end_date_obj
         )
         
+        limit, cursor, stream = get_page_args()
+        if stream:
+            return stream_response(query, Occupancy.entry_time, Occupancy.id,
+                                   Occupancy.to_dict, cursor=cursor)
+        
+        history, next_cursor = paginate(query, Occupancy.entry_time, Occupancy.id,
+                                        Occupancy.to_dict, limit, cursor)
+        
         return jsonify({
             'success': True,
-            'data': [occ.to_dict() for occ in history],
-            'count': len(history)
+            'data': history,
+            'count': len(history),
+            'next_cursor': next_cursor
         })
         
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
     except Exception as e:
         return jsonify({
             'success': False,
@@ -1,22 +1,115 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, current_app, request, jsonify
 from app.extensions import db
 from app.models.parking_lot import ParkingLot
+from app.models.parking_space import ParkingSpace
+from app.models.tariff import Tariff
 from app.services.parking_service import ParkingService
+from app.services.tariff_service import CompiledTariff
+from app.services.availability_broadcaster import availability_broadcaster, format_sse
+from app.utils.fields import get_fields_arg, select_fields
+from app.utils.http_cache import add_validators, collection_aggregate, collection_validators, latest_update, not_modified_response, summed_lot_version
 
 
 parking_lots_bp = Blueprint('parking_lots', __name__)
 
 @parking_lots_bp.route('/', methods=['GET'])
 def get_parking_lots():
-    """Get all parking lots with availability info"""
+    """Get all parking lots with availability info, or only the columns and counts in ?fields="""
     try:
-        lots = ParkingLot.query.all()
+        fields = get_fields_arg(ParkingLot, ParkingLot.EMPTY_AVAILABILITY)
         
-        return jsonify({
+        # Availability counts change with the spaces, which bump their lot's version;
+        # counting every space per request would cost as much as the listing
+        etag, last_modified = collection_validators(
+            collection_aggregate(ParkingLot), summed_lot_version(), latest_update(ParkingSpace)
+        )
+        not_modified = not_modified_response(etag, last_modified)
+        if not_modified:
+            return not_modified
+        
+        if fields:
+            query, serialize = select_fields(ParkingLot.query, ParkingLot, fields, required=[ParkingLot.id])
+            rows = query.all()
+            availability = None
+            if any(name in ParkingLot.EMPTY_AVAILABILITY for name in fields):
+                availability = ParkingLot.get_availability_by_lot()
+            data = ParkingLot.sparse_dicts(rows, serialize, fields, availability)
+        else:
+            lots = ParkingLot.query.all()
+            availability = ParkingLot.get_availability_by_lot()
+            data = [lot.to_dict_with_availability(availability) for lot in lots]
+        
+        return add_validators(jsonify({
             'success': True,
-            'data': [lot.to_dict_with_availability() for lot in lots],
-            'count': len(lots)
+            'data': data,
+            'count': len(data)
+        }), etag, last_modified)
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@parking_lots_bp.route('/availability/stream', methods=['GET'])
+def stream_availability():
+    """Stream per-lot availability changes as Server-Sent Events
+
+    Sends a snapshot event first, then an availability event with per-lot
+    deltas after every commit of this process that changes a space, and a
+    fresh snapshot every SSE_SNAPSHOT_SECONDS. A resync event means updates
+    were dropped and the client should refetch /api/parking-lots/.
+    
+    This route holds a request thread per open stream, so it stops at
+    SSE_MAX_THREAD_STREAMS; asgi.py serves the same stream on its event
+    loop instead (app.asgi.stream_availability).
+    """
+    try:
+        lot_ids = None
+        if request.args.get('lot_id'):
+            lot_ids = [int(lot_id) for lot_id in request.args.get('lot_id').split(',')]
+        
+        limit = min(current_app.config['SSE_MAX_SUBSCRIBERS'], current_app.config['SSE_MAX_THREAD_STREAMS'])
+        if availability_broadcaster.subscriber_count >= limit:
+            return jsonify({
+                'success': False,
+                'error': 'Too many availability subscribers, poll /api/parking-lots/ instead'
+            }), 503
+        
+        heartbeat = current_app.config['SSE_HEARTBEAT_SECONDS']
+        # Read before subscribing, so no delta queued for this stream is already in the snapshot;
+        # a commit in between is missed until the next periodic snapshot rather than counted twice
+        try:
+            snapshot = ParkingLot.get_availability_by_lot(lot_ids, all_lots=True)
+        finally:
+            # Return the connection to the pool; the stream itself needs no database
+            db.session.remove()
+        subscription = availability_broadcaster.subscribe(
+            lot_ids, max_queue=current_app.config['SSE_SUBSCRIBER_QUEUE_SIZE']
+        )
+        
+        def generate():
+            try:
+                yield format_sse('snapshot', snapshot)
+                while True:
+                    yield subscription.next_message(heartbeat)
+            finally:
+                availability_broadcaster.unsubscribe(subscription)
+        
+        return Response(generate(), mimetype='text/event-stream', headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no'
         })
+        
+    except ValueError:
+        return jsonify({
+            'success': False,
+            'error': 'lot_id must be a comma separated list of integers'
+        }), 400
     except Exception as e:
         return jsonify({
             'success': False,
@@ -159,17 +252,124 @@ def delete_parking_lot(lot_id):
 def get_lot_spaces(lot_id):
     """Get all parking spaces for a specific lot"""
     try:
+        # The lot's own row is included so a deleted lot never validates
+        etag, last_modified = collection_validators(
+            collection_aggregate(ParkingLot, ParkingLot.id == lot_id),
+            summed_lot_version(ParkingLot.id == lot_id),
+            latest_update(ParkingSpace, ParkingSpace.lot_id == lot_id)
+        )
+        not_modified = not_modified_response(etag, last_modified)
+        if not_modified:
+            return not_modified
+        
         lot = ParkingLot.query.get_or_404(lot_id)
         spaces = [space.to_dict() for space in lot.parking_spaces]
         
-        return jsonify({
+        return add_validators(jsonify({
             'success': True,
             'data': spaces,
             'count': len(spaces)
+        }), etag, last_modified)
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@parking_lots_bp.route('/<int:lot_id>/tariff', methods=['GET'])
+def get_lot_tariff(lot_id):
+    """Get the tariff of a parking lot with its compiled rate bands"""
+    try:
+        lot = ParkingLot.query.get_or_404(lot_id)
+        if not lot.tariff:
+            return jsonify({
+                'success': False,
+                'error': 'This lot has no tariff and is charged at its base rate'
+            }), 404
+        
+        compiled = CompiledTariff.compile(lot.tariff.rules, lot.base_rate,
+                                          lot.tariff.grace_minutes, lot.tariff.daily_cap)
+        data = lot.tariff.to_dict()
+        data['bands'] = compiled.bands()
+        
+        return jsonify({
+            'success': True,
+            'data': data
         })
         
     except Exception as e:
         return jsonify({
             'success': False,
             'error': str(e)
-        }), 500
\ No newline at end of file
+        }), 404
+
+@parking_lots_bp.route('/<int:lot_id>/tariff', methods=['PUT'])
+def set_lot_tariff(lot_id):
+    """Create or replace the tariff of a parking lot"""
+    try:
+        lot = ParkingLot.query.get_or_404(lot_id)
+        data = request.get_json()
+        
+        if 'rules' not in data:
+            return jsonify({
+                'success': False,
+                'error': 'Missing required field: rules'
+            }), 400
+        
+        grace_minutes = int(data.get('grace_minutes', 0))
+        daily_cap = data.get('daily_cap')
+        
+        # Compiling validates the rules before anything is stored
+        compiled = CompiledTariff.compile(data['rules'], lot.base_rate, grace_minutes,
+                                          float(daily_cap) if daily_cap is not None else None)
+        
+        tariff = lot.tariff or Tariff(lot_id=lot.id)
+        tariff.rules = data['rules']
+        tariff.grace_minutes = grace_minutes
+        tariff.daily_cap = daily_cap
+        db.session.add(tariff)
+        db.session.commit()
+        
+        result = tariff.to_dict()
+        result['bands'] = compiled.bands()
+        
+        return jsonify({
+            'success': True,
+            'data': result,
+            'message': 'Tariff saved successfully'
+        })
+        
+    except (ValueError, TypeError) as e:
+        db.session.rollback()
+        return jsonify({
+            'success': False,
+            'error': f'Invalid tariff: {e}'
+        }), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@parking_lots_bp.route('/<int:lot_id>/tariff', methods=['DELETE'])
+def delete_lot_tariff(lot_id):
+    """Remove the tariff of a parking lot, returning it to its flat base rate"""
+    try:
+        lot = ParkingLot.query.get_or_404(lot_id)
+        if lot.tariff:
+            db.session.delete(lot.tariff)
+            db.session.commit()
+        
+        return jsonify({
+            'success': True,
+            'message': 'Tariff deleted successfully'
+        })
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
@@ -2,34 +2,91 @@ from flask import Blueprint, request, jsonify
 from app.extensions import db
 from app.models.parking_space import ParkingSpace, SpaceType, SpaceState
 from app.models.parking_lot import ParkingLot
+from app.services import space_events
+from app.utils.fields import get_fields_arg, select_fields
+from app.utils.http_cache import add_validators, collection_aggregate, collection_validators, latest_update, not_modified_response, summed_lot_version
+from sqlalchemy import bindparam, cast, func, insert, literal, select
+from sqlalchemy.dialects.postgresql import ARRAY
 
 parking_spaces_bp = Blueprint('parking_spaces', __name__)
 
+MAX_BULK_SPACES = 10000
+
+def _insert_spaces(lot_id, rows):
+    """Insert the space rows of one lot; returns their ids in row order
+    
+    On PostgreSQL the columns are sent as three arrays and unnested by one
+    INSERT ... SELECT, several times faster than a multi-row VALUES insert.
+    Ids come from the sequence in the SELECT's order, so sorted they line
+    up with the rows.
+    """
+    if db.session.get_bind().dialect.name != 'postgresql':
+        result = db.session.execute(
+            insert(ParkingSpace).returning(ParkingSpace.id, sort_by_parameter_order=True),
+            [{'lot_id': lot_id, **row} for row in rows]
+        )
+        return result.scalars().all()
+    
+    def column_array(name):
+        array_type = ARRAY(ParkingSpace.__table__.c[name].type)
+        return cast(bindparam(name, [row[name] for row in rows], type_=array_type), array_type)
+    
+    spaces = func.unnest(
+        column_array('space_type'), column_array('state'), column_array('extra_charge')
+    ).table_valued('space_type', 'state', 'extra_charge', with_ordinality='position').render_derived('spaces')
+    result = db.session.execute(
+        insert(ParkingSpace).from_select(
+            ['lot_id', 'space_type', 'state', 'extra_charge'],
+            select(literal(lot_id), spaces.c.space_type, spaces.c.state, spaces.c.extra_charge).order_by(spaces.c.position)
+        ).returning(ParkingSpace.id)
+    )
+    return sorted(result.scalars().all())
+
 @parking_spaces_bp.route('/', methods=['GET'])
 def get_parking_spaces():
-    """Get all parking spaces with optional filtering"""
+    """Get all parking spaces with optional filtering, or only the columns in ?fields="""
     try:
+        fields = get_fields_arg(ParkingSpace)
         lot_id = request.args.get('lot_id', type=int)
         space_type = request.args.get('space_type')
         state = request.args.get('state')
         
-        query = ParkingSpace.query
-        
+        criteria = []
         if lot_id:
-            query = query.filter(ParkingSpace.lot_id == lot_id)
+            criteria.append(ParkingSpace.lot_id == lot_id)
         if space_type:
-            query = query.filter(ParkingSpace.space_type == SpaceType(space_type))
+            criteria.append(ParkingSpace.space_type == SpaceType(space_type))
         if state:
-            query = query.filter(ParkingSpace.state == SpaceState(state))
+            criteria.append(ParkingSpace.state == SpaceState(state))
         
-        spaces = query.all()
+        # Validated by any change to the spaces of the lot (or of every lot), whatever the
+        # other filters: every commit changing a space bumps its lot's version
+        lots, spaces = ([ParkingLot.id == lot_id], [ParkingSpace.lot_id == lot_id]) if lot_id else ([], [])
+        etag, last_modified = collection_validators(
+            collection_aggregate(ParkingLot, *lots), summed_lot_version(*lots), latest_update(ParkingSpace, *spaces)
+        )
+        not_modified = not_modified_response(etag, last_modified)
+        if not_modified:
+            return not_modified
         
-        return jsonify({
+        query = ParkingSpace.query.filter(*criteria)
+        if fields:
+            query, serialize = select_fields(query, ParkingSpace, fields)
+            spaces = [serialize(row) for row in query]
+        else:
+            spaces = [space.to_dict() for space in query]
+        
+        return add_validators(jsonify({
             'success': True,
-            'data': [space.to_dict() for space in spaces],
+            'data': spaces,
             'count': len(spaces)
-        })
+        }), etag, last_modified)
         
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
     except Exception as e:
         return jsonify({
             'success': False,
@@ -97,6 +154,92 @@ def create_parking_space():
             'error': str(e)
         }), 500
 
+@parking_spaces_bp.route('/bulk', methods=['POST'])
+def create_parking_spaces_bulk():
+    """Create many parking spaces in one lot with a single batched insert"""
+    try:
+        data = request.get_json()
+        
+        if 'lot_id' not in data:
+            return jsonify({
+                'success': False,
+                'error': 'Missing required field: lot_id'
+            }), 400
+        
+        # Either an explicit list of spaces or N copies of one template
+        if 'spaces' in data:
+            specs = data['spaces']
+            count = len(specs) if isinstance(specs, list) else 0
+        elif 'count' in data and 'space_type' in data:
+            try:
+                count = int(str(data['count']))  # whole numbers only, no 2.5 or true
+            except ValueError:
+                count = 0
+            specs = None
+        else:
+            return jsonify({
+                'success': False,
+                'error': 'Provide either spaces or count and space_type'
+            }), 400
+        
+        # Checked before the template is copied count times
+        if not 1 <= count <= MAX_BULK_SPACES:
+            return jsonify({
+                'success': False,
+                'error': f'Between 1 and {MAX_BULK_SPACES} spaces can be created at once'
+            }), 400
+        if specs is None:
+            specs = [{
+                'space_type': data['space_type'],
+                'state': data.get('state', 'unoccupied'),
+                'extra_charge': data.get('extra_charge', 0.0)
+            }] * count
+        
+        # Check if parking lot exists (once for the whole batch)
+        lot = ParkingLot.query.get(data['lot_id'])
+        if not lot:
+            return jsonify({
+                'success': False,
+                'error': 'Parking lot not found'
+            }), 404
+        
+        rows = [{
+            'space_type': SpaceType(spec['space_type']),
+            'state': SpaceState(spec.get('state', 'unoccupied')),
+            'extra_charge': spec.get('extra_charge', 0.0)
+        } for spec in specs]
+        
+        space_ids = _insert_spaces(lot.id, rows)
+        
+        # Bulk inserts bypass the unit of work, so report the new spaces explicitly
+        for space_id, row in zip(space_ids, rows):
+            space_events.record_change(db.session, space_id, lot.id, row['space_type'], None, row['state'])
+        
+        db.session.commit()
+        
+        return jsonify({
+            'success': True,
+            'data': {
+                'lot_id': lot.id,
+                'count': len(space_ids),
+                'space_ids': space_ids
+            },
+            'message': f'{len(space_ids)} parking spaces created successfully'
+        }), 201
+        
+    except (ValueError, KeyError) as e:
+        db.session.rollback()
+        return jsonify({
+            'success': False,
+            'error': f'Invalid space specification: {e}'
+        }), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
 @parking_spaces_bp.route('/<int:space_id>', methods=['PUT'])
 def update_parking_space(space_id):
     """Update a parking space"""
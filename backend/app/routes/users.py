@@ -1,6 +1,7 @@
 from flask import Blueprint, request, jsonify
 from app.extensions import db
 from app.models.user import User, UserRole
+from app.services.occupancy_service import OccupancyService
 from sqlalchemy.exc import IntegrityError
 
 users_bp = Blueprint('users', __name__)
@@ -131,27 +132,20 @@ def get_user(user_id):
 def get_user_vehicles(user_id):
     """Get all vehicles for a specific user with optional occupancy filter"""
     try:
-        user = User.query.get_or_404(user_id)
-        
         # Check if we should filter by occupancy status
         occupancy_filter = request.args.get('occupancy', None)  # 'active', 'none', or None for all
         
+        rows = OccupancyService.get_vehicles_with_active_occupancy(user_id, occupancy_filter)
+        if not rows:
+            # Only an empty result needs a second query, to tell a missing user apart
+            User.query.get_or_404(user_id)
+        
         vehicles_data = []
-        from app.models.occupancy import Occupancy, OccupancyStatus
-        for vehicle in user.vehicles:
-            active_occupancy = Occupancy.query.filter_by(
-                vehicle_id=vehicle.id,
-                status=OccupancyStatus.ACTIVE
-            ).first()
-            
-            # Apply filter if specified
-            if occupancy_filter == 'active' and not active_occupancy:
-                continue  # Skip vehicles without active occupancy
-            elif occupancy_filter == 'none' and active_occupancy:
-                continue  # Skip vehicles with active occupancy
-            
+        for vehicle, occupancy_id, space_id in rows:
             vehicle_dict = vehicle.to_dict()
-            vehicle_dict['has_active_occupancy'] = active_occupancy is not None
+            vehicle_dict['has_active_occupancy'] = occupancy_id is not None
+            vehicle_dict['active_occupancy_id'] = occupancy_id
+            vehicle_dict['active_space_id'] = space_id
             
             vehicles_data.append(vehicle_dict)
         
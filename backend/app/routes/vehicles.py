@@ -2,13 +2,15 @@ from flask import Blueprint, request, jsonify
 from app.extensions import db
 from app.models.vehicle import Vehicle, VehicleType
 from app.models.user import User
+from app.utils.fields import get_fields_arg, select_fields
 
 vehicles_bp = Blueprint('vehicles', __name__)
 
 @vehicles_bp.route('/', methods=['GET'])
 def get_vehicles():
-    """Get all vehicles with optional filtering"""
+    """Get all vehicles with optional filtering, or only the columns in ?fields="""
     try:
+        fields = get_fields_arg(Vehicle)
         owner_id = request.args.get('owner_id', type=int)
         vehicle_type = request.args.get('vehicle_type')
         
@@ -19,14 +21,23 @@ def get_vehicles():
         if vehicle_type:
             query = query.filter(Vehicle.vehicle_type == VehicleType(vehicle_type))
         
-        vehicles = query.all()
+        if fields:
+            query, serialize = select_fields(query, Vehicle, fields)
+            vehicles = [serialize(row) for row in query]
+        else:
+            vehicles = [vehicle.to_dict() for vehicle in query]
         
         return jsonify({
             'success': True,
-            'data': [vehicle.to_dict() for vehicle in vehicles],
+            'data': vehicles,
             'count': len(vehicles)
         })
         
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
     except Exception as e:
         return jsonify({
             'success': False,
@@ -35,9 +46,14 @@ def get_vehicles():
 
 @vehicles_bp.route('/<string:vehicle_id>', methods=['GET'])
 def get_vehicle(vehicle_id):
-    """Get a specific vehicle by ID"""
+    """Get a specific vehicle by registration number, matched however it is spaced, dashed or cased"""
     try:
-        vehicle = Vehicle.query.get_or_404(vehicle_id)
+        vehicle = Vehicle.find_by_plate(vehicle_id)
+        if not vehicle:
+            return jsonify({
+                'success': False,
+                'error': 'Vehicle not found'
+            }), 404
         return jsonify({
             'success': True,
             'data': vehicle.to_dict()
@@ -63,8 +79,8 @@ def create_vehicle():
                     'error': f'Missing required field: {field}'
                 }), 400
         
-        # Check if vehicle already exists - FIXED: query by vehicle_id field, not primary key
-        existing_vehicle = Vehicle.query.filter_by(vehicle_id=data['vehicle_id']).first()
+        # Check if vehicle already exists, including the same plate written with other spacing or case
+        existing_vehicle = Vehicle.find_by_plate(data['vehicle_id'])
         if existing_vehicle:
             return jsonify({
                 'success': False,
@@ -96,6 +112,13 @@ def create_vehicle():
             'message': 'Vehicle registered successfully'
         }), 201
         
+    except ValueError as e:
+        # An unknown vehicle_type or a registration without letters or digits
+        db.session.rollback()
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
     except Exception as e:
         db.session.rollback()
         return jsonify({
@@ -105,9 +128,14 @@ def create_vehicle():
 
 @vehicles_bp.route('/<string:vehicle_id>', methods=['PUT'])
 def update_vehicle(vehicle_id):
-    """Update a vehicle"""
+    """Update a vehicle, looked up by registration number"""
     try:
-        vehicle = Vehicle.query.get_or_404(vehicle_id)
+        vehicle = Vehicle.find_by_plate(vehicle_id)
+        if not vehicle:
+            return jsonify({
+                'success': False,
+                'error': 'Vehicle not found'
+            }), 404
         data = request.get_json()
         
         if 'owner_id' in data:
@@ -141,14 +169,19 @@ def update_vehicle(vehicle_id):
 
 @vehicles_bp.route('/<string:vehicle_id>', methods=['DELETE'])
 def delete_vehicle(vehicle_id):
-    """Delete a vehicle"""
+    """Delete a vehicle, looked up by registration number"""
     try:
-        vehicle = Vehicle.query.get_or_404(vehicle_id)
+        vehicle = Vehicle.find_by_plate(vehicle_id)
+        if not vehicle:
+            return jsonify({
+                'success': False,
+                'error': 'Vehicle not found'
+            }), 404
         
         # Check if vehicle has active occupancies
         from app.models.occupancy import Occupancy, OccupancyStatus
         active_occupancy = Occupancy.query.filter(
-            Occupancy.vehicle_id == vehicle_id,
+            Occupancy.vehicle_id == vehicle.id,
             Occupancy.status == OccupancyStatus.ACTIVE
         ).first()
         
@@ -0,0 +1,194 @@
+from app.extensions import db
+from app.models.parking_lot import ParkingLot
+from app.models.parking_space import SpaceState, SpaceType
+from app.services import space_events
+import asyncio
+import json
+import logging
+import os
+import queue
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+KEEP_ALIVE = ': keep-alive\n\n'
+
+AVAILABILITY_KEYS = {
+    SpaceType.TWO_WHEELER: 'available_2w_spaces',
+    SpaceType.FOUR_WHEELER: 'available_4w_spaces',
+}
+
+class Subscription:
+    """One SSE viewer: a bounded queue of (event, data) plus an optional lot filter
+    
+    A stream served from a thread waits on the queue itself. A stream served
+    on an event loop passes its loop, and is woken through it, so it holds
+    no thread while it waits.
+    """
+    
+    def __init__(self, lot_ids, max_queue, loop=None):
+        self.lot_ids = set(lot_ids) if lot_ids else None
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.overflowed = False
+        self._loop = loop
+        self._ready = asyncio.Event() if loop else None
+    
+    def wants(self, lot_id):
+        return self.lot_ids is None or lot_id in self.lot_ids
+    
+    def put(self, item):
+        """Queue an (event, data) without blocking; a full queue marks the subscriber overflowed"""
+        try:
+            self.queue.put_nowait(item)
+        except queue.Full:
+            self.overflowed = True
+        if self._loop is not None:
+            try:
+                self._loop.call_soon_threadsafe(self._ready.set)
+            except RuntimeError:
+                pass  # the loop has closed, and the stream with it
+    
+    def _message(self, item):
+        if self.overflowed:
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.overflowed = False
+            return format_sse('resync', {})
+        return format_sse(*item)
+    
+    def next_message(self, timeout):
+        """The next SSE message, or a keep-alive comment after timeout seconds"""
+        try:
+            return self._message(self.queue.get(timeout=timeout))
+        except queue.Empty:
+            return KEEP_ALIVE
+    
+    async def next_message_async(self, timeout):
+        """next_message() for a subscription made with a loop, awaited on that loop"""
+        while True:
+            try:
+                return self._message(self.queue.get_nowait())
+            except queue.Empty:
+                pass
+            if self._ready.is_set():
+                # Woken for an item already taken, look again before waiting
+                self._ready.clear()
+                continue
+            try:
+                await asyncio.wait_for(self._ready.wait(), timeout)
+            except asyncio.TimeoutError:
+                return KEEP_ALIVE
+
+class AvailabilityBroadcaster:
+    """In-process fan-out of per-lot availability deltas to SSE subscribers
+
+    Deltas are computed from the space changes of each commit, so viewers
+    cost no queries after their initial snapshot. A subscriber that falls
+    behind is never allowed to block a commit: when its queue is full the
+    event is dropped and the subscriber is told to resynchronize instead.
+    
+    Deltas only cover commits made by this process. While it has
+    subscribers, a thread per process therefore reads the availability of
+    every lot once each SSE_SNAPSHOT_SECONDS and sends it to all of them as
+    a fresh snapshot, which brings in other workers' commits.
+    """
+    
+    def __init__(self):
+        self._app = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self._subscribers = set()
+    
+    def init_app(self, app):
+        app.config.setdefault('SSE_SNAPSHOT_SECONDS', 10)
+        self._app = app
+    
+    @property
+    def subscriber_count(self):
+        return len(self._subscribers)
+    
+    def subscribe(self, lot_ids=None, max_queue=100, loop=None):
+        subscription = Subscription(lot_ids, max_queue, loop)
+        with self._lock:
+            self._subscribers.add(subscription)
+            # Threads do not survive a fork, so a forked worker starts its own
+            if self._pid != os.getpid() and self._app and self._app.config['SSE_SNAPSHOT_SECONDS'] > 0:
+                self._pid = os.getpid()
+                threading.Thread(target=self._run, name='availability-snapshots', daemon=True).start()
+        return subscription
+    
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+    
+    @staticmethod
+    def build_deltas(changes):
+        """Turn a commit's space changes into {lot_id: availability delta}"""
+        deltas = {}
+        for change in changes:
+            delta = (change.new_state == SpaceState.UNOCCUPIED) - (change.old_state == SpaceState.UNOCCUPIED)
+            lot = deltas.setdefault(change.lot_id, {
+                'lot_id': change.lot_id,
+                'available_2w_spaces': 0,
+                'available_4w_spaces': 0,
+                'total_available_spaces': 0,
+                'spaces': []
+            })
+            lot[AVAILABILITY_KEYS[change.space_type]] += delta
+            lot['total_available_spaces'] += delta
+            lot['spaces'].append({
+                'id': change.space_id,
+                'space_type': change.space_type.value,
+                'state': change.new_state.value if change.new_state else None
+            })
+        return deltas
+    
+    def _send(self, event, data_for):
+        """Queue (event, data_for(subscription)) for every subscriber that gets any data"""
+        with self._lock:
+            subscribers = list(self._subscribers)
+        
+        for subscription in subscribers:
+            data = data_for(subscription)
+            if data:
+                subscription.put((event, data))
+    
+    def publish_changes(self, changes):
+        if not self._subscribers:
+            return
+        
+        deltas = self.build_deltas(changes)
+        self._send('availability', lambda subscription: [
+            delta for lot_id, delta in deltas.items() if subscription.wants(lot_id)
+        ])
+    
+    def publish_snapshot(self, snapshot):
+        """Send {lot_id: availability} of every lot; it replaces what subscribers have"""
+        self._send('snapshot', lambda subscription: {
+            lot_id: availability for lot_id, availability in snapshot.items() if subscription.wants(lot_id)
+        })
+    
+    def _run(self):
+        interval = self._app.config['SSE_SNAPSHOT_SECONDS']
+        with self._app.app_context():
+            while True:
+                time.sleep(interval)
+                if not self._subscribers:
+                    continue
+                try:
+                    # Full lots must read 0 rather than keep their last count
+                    snapshot = ParkingLot.get_availability_by_lot(all_lots=True)
+                except Exception:
+                    logger.exception('Availability snapshot failed')
+                    continue
+                finally:
+                    db.session.remove()
+                self.publish_snapshot(snapshot)
+
+def format_sse(event, data):
+    """Encode one Server-Sent Events message"""
+    return f'event: {event}\ndata: {json.dumps(data)}\n\n'
+
+availability_broadcaster = AvailabilityBroadcaster()
+space_events.subscribe(availability_broadcaster.publish_changes)
@@ -1,8 +1,9 @@
 from app.extensions import db
 from app.models.billing import Billing, PaymentStatus
 from app.models.occupancy import Occupancy
-from app.models.parking_space import ParkingSpace
 from app.models.parking_lot import ParkingLot
+from app.services.rate_cache import rate_cache
+from app.services.tariff_service import tariff_cache, tariff_timezone
 from datetime import datetime, timezone
 
 class BillingService:
@@ -22,23 +23,26 @@ class BillingService:
         if exit_time.tzinfo is None:
             exit_time = exit_time.replace(tzinfo=timezone.utc)
         
-        duration_hours = (exit_time - entry_time).total_seconds() / 3600
-        
-        # Get space and lot information for rates
-        space = ParkingSpace.query.get(occupancy.space_id)
-        lot = space.parking_lot if space else None
+        # Lot and space rates, usually from the per-process cache
+        rates = rate_cache.get(occupancy.space_id)
         
-        if not lot:
+        if not rates:
             return 0.0
         
-        # Calculate base charge
-        base_rate = float(lot.base_rate)
-        extra_charge = float(space.extra_charge) if space else 0.0
+        # Lots with a tariff are priced by its time bands, caps and grace period
+        tariff = tariff_cache.get(rates.lot_id)
+        if tariff:
+            return tariff.price(entry_time, exit_time, rates.extra_charge, tariff_timezone())
         
-        # Simple calculation: hourly rate * duration
-        total_charge = (base_rate + extra_charge) * max(1, round(duration_hours))
+        return BillingService.compute_charge(rates.base_rate, rates.extra_charge, entry_time, exit_time)
+    
+    @staticmethod
+    def compute_charge(base_rate, extra_charge, entry_time, exit_time):
+        """Charge for a stay from the lot and space rates, without touching the database"""
+        duration_hours = (exit_time - entry_time).total_seconds() / 3600
         
-        return total_charge
+        # Simple calculation: hourly rate * duration
+        return (float(base_rate) + float(extra_charge or 0.0)) * max(1, round(duration_hours))
     
     @staticmethod
     def create_billing_record(occupancy_id, amount, user_id=None):
@@ -66,9 +70,13 @@ class BillingService:
         if not billing:
             return None, "Billing record not found"
         
+        old_status, old_payment_time = billing.payment_status, billing.payment_time
         billing.payment_status = PaymentStatus.PAID
         billing.payment_time = payment_time or datetime.now(timezone.utc)
         
+        from app.services.revenue_service import RevenueService
+        RevenueService.record_status_change(billing, old_status, old_payment_time)
+        
         db.session.commit()
         
         return billing, "Payment processed successfully"
\ No newline at end of file
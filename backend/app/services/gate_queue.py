@@ -0,0 +1,339 @@
+from app.extensions import db
+from app.models.gate_event import ProcessedGateEvent
+from app.services.parking_service import ParkingService
+from datetime import datetime, timedelta, timezone
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+GATE_EVENT_TYPES = ('check_in', 'check_out')
+
+# The time field each event type is billed by
+GATE_EVENT_TIMES = {'check_in': 'entry_time', 'check_out': 'exit_time'}
+
+class QueueFull(Exception):
+    """The journal holds GATE_QUEUE_MAX_DEPTH unfinished events"""
+    
+    def __init__(self, depth):
+        super().__init__(f'Gate event queue is full ({depth} events pending)')
+        self.depth = depth
+
+class GateJournal:
+    """Durable queue of gate events in a local SQLite file
+    
+    Events go through queued -> processing -> succeeded | failed. A claim is
+    a lease: events left processing for longer than the lease (their worker
+    died) are claimed again, so each event is delivered at least once. Any
+    number of threads and processes may share the file.
+    
+    Each journal file gets a random id when it is created; event_key()
+    combines it with an event id into a key that stays unique across hosts
+    and recreated journals.
+    """
+    
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS gate_events (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            operation TEXT NOT NULL,
+            status TEXT NOT NULL,
+            result TEXT,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            accepted_at REAL NOT NULL,
+            claimed_at REAL,
+            finished_at REAL
+        );
+        CREATE INDEX IF NOT EXISTS ix_gate_events_status_id ON gate_events (status, id);
+        CREATE TABLE IF NOT EXISTS journal (id TEXT NOT NULL);
+    """
+    
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._connection().executescript(self.SCHEMA)
+        self.journal_id = self._transaction(self._journal_id)
+    
+    def _connection(self):
+        # One connection per thread, reopened after a fork
+        connection = getattr(self._local, 'connection', None)
+        if connection is None or self._local.pid != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=FULL')  # accepted events survive a power loss
+            self._local.connection, self._local.pid = connection, os.getpid()
+        return connection
+    
+    def _transaction(self, work):
+        """Run work(connection) in one write transaction"""
+        connection = self._connection()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            result = work(connection)
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        connection.execute('COMMIT')
+        return result
+    
+    @staticmethod
+    def _journal_id(connection):
+        row = connection.execute("SELECT id FROM journal").fetchone()
+        if row is None:
+            row = (uuid.uuid4().hex,)
+            connection.execute("INSERT INTO journal (id) VALUES (?)", row)
+        return row[0]
+    
+    def event_key(self, event_id):
+        """Idempotency key of an event, recorded with the changes it made"""
+        return f'{self.journal_id}:{event_id}'
+    
+    def enqueue(self, operations, max_depth):
+        """Append operations as queued events; returns (event ids, pending events)
+        
+        Raises QueueFull instead when they would take the queue past max_depth.
+        """
+        def work(connection):
+            depth = self._depth(connection)
+            if depth + len(operations) > max_depth:
+                raise QueueFull(depth)
+            now = time.time()
+            ids = [
+                connection.execute(
+                    "INSERT INTO gate_events (operation, status, accepted_at) VALUES (?, 'queued', ?)",
+                    (json.dumps(operation), now)
+                ).lastrowid
+                for operation in operations
+            ]
+            return ids, depth + len(ids)
+        return self._transaction(work)
+    
+    def claim(self, limit, lease_seconds):
+        """Mark up to limit events processing, oldest first; returns [(id, operation)]"""
+        def work(connection):
+            now = time.time()
+            rows = connection.execute(
+                "SELECT id, operation FROM gate_events "
+                "WHERE status IN ('queued', 'processing') AND (status = 'queued' OR claimed_at < ?) "
+                "ORDER BY id LIMIT ?",
+                (now - lease_seconds, limit)
+            ).fetchall()
+            connection.executemany(
+                "UPDATE gate_events SET status = 'processing', claimed_at = ?, attempts = attempts + 1 WHERE id = ?",
+                [(now, event_id) for event_id, _ in rows]
+            )
+            return [(event_id, json.loads(operation)) for event_id, operation in rows]
+        return self._transaction(work)
+    
+    def complete(self, outcomes):
+        """Record the process_batch() result of each (event id, result)"""
+        now = time.time()
+        self._transaction(lambda connection: connection.executemany(
+            "UPDATE gate_events SET status = ?, result = ?, finished_at = ? WHERE id = ?",
+            [('succeeded' if result['success'] else 'failed', json.dumps(result, default=str), now, event_id)
+             for event_id, result in outcomes]
+        ))
+    
+    def release(self, event_ids, error, max_attempts):
+        """Queue events again after their batch failed, or fail those out of attempts"""
+        now = time.time()
+        result = json.dumps({'success': False, 'error': error})
+        self._transaction(lambda connection: connection.executemany(
+            "UPDATE gate_events SET "
+            "status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'queued' END, "
+            "result = CASE WHEN attempts >= ? THEN ? END, "
+            "finished_at = CASE WHEN attempts >= ? THEN ? END, "
+            "claimed_at = NULL WHERE id = ?",
+            [(max_attempts, max_attempts, result, max_attempts, now, event_id) for event_id in event_ids]
+        ))
+    
+    def get(self, event_ids):
+        """Event dicts of the given ids that still exist, in id order"""
+        event_ids = list(event_ids)
+        if not event_ids:
+            return []
+        rows = self._connection().execute(
+            "SELECT id, status, result, attempts, accepted_at, finished_at FROM gate_events "
+            f"WHERE id IN ({', '.join('?' * len(event_ids))}) ORDER BY id",
+            event_ids
+        ).fetchall()
+        return [{
+            'id': event_id,
+            'status': status,
+            'result': json.loads(result) if result else None,
+            'attempts': attempts,
+            'accepted_at': _isoformat(accepted_at),
+            'finished_at': _isoformat(finished_at)
+        } for event_id, status, result, attempts, accepted_at, finished_at in rows]
+    
+    @staticmethod
+    def _depth(connection):
+        return connection.execute(
+            "SELECT count(*) FROM gate_events WHERE status IN ('queued', 'processing')"
+        ).fetchone()[0]
+    
+    def depth(self):
+        """Events accepted but not finished yet"""
+        return self._depth(self._connection())
+    
+    def prune(self, finished_before):
+        """Delete finished events older than finished_before (a time.time() value)"""
+        self._transaction(lambda connection: connection.execute(
+            "DELETE FROM gate_events WHERE status IN ('succeeded', 'failed') AND finished_at < ?",
+            (finished_before,)
+        ))
+
+def _isoformat(timestamp):
+    return datetime.fromtimestamp(timestamp, timezone.utc).isoformat() if timestamp is not None else None
+
+class GateQueue:
+    """Accept gate events into the journal and drain them with background threads
+    
+    Each serving process runs GATE_QUEUE_WORKERS drain threads, started by
+    start_workers() once the process exists (gunicorn's post_fork, the ASGI
+    lifespan). A thread claims up to GATE_QUEUE_BATCH_SIZE events and applies
+    them with ParkingService.process_batch(), so a burst costs one commit per
+    batch rather than one per event. Events of a batch whose commit fails
+    are queued again, up to GATE_QUEUE_MAX_ATTEMPTS claims. Each event's
+    key is committed with its changes, so a redelivered event is not
+    applied twice.
+    """
+    
+    def __init__(self):
+        self.journal = None
+        self._app = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._last_prune = 0
+    
+    @property
+    def enabled(self):
+        return self.journal is not None
+    
+    def init_app(self, app):
+        app.config.setdefault('GATE_QUEUE_ENABLED', False)
+        app.config.setdefault('GATE_QUEUE_PATH', None)
+        app.config.setdefault('GATE_QUEUE_WORKERS', 2)
+        app.config.setdefault('GATE_QUEUE_BATCH_SIZE', 50)
+        app.config.setdefault('GATE_QUEUE_MAX_DEPTH', 10000)
+        app.config.setdefault('GATE_QUEUE_RETRY_AFTER', 5)
+        app.config.setdefault('GATE_QUEUE_LEASE_SECONDS', 60)
+        app.config.setdefault('GATE_QUEUE_MAX_ATTEMPTS', 5)
+        app.config.setdefault('GATE_QUEUE_POLL_SECONDS', 1)
+        app.config.setdefault('GATE_QUEUE_RETENTION_SECONDS', 86400)
+        if not app.config['GATE_QUEUE_ENABLED']:
+            return
+        
+        self._app = app
+        self.journal = GateJournal(app.config['GATE_QUEUE_PATH'] or os.path.join(app.instance_path, 'gate_queue.sqlite3'))
+    
+    def start_workers(self):
+        """Start this process's drain threads unless they are running
+        
+        Called by the server in every worker process, not at import: a
+        preloaded app is imported by the gunicorn master, whose threads the
+        forked workers would not inherit, and which must not drain itself.
+        """
+        if not self.enabled or self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            for n in range(self._app.config['GATE_QUEUE_WORKERS']):
+                threading.Thread(target=self._run, name=f'gate-queue-{n}', daemon=True).start()
+    
+    @staticmethod
+    def validate(operation):
+        """Reject events that can never be applied before they are accepted"""
+        if not isinstance(operation, dict):
+            raise ValueError('Each gate event must be an object')
+        if operation.get('type') not in GATE_EVENT_TYPES:
+            raise ValueError("type must be 'check_in' or 'check_out'")
+        if operation['type'] == 'check_out' and not (operation.get('occupancy_id') or operation.get('vehicle_registration')):
+            raise ValueError('Missing required field: occupancy_id or vehicle_registration')
+    
+    def submit(self, operations):
+        """Journal the operations; returns (event ids, pending events) or raises QueueFull
+        
+        Events without an entry_time/exit_time are stamped with the time they
+        were accepted, so the drain delay is never billed.
+        """
+        for operation in operations:
+            self.validate(operation)
+        accepted_at = datetime.now(timezone.utc).isoformat()
+        operations = [
+            {**operation, GATE_EVENT_TIMES[operation['type']]: operation.get(GATE_EVENT_TIMES[operation['type']]) or accepted_at}
+            for operation in operations
+        ]
+        result = self.journal.enqueue(operations, self._app.config['GATE_QUEUE_MAX_DEPTH'])
+        self._wakeup.set()
+        return result
+    
+    def drain_once(self):
+        """Claim one batch of events and apply it; returns how many events were claimed"""
+        config = self._app.config
+        events = self.journal.claim(config['GATE_QUEUE_BATCH_SIZE'], config['GATE_QUEUE_LEASE_SECONDS'])
+        if not events:
+            return 0
+        
+        event_ids = [event_id for event_id, _ in events]
+        try:
+            results = ParkingService.process_batch(
+                [operation for _, operation in events],
+                keys=[self.journal.event_key(event_id) for event_id in event_ids]
+            )
+        except Exception as e:
+            db.session.rollback()
+            self.journal.release(event_ids, str(e), config['GATE_QUEUE_MAX_ATTEMPTS'])
+            raise
+        finally:
+            db.session.remove()
+        
+        self.journal.complete(zip(event_ids, results))
+        return len(events)
+    
+    def _prune(self):
+        now = time.time()
+        if now - self._last_prune >= 60:
+            self._last_prune = now
+            retention = self._app.config['GATE_QUEUE_RETENTION_SECONDS']
+            self.journal.prune(now - retention)
+            # Keys must outlive every redelivery of their event, which ends well within the retention
+            try:
+                ProcessedGateEvent.query.filter(
+                    ProcessedGateEvent.created_at < datetime.utcnow() - timedelta(seconds=retention)
+                ).delete(synchronize_session=False)
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                raise
+            finally:
+                db.session.remove()
+    
+    def _run(self):
+        poll = self._app.config['GATE_QUEUE_POLL_SECONDS']
+        with self._app.app_context():
+            while True:
+                # Cleared before claiming, so an event submitted meanwhile still wakes the wait below
+                self._wakeup.clear()
+                try:
+                    if self.drain_once():
+                        continue
+                    self._prune()
+                except Exception:
+                    logger.exception('Gate queue batch failed')
+                    time.sleep(poll)  # back off while the database is unavailable
+                    continue
+                # Other processes' events and expired leases are found by polling
+                self._wakeup.wait(poll)
+
+gate_queue = GateQueue()
@@ -0,0 +1,48 @@
+from app.models.parking_lot import ParkingLot
+from app.models.parking_space import ParkingSpace
+from sqlalchemy import event, inspect, update
+from sqlalchemy.orm import Session
+
+# Every commit that changes a lot or any of its spaces increments the lot's
+# version in the same transaction. Listing ETags fold in sum(version), which,
+# unlike max(updated_at) stamped at flush time, moves with every commit
+# whatever order concurrent transactions commit in.
+
+@event.listens_for(Session, 'after_flush')
+def _collect_changed_lots(session, flush_context):
+    lot_ids = session.info.setdefault('changed_lots', set())
+    for obj in session.new | session.dirty | session.deleted:
+        if obj in session.dirty and not session.is_modified(obj, include_collections=False):
+            continue
+        if isinstance(obj, ParkingSpace):
+            lot_ids.add(obj.lot_id)
+            lot_ids.update(inspect(obj).attrs.lot_id.history.deleted)
+        elif isinstance(obj, ParkingLot) and obj in session.dirty:
+            lot_ids.add(obj.id)
+    lot_ids.discard(None)
+    if not lot_ids:
+        session.info.pop('changed_lots')
+
+@event.listens_for(Session, 'before_commit')
+def _bump_lot_versions(session):
+    if session.in_nested_transaction():
+        return  # a savepoint: the outermost commit bumps
+    session.flush()
+    lot_ids = session.info.pop('changed_lots', set())
+    # Spaces added with Core inserts are only known through space_events.record_change()
+    lot_ids |= {change.lot_id for change in session.info.get('space_changes', ())}
+    if lot_ids:
+        # Ascending ids, so concurrent commits lock the lot rows in the same order;
+        # updated_at is kept, it reports edits of the lot itself
+        lots = ParkingLot.__table__
+        session.execute(
+            update(lots).where(lots.c.id.in_(sorted(lot_ids))).values(
+                version=lots.c.version + 1, updated_at=lots.c.updated_at
+            )
+        )
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _discard_changed_lots(session, previous_transaction):
+    # Lots of a rolled back savepoint are kept: an extra bump only costs a cache miss
+    if not previous_transaction.nested:
+        session.info.pop('changed_lots', None)
@@ -1,14 +1,27 @@
 from app.extensions import db
 from app.models.occupancy import Occupancy, OccupancyStatus
 from app.models.parking_space import ParkingSpace, SpaceState
+from app.models.vehicle import Vehicle
+from sqlalchemy.orm import joinedload
 from datetime import datetime, timedelta, timezone
 
 class OccupancyService:
     
+    @staticmethod
+    def with_vehicle_details(query):
+        """Load each occupancy's vehicle and vehicle owner in the same query
+
+        Occupancy.to_dict() reads both, which would otherwise cost two lazy
+        loads per row.
+        """
+        return query.options(joinedload(Occupancy.vehicle).joinedload(Vehicle.owner))
+    
     @staticmethod
     def get_active_occupancies(space_id=None, vehicle_id=None):
         """Get all active occupancies with optional filters"""
-        query = Occupancy.query.filter(Occupancy.status == OccupancyStatus.ACTIVE)
+        query = OccupancyService.with_vehicle_details(
+            Occupancy.query.filter(Occupancy.status == OccupancyStatus.ACTIVE)
+        )
         
         if space_id:
             query = query.filter(Occupancy.space_id == space_id)
@@ -21,8 +34,12 @@ class OccupancyService:
     @staticmethod
     def reserve_space(space_id, user_id=None):
         """Reserve a parking space by creating an occupancy record and marking space as reserved"""
-        space = ParkingSpace.query.get(space_id)
+        from app.services.parking_service import ParkingService
+        
+        # Lock the space so two concurrent reservations cannot both succeed
+        space = ParkingService.lock_space(space_id)
         if not space or space.state == SpaceState.OCCUPIED:
+            db.session.rollback()
             return None, "Space is not available for reservation"
         
         try:
@@ -47,9 +64,11 @@ class OccupancyService:
             return None, f"Error reserving space: {str(e)}"
     
     @staticmethod
-    def get_occupancy_history(vehicle_id=None, start_date=None, end_date=None):
-        """Get occupancy history with filters"""
-        query = Occupancy.query.filter(Occupancy.status == OccupancyStatus.COMPLETED)
+    def occupancy_history_query(vehicle_id=None, start_date=None, end_date=None):
+        """Build the unordered query for completed occupancies matching the filters"""
+        query = OccupancyService.with_vehicle_details(
+            Occupancy.query.filter(Occupancy.status == OccupancyStatus.COMPLETED)
+        )
         
         if vehicle_id:
             query = query.filter(Occupancy.vehicle_id == vehicle_id)
@@ -60,8 +79,42 @@ class OccupancyService:
         if end_date:
             query = query.filter(Occupancy.entry_time <= end_date)
         
+        return query
+    
+    @staticmethod
+    def get_occupancy_history(vehicle_id=None, start_date=None, end_date=None):
+        """Get occupancy history with filters"""
+        query = OccupancyService.occupancy_history_query(vehicle_id, start_date, end_date)
         return query.order_by(Occupancy.entry_time.desc()).all()
     
+    @staticmethod
+    def get_vehicles_with_active_occupancy(owner_id, occupancy_filter=None):
+        """A user's vehicles with their active occupancy, if any, in one outer-join query
+        
+        Returns (vehicle, occupancy_id, space_id) tuples ordered by vehicle id,
+        the last two None for parked-out vehicles. occupancy_filter 'active'
+        or 'none' keeps only vehicles with or without an active occupancy.
+        """
+        query = db.session.query(Vehicle, Occupancy.id, Occupancy.space_id).outerjoin(
+            Occupancy, db.and_(
+                Occupancy.vehicle_id == Vehicle.id,
+                Occupancy.status == OccupancyStatus.ACTIVE
+            )
+        ).filter(Vehicle.owner_id == owner_id)
+        
+        if occupancy_filter == 'active':
+            query = query.filter(Occupancy.id.isnot(None))
+        elif occupancy_filter == 'none':
+            query = query.filter(Occupancy.id.is_(None))
+        
+        rows, seen = [], set()
+        for vehicle, occupancy_id, space_id in query.order_by(Vehicle.id, Occupancy.id):
+            # Keep one row per vehicle should it ever have two active occupancies
+            if vehicle.id not in seen:
+                seen.add(vehicle.id)
+                rows.append((vehicle, occupancy_id, space_id))
+        return rows
+    
     # In your OccupancyService class
     @classmethod
     def reserve_and_checkin(cls, space_id, vehicle_registration, entry_time=None, user_id=None):
@@ -1,36 +1,84 @@
 from app.extensions import db
-from app.models.parking_space import ParkingSpace, SpaceState
+from app.models.gate_event import ProcessedGateEvent
+from app.models.parking_space import ParkingSpace, SpaceState, SpaceType
 from app.models.occupancy import Occupancy, OccupancyStatus
-from app.models.vehicle import Vehicle, VehicleType
+from app.models.vehicle import Vehicle, VehicleType, normalize_plate
+from app.services import space_events
+from app.services.plate_cache import plate_cache
+from app.services.space_allocator import space_allocator
 from sqlalchemy.exc import SQLAlchemyError
 from datetime import datetime, timezone
+import json
 
 class ParkingService:
     
     @staticmethod
-    def get_available_spaces(lot_id=None, space_type=None):
-        """Get available parking spaces with optional filters"""
-        query = ParkingSpace.query.filter(ParkingSpace.state == SpaceState.UNOCCUPIED)
+    def available_spaces_query(lot_id=None, space_type=None):
+        """Select available parking spaces with optional filters"""
+        query = db.select(ParkingSpace).where(ParkingSpace.state == SpaceState.UNOCCUPIED)
         
         if lot_id:
-            query = query.filter(ParkingSpace.lot_id == lot_id)
+            query = query.where(ParkingSpace.lot_id == lot_id)
         
         if space_type:
-            query = query.filter(ParkingSpace.space_type == space_type)
+            query = query.where(ParkingSpace.space_type == space_type)
         
-        return query.all()
+        return query
+    
+    @staticmethod
+    def get_available_spaces(lot_id=None, space_type=None):
+        """Get available parking spaces with optional filters"""
+        return db.session.execute(
+            ParkingService.available_spaces_query(lot_id, space_type)
+        ).scalars().all()
+    
+    @staticmethod
+    def lock_space(space_id, skip_locked=False):
+        """Load a space with SELECT ... FOR UPDATE, holding the row lock until commit
+
+        With skip_locked, a space locked by another transaction is reported
+        as missing instead of waiting for that transaction to finish.
+        """
+        return ParkingSpace.query.filter(
+            ParkingSpace.id == space_id
+        ).with_for_update(skip_locked=skip_locked).populate_existing().first()
+    
+    @staticmethod
+    def claim_free_space(lot_id, space_type):
+        """Lock one unoccupied space of a lot, skipping spaces other check-ins are claiming"""
+        return ParkingSpace.query.filter(
+            ParkingSpace.lot_id == lot_id,
+            ParkingSpace.space_type == space_type,
+            ParkingSpace.state == SpaceState.UNOCCUPIED
+        ).order_by(ParkingSpace.id).limit(1).with_for_update(skip_locked=True).populate_existing().first()
     
     @staticmethod
-    def check_in_vehicle(space_id, vehicle_registration, entry_time=None, user_id=None):
-        """Check in a vehicle to a parking space"""
+    def check_in_vehicle(space_id, vehicle_registration, entry_time=None, user_id=None,
+                         claimable_states=None, skip_locked=False, commit=True):
+        """Check in a vehicle to a parking space
+
+        claimable_states limits which space states may be checked into;
+        by default any space that is not already occupied is accepted.
+        The space row stays locked until commit, so concurrent check-ins
+        to the same space cannot both succeed.
+
+        With commit=False the changes are only flushed and database errors
+        are raised, leaving the transaction to the caller (see process_batch).
+        """
+        if not normalize_plate(vehicle_registration):
+            return None, "Vehicle registration must contain letters or digits"
+        
         try:
-            # Check if space is available
-            space = ParkingSpace.query.get(space_id)
-            if not space or space.state == SpaceState.OCCUPIED:
+            # Lock the space and check that it is still available
+            space = ParkingService.lock_space(space_id, skip_locked=skip_locked)
+            if (not space or space.state == SpaceState.OCCUPIED
+                    or (claimable_states is not None and space.state not in claimable_states)):
+                if commit:
+                    db.session.rollback()  # Release the row lock
                 return None, "Space is not available"
             
-            # Check if vehicle exists, if not create a temporary one (for walk-ins)
-            vehicle = Vehicle.query.filter_by(vehicle_id=vehicle_registration).first()
+            # Check if vehicle exists (repeat plates come from the plate cache), if not create a temporary one (for walk-ins)
+            vehicle = plate_cache.get(vehicle_registration)
             if not vehicle:
                 # For walk-ins, create a temporary vehicle record
                 vehicle = Vehicle(
@@ -53,7 +101,8 @@ class ParkingService:
             occupancy = Occupancy(
                 space_id=space_id,
                 vehicle_id=vehicle.id,  # Use the vehicle's integer ID
-                user_id=user_id or (vehicle.owner_id if vehicle.owner else None),  # Use provided user_id or vehicle owner
+                # Use provided user_id or the vehicle owner, read by the insert itself (not cached)
+                user_id=user_id or db.select(Vehicle.owner_id).where(Vehicle.id == vehicle.id).scalar_subquery(),
                 entry_time=entry_time,
                 status=OccupancyStatus.ACTIVE
             )
@@ -62,20 +111,78 @@ class ParkingService:
             space.state = SpaceState.OCCUPIED
             
             db.session.add(occupancy)
-            db.session.commit()
+            if commit:
+                db.session.commit()
+            else:
+                db.session.flush()
             
             return occupancy, "Vehicle checked in successfully"
             
         except SQLAlchemyError as e:
+            # A cached vehicle may have been deleted by another process
+            plate_cache.invalidate([normalize_plate(vehicle_registration)])
+            if not commit:
+                raise
             db.session.rollback()
             return None, f"Database error: {str(e)}"
     
     @staticmethod
-    def check_out_vehicle(occupancy_id, exit_time=None):
-        """Check out a vehicle and calculate charges"""
+    def check_in_to_lot(lot_id, vehicle_registration, space_type=None, entry_time=None, user_id=None, commit=True):
+        """Check in a vehicle to any free space of a lot, picked by the space allocator"""
+        if space_type is None:
+            # Match the space to the vehicle when it is already registered
+            vehicle = plate_cache.get(vehicle_registration)
+            vehicle_type = vehicle.vehicle_type if vehicle else VehicleType.FOUR_WHEELER
+            space_type = SpaceType(vehicle_type.value)
+        
+        while True:
+            space_id = space_allocator.acquire(lot_id, space_type)
+            if space_id is None:
+                # The free lists may miss spaces freed by other processes
+                space = ParkingService.claim_free_space(lot_id, space_type)
+                if not space:
+                    if commit:
+                        db.session.rollback()
+                    return None, "No available space in this lot"
+                space_id = space.id
+            
+            try:
+                occupancy, message = ParkingService.check_in_vehicle(
+                    space_id=space_id,
+                    vehicle_registration=vehicle_registration,
+                    entry_time=entry_time,
+                    user_id=user_id,
+                    claimable_states=(SpaceState.UNOCCUPIED,),
+                    skip_locked=True,
+                    commit=commit
+                )
+            except SQLAlchemyError:
+                space_allocator.release(lot_id, space_type, space_id)
+                raise
+            
+            if occupancy:
+                return occupancy, message
+            if message != "Space is not available":
+                # The space is still free, only this check-in failed
+                space_allocator.release(lot_id, space_type, space_id)
+                return None, message
+            # Stale entry or a space another gate is claiming right now: try the next one
+    
+    @staticmethod
+    def check_out_vehicle(occupancy_id, exit_time=None, commit=True):
+        """Check out a vehicle and calculate charges
+
+        With commit=False the changes are only flushed and database errors
+        are raised, leaving the transaction to the caller (see process_batch).
+        """
         try:
-            occupancy = Occupancy.query.get(occupancy_id)
+            # Lock the occupancy so concurrent check-outs cannot bill it twice
+            occupancy = Occupancy.query.filter(
+                Occupancy.id == occupancy_id
+            ).with_for_update().populate_existing().first()
             if not occupancy or occupancy.status != OccupancyStatus.ACTIVE:
+                if commit:
+                    db.session.rollback()
                 return None, "Invalid or completed occupancy"
             
             # Set exit time - ensure it's timezone-aware UTC
@@ -92,7 +199,7 @@ class ParkingService:
             occupancy.status = OccupancyStatus.COMPLETED
             
             # Free up the parking space
-            space = ParkingSpace.query.get(occupancy.space_id)
+            space = ParkingService.lock_space(occupancy.space_id)
             space.state = SpaceState.UNOCCUPIED
             
             # Calculate charges
@@ -102,7 +209,10 @@ class ParkingService:
             # Create billing record
             billing = BillingService.create_billing_record(occupancy.id, amount)
             
-            db.session.commit()
+            if commit:
+                db.session.commit()
+            else:
+                db.session.flush()
             
             return {
                 'occupancy': occupancy,
@@ -111,5 +221,135 @@ class ParkingService:
             }, "Vehicle checked out successfully"
             
         except SQLAlchemyError as e:
+            if not commit:
+                raise
+            db.session.rollback()
+            return None, f"Database error: {str(e)}"
+    
+    @staticmethod
+    def active_occupancy_id(vehicle_registration):
+        """Id of the active occupancy of the vehicle registered as vehicle_registration, or None"""
+        vehicle = plate_cache.get(vehicle_registration)
+        if not vehicle:
+            return None
+        row = Occupancy.query.with_entities(Occupancy.id).filter(
+            Occupancy.vehicle_id == vehicle.id,
+            Occupancy.status == OccupancyStatus.ACTIVE
+        ).order_by(Occupancy.entry_time).first()
+        return row.id if row else None
+    
+    @staticmethod
+    def _parse_time(value):
+        return datetime.fromisoformat(value) if value else None
+    
+    @staticmethod
+    def _run_operation(operation):
+        """Apply one batch operation without committing; returns (result, message)"""
+        if not isinstance(operation, dict):
+            raise ValueError('Each operation must be an object')
+        op_type = operation.get('type')
+        
+        if op_type == 'check_in':
+            if not operation.get('vehicle_registration'):
+                raise ValueError('Missing required field: vehicle_registration')
+            entry_time = ParkingService._parse_time(operation.get('entry_time'))
+            
+            if operation.get('space_id'):
+                occupancy, message = ParkingService.check_in_vehicle(
+                    space_id=operation['space_id'],
+                    vehicle_registration=operation['vehicle_registration'],
+                    entry_time=entry_time,
+                    user_id=operation.get('user_id'),
+                    commit=False
+                )
+            elif operation.get('lot_id'):
+                space_type = operation.get('space_type')
+                occupancy, message = ParkingService.check_in_to_lot(
+                    lot_id=operation['lot_id'],
+                    vehicle_registration=operation['vehicle_registration'],
+                    space_type=SpaceType(space_type) if space_type else None,
+                    entry_time=entry_time,
+                    user_id=operation.get('user_id'),
+                    commit=False
+                )
+            else:
+                raise ValueError('check_in needs space_id or lot_id')
+            
+            if not occupancy:
+                return None, message
+            return {'occupancy': occupancy.to_dict()}, message
+        
+        if op_type == 'check_out':
+            occupancy_id = operation.get('occupancy_id')
+            if not occupancy_id and operation.get('vehicle_registration'):
+                # Exit gates read the plate; the occupancy is the one active when the operation is applied
+                occupancy_id = ParkingService.active_occupancy_id(operation['vehicle_registration'])
+                if not occupancy_id:
+                    return None, "No active occupancy for this vehicle"
+            if not occupancy_id:
+                raise ValueError('Missing required field: occupancy_id or vehicle_registration')
+            result, message = ParkingService.check_out_vehicle(
+                occupancy_id=occupancy_id,
+                exit_time=ParkingService._parse_time(operation.get('exit_time')),
+                commit=False
+            )
+            if not result:
+                return None, message
+            return {
+                'occupancy': result['occupancy'].to_dict(),
+                'billing': result['billing'].to_dict(),
+                'amount': result['amount']
+            }, message
+        
+        raise ValueError("type must be 'check_in' or 'check_out'")
+    
+    @staticmethod
+    def process_batch(operations, keys=None):
+        """Apply many check-in/check-out operations in one transaction
+
+        Each operation runs inside its own savepoint, so a failing item is
+        rolled back on its own while the rest are committed together.
+        Returns one {'success', 'data' | 'error', 'message'} dict per operation.
+
+        keys optionally gives each operation an idempotency key. The result
+        is recorded under it in the same transaction, and an operation whose
+        key was recorded before returns that result without running again.
+        """
+        results = []
+        processed = {}
+        if keys is not None:
+            processed = dict(db.session.query(
+                ProcessedGateEvent.event_key, ProcessedGateEvent.result
+            ).filter(ProcessedGateEvent.event_key.in_(keys)))
+        
+        for n, operation in enumerate(operations):
+            key = keys[n] if keys is not None else None
+            if key in processed:
+                results.append(processed[key])
+                continue
+            
+            savepoint = db.session.begin_nested()
+            marker = space_events.mark(db.session)
+            try:
+                data, message = ParkingService._run_operation(operation)
+            except (ValueError, TypeError, SQLAlchemyError) as e:
+                data, message = None, str(e)
+            
+            if data is None:
+                savepoint.rollback()
+                space_events.discard_since(db.session, marker)
+                results.append({'success': False, 'error': message})
+            else:
+                savepoint.commit()
+                results.append({'success': True, 'data': data, 'message': message})
+            
+            if key is not None:
+                db.session.add(ProcessedGateEvent(event_key=key, result=json.loads(json.dumps(results[-1], default=str))))
+        
+        try:
+            db.session.commit()
+        except SQLAlchemyError:
             db.session.rollback()
-            return None, f"Database error: {str(e)}"
\ No newline at end of file
+            raise
+        
+        return results
\ No newline at end of file
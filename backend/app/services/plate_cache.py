@@ -0,0 +1,105 @@
+from app.extensions import db
+from app.models.vehicle import Vehicle, normalize_plate
+from flask import current_app
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+from collections import OrderedDict, namedtuple
+import threading
+import time
+
+# What a gate needs to know about a recognized plate. The owner is left out:
+# it is read with the occupancy insert, so an owner changed elsewhere is never stale
+PlateEntry = namedtuple('PlateEntry', ['id', 'vehicle_type'])
+
+class PlateCache:
+    """Per-process LRU cache of registered vehicles by normalized plate
+    
+    Repeat entries of the same vehicle skip the lookup query. Entries are
+    dropped after any commit that changes a vehicle's plate or type or
+    deletes it, and expire after PLATE_CACHE_TTL seconds so that changes
+    committed by other processes are picked up too. Unknown plates are not
+    cached: they become walk-in vehicles on their first entry.
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # plate -> (PlateEntry, time.monotonic() when loaded)
+        self._generation = 0  # bumped by every invalidation
+    
+    def get(self, registration):
+        """The vehicle registered as registration, loading it with one query on a miss; None if unknown"""
+        plate = normalize_plate(registration)
+        ttl = current_app.config.get('PLATE_CACHE_TTL', 300)
+        with self._lock:
+            entry = self._entries.get(plate)
+            if entry is not None and time.monotonic() - entry[1] < ttl:
+                self._entries.move_to_end(plate)
+                return entry[0]
+            generation = self._generation
+        
+        row = db.session.query(
+            Vehicle.id, Vehicle.vehicle_type
+        ).filter(Vehicle.plate_normalized == plate).first()
+        if row is None:
+            return None
+        
+        vehicle = PlateEntry(*row)
+        # Vehicles inserted by the open transaction vanish if it rolls back
+        if plate in db.session.info.get('new_plates', ()):
+            return vehicle
+        with self._lock:
+            # A row read while an invalidation committed may already be stale
+            if generation == self._generation:
+                self._entries[plate] = (vehicle, time.monotonic())
+                self._entries.move_to_end(plate)
+                while len(self._entries) > current_app.config.get('PLATE_CACHE_SIZE', 10000):
+                    self._entries.popitem(last=False)
+        return vehicle
+    
+    def invalidate(self, plates):
+        """Drop the given normalized plates"""
+        with self._lock:
+            self._generation += 1
+            for plate in plates:
+                self._entries.pop(plate, None)
+    
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+
+def _old_and_new_plates(vehicle):
+    history = inspect(vehicle).attrs.plate_normalized.history
+    return set(history.deleted) | set(history.unchanged) | set(history.added)
+
+@event.listens_for(Session, 'after_flush')
+def _collect_plate_changes(session, flush_context):
+    plates = session.info.setdefault('plate_changes', set())
+    for obj in session.dirty:
+        if isinstance(obj, Vehicle) and session.is_modified(obj, include_collections=False):
+            plates |= _old_and_new_plates(obj)
+    for obj in session.deleted:
+        if isinstance(obj, Vehicle):
+            plates |= _old_and_new_plates(obj)
+    if not plates:
+        session.info.pop('plate_changes')
+    
+    new_plates = {obj.plate_normalized for obj in session.new if isinstance(obj, Vehicle)}
+    if new_plates:
+        session.info.setdefault('new_plates', set()).update(new_plates)
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_plates(session):
+    session.info.pop('new_plates', None)
+    plates = session.info.pop('plate_changes', None)
+    if plates:
+        plate_cache.invalidate(plates)
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _discard_plate_changes(session, previous_transaction):
+    # Changes of a rolled back savepoint are kept: invalidating too much is harmless
+    if not previous_transaction.nested:
+        session.info.pop('plate_changes', None)
+        session.info.pop('new_plates', None)
+
+plate_cache = PlateCache()
@@ -0,0 +1,202 @@
+from app.extensions import db
+from app.models.billing import Billing, PaymentStatus
+from app.models.occupancy import Occupancy, OccupancyStatus
+from app.models.parking_lot import ParkingLot
+from app.models.parking_space import ParkingSpace
+from app.models.tariff import Tariff
+from sqlalchemy import Float, cast, func, update
+from datetime import datetime, timedelta
+import numpy as np
+
+LOAD_BATCH_SIZE = 100000
+SIMULATION_DAYS = 90
+
+class PricingEngine:
+    """Vectorized pricing of many stays at once
+    
+    Applies the same tariff as BillingService.compute_charge,
+    (base_rate + extra_charge) * max(1, round(hours)), to NumPy arrays of
+    stay durations and rates, so whole months of history can be re-priced
+    without a query or a Python call per stay. np.round rounds halves to
+    even exactly like Python's round().
+    """
+    
+    @staticmethod
+    def compute_charges(base_rates, extra_charges, duration_seconds):
+        """Charges for arrays of stays"""
+        hours = np.asarray(duration_seconds, dtype=np.float64) / 3600
+        return (np.asarray(base_rates, dtype=np.float64) + np.asarray(extra_charges, dtype=np.float64)) \
+            * np.maximum(1, np.round(hours))
+    
+    @staticmethod
+    def _duration_seconds(start, end):
+        """SQL expression for the seconds between two timestamps"""
+        if db.engine.dialect.name == 'postgresql':
+            return func.extract('epoch', end - start)
+        return (func.julianday(end) - func.julianday(start)) * 86400
+    
+    @staticmethod
+    def _load(query, columns):
+        """Stream a query into one NumPy array per named column"""
+        chunks = {name: [] for name, _ in columns}
+        result = db.session.execute(
+            query.execution_options(yield_per=LOAD_BATCH_SIZE)
+        )
+        for rows in result.partitions():
+            for (name, dtype), values in zip(columns, zip(*rows)):
+                chunks[name].append(np.array(values, dtype=dtype))
+        return {
+            name: np.concatenate(chunks[name]) if chunks[name] else np.empty(0, dtype=dtype)
+            for name, dtype in columns
+        }
+    
+    @staticmethod
+    def load_completed_stays(start_time, end_time, lot_ids=None):
+        """Completed stays that ended in [start_time, end_time) with their current rates and billed amount
+        
+        Stays in lots with a tariff are left out, as in reprice_pending_bills().
+        """
+        query = db.select(
+            ParkingSpace.lot_id,
+            cast(ParkingLot.base_rate, Float),
+            cast(func.coalesce(ParkingSpace.extra_charge, 0), Float),
+            PricingEngine._duration_seconds(Occupancy.entry_time, Occupancy.exit_time),
+            cast(func.coalesce(Billing.amount, 0), Float)
+        ).select_from(Occupancy).join(
+            ParkingSpace, ParkingSpace.id == Occupancy.space_id
+        ).join(
+            ParkingLot, ParkingLot.id == ParkingSpace.lot_id
+        ).outerjoin(
+            Billing, Billing.occupancy_id == Occupancy.id
+        ).where(
+            Occupancy.status == OccupancyStatus.COMPLETED,
+            Occupancy.exit_time >= start_time,
+            Occupancy.exit_time < end_time,
+            ParkingLot.id.notin_(db.select(Tariff.lot_id))
+        )
+        if lot_ids:
+            query = query.where(ParkingSpace.lot_id.in_(lot_ids))
+        
+        return PricingEngine._load(query, [
+            ('lot_id', np.int64),
+            ('base_rate', np.float64),
+            ('extra_charge', np.float64),
+            ('duration', np.float64),
+            ('billed', np.float64)
+        ])
+    
+    @staticmethod
+    def simulate_rates(base_rates=None, multiplier=1.0, start_time=None, end_time=None, lot_ids=None):
+        """Per-lot revenue of past stays at current rates versus proposed base rates
+        
+        base_rates maps lot id to a new base rate; lots not listed keep their
+        current rate. multiplier scales every resulting base rate. Lots with a
+        tariff are not simulated and are listed under tariff_lots instead.
+        """
+        end_time = end_time or datetime.utcnow()
+        start_time = start_time or end_time - timedelta(days=SIMULATION_DAYS)
+        stays = PricingEngine.load_completed_stays(start_time, end_time, lot_ids)
+        
+        tariff_lots = db.select(Tariff.lot_id).order_by(Tariff.lot_id)
+        if lot_ids:
+            tariff_lots = tariff_lots.where(Tariff.lot_id.in_(lot_ids))
+        tariff_lots = db.session.execute(tariff_lots).scalars().all()
+        
+        proposed_rates = stays['base_rate'].copy()
+        for lot_id, rate in (base_rates or {}).items():
+            proposed_rates[stays['lot_id'] == int(lot_id)] = float(rate)
+        proposed_rates *= multiplier
+        
+        current = PricingEngine.compute_charges(stays['base_rate'], stays['extra_charge'], stays['duration'])
+        proposed = PricingEngine.compute_charges(proposed_rates, stays['extra_charge'], stays['duration'])
+        
+        # Sum every array per lot in one pass
+        lots, index = np.unique(stays['lot_id'], return_inverse=True)
+        sessions = np.bincount(index, minlength=len(lots))
+        billed = np.bincount(index, weights=stays['billed'], minlength=len(lots))
+        current_revenue = np.bincount(index, weights=current, minlength=len(lots))
+        proposed_revenue = np.bincount(index, weights=proposed, minlength=len(lots))
+        
+        by_lot = []
+        for position, lot_id in enumerate(lots.tolist()):
+            delta = proposed_revenue[position] - current_revenue[position]
+            by_lot.append({
+                'lot_id': lot_id,
+                'sessions': int(sessions[position]),
+                'billed_revenue': round(float(billed[position]), 2),
+                'current_rate_revenue': round(float(current_revenue[position]), 2),
+                'simulated_revenue': round(float(proposed_revenue[position]), 2),
+                'delta': round(float(delta), 2),
+                'delta_percent': round(float(delta / current_revenue[position] * 100), 2)
+                if current_revenue[position] else None
+            })
+        
+        current_total = float(current.sum())
+        proposed_total = float(proposed.sum())
+        return {
+            'start_time': start_time.isoformat(),
+            'end_time': end_time.isoformat(),
+            'sessions': int(len(current)),
+            'billed_revenue': round(float(stays['billed'].sum()), 2),
+            'current_rate_revenue': round(current_total, 2),
+            'simulated_revenue': round(proposed_total, 2),
+            'delta': round(proposed_total - current_total, 2),
+            'lots': by_lot,
+            'tariff_lots': tariff_lots
+        }
+    
+    @staticmethod
+    def reprice_pending_bills(lot_ids=None, dry_run=False):
+        """Recompute every pending bill at the current rates and update the ones that changed
+        
+        Bills of lots with a tariff are left alone: their bands are priced by
+        the tariff engine, not by the flat formula vectorized here.
+        """
+        query = db.select(
+            Billing.id,
+            cast(ParkingLot.base_rate, Float),
+            cast(func.coalesce(ParkingSpace.extra_charge, 0), Float),
+            PricingEngine._duration_seconds(Occupancy.entry_time, Occupancy.exit_time),
+            cast(Billing.amount, Float)
+        ).select_from(Billing).join(
+            Occupancy, Occupancy.id == Billing.occupancy_id
+        ).join(
+            ParkingSpace, ParkingSpace.id == Occupancy.space_id
+        ).join(
+            ParkingLot, ParkingLot.id == ParkingSpace.lot_id
+        ).where(
+            Billing.payment_status == PaymentStatus.PENDING,
+            Occupancy.exit_time.isnot(None),
+            ParkingLot.id.notin_(db.select(Tariff.lot_id))
+        )
+        if lot_ids:
+            query = query.where(ParkingSpace.lot_id.in_(lot_ids))
+        
+        bills = PricingEngine._load(query, [
+            ('id', np.int64),
+            ('base_rate', np.float64),
+            ('extra_charge', np.float64),
+            ('duration', np.float64),
+            ('amount', np.float64)
+        ])
+        
+        amounts = np.round(
+            PricingEngine.compute_charges(bills['base_rate'], bills['extra_charge'], bills['duration']), 2
+        )
+        changed = np.flatnonzero(np.abs(amounts - bills['amount']) >= 0.005)
+        
+        if not dry_run and len(changed):
+            # executemany of UPDATE ... WHERE id = ?, one round trip per batch
+            db.session.execute(update(Billing), [
+                {'id': bill_id, 'amount': amount}
+                for bill_id, amount in zip(bills['id'][changed].tolist(), amounts[changed].tolist())
+            ])
+            db.session.commit()
+        
+        return {
+            'pending_bills': int(len(amounts)),
+            'changed_bills': int(len(changed)),
+            'previous_total': round(float(bills['amount'].sum()), 2),
+            'new_total': round(float(amounts.sum()), 2),
+            'dry_run': dry_run
+        }
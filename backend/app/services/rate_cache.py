@@ -0,0 +1,102 @@
+from app.extensions import db
+from app.models.parking_lot import ParkingLot
+from app.models.parking_space import ParkingSpace
+from flask import current_app
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+from collections import OrderedDict, namedtuple
+import threading
+import time
+
+# Rates needed to price a stay on one space
+SpaceRates = namedtuple('SpaceRates', ['lot_id', 'base_rate', 'extra_charge'])
+
+class RateCache:
+    """Per-process LRU cache of (lot base_rate, space extra_charge) by space id
+    
+    Entries are dropped after any commit that changes a lot's base_rate or a
+    space's extra_charge or lot, and expire after RATE_CACHE_TTL seconds so
+    that changes committed by other processes are picked up too.
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # space_id -> (SpaceRates, time.monotonic() when loaded)
+        self._generation = 0  # bumped by every invalidation
+    
+    def get(self, space_id):
+        """Rates of a space, loading them with one query on a miss; None if the space does not exist"""
+        ttl = current_app.config.get('RATE_CACHE_TTL', 300)
+        with self._lock:
+            entry = self._entries.get(space_id)
+            if entry is not None and time.monotonic() - entry[1] < ttl:
+                self._entries.move_to_end(space_id)
+                return entry[0]
+            generation = self._generation
+        
+        row = db.session.query(
+            ParkingSpace.lot_id, ParkingLot.base_rate, ParkingSpace.extra_charge
+        ).join(
+            ParkingLot, ParkingLot.id == ParkingSpace.lot_id
+        ).filter(ParkingSpace.id == space_id).first()
+        if row is None:
+            return None
+        
+        rates = SpaceRates(*row)
+        with self._lock:
+            # Rates read while an invalidation committed may already be stale
+            if generation == self._generation:
+                self._entries[space_id] = (rates, time.monotonic())
+                self._entries.move_to_end(space_id)
+                while len(self._entries) > current_app.config.get('RATE_CACHE_SIZE', 10000):
+                    self._entries.popitem(last=False)
+        return rates
+    
+    def invalidate(self, space_ids=(), lot_ids=()):
+        """Drop the given spaces and every space of the given lots"""
+        space_ids, lot_ids = set(space_ids), set(lot_ids)
+        with self._lock:
+            self._generation += 1
+            for space_id in [space_id for space_id, (rates, _) in self._entries.items()
+                             if space_id in space_ids or rates.lot_id in lot_ids]:
+                del self._entries[space_id]
+    
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+
+def _changed(obj, *attrs):
+    state = inspect(obj)
+    return any(state.attrs[attr].history.has_changes() for attr in attrs)
+
+@event.listens_for(Session, 'after_flush')
+def _collect_rate_changes(session, flush_context):
+    changes = session.info.setdefault('rate_changes', (set(), set()))
+    space_ids, lot_ids = changes
+    for obj in session.dirty:
+        if isinstance(obj, ParkingLot) and _changed(obj, 'base_rate'):
+            lot_ids.add(obj.id)
+        elif isinstance(obj, ParkingSpace) and _changed(obj, 'extra_charge', 'lot_id'):
+            space_ids.add(obj.id)
+    for obj in session.deleted:
+        if isinstance(obj, ParkingLot):
+            lot_ids.add(obj.id)
+        elif isinstance(obj, ParkingSpace):
+            space_ids.add(obj.id)
+    if not space_ids and not lot_ids:
+        session.info.pop('rate_changes')
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_rates(session):
+    changes = session.info.pop('rate_changes', None)
+    if changes:
+        rate_cache.invalidate(*changes)
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _discard_rate_changes(session, previous_transaction):
+    # Changes of a rolled back savepoint are kept: invalidating too much is harmless
+    if not previous_transaction.nested:
+        session.info.pop('rate_changes', None)
+
+rate_cache = RateCache()
@@ -0,0 +1,157 @@
+from app.extensions import db
+from app.models.billing import Billing, PaymentStatus
+from app.models.occupancy import Occupancy
+from app.models.parking_lot import ParkingLot
+from app.models.parking_space import ParkingSpace
+from app.models.revenue import RevenueDaily
+from sqlalchemy import delete, func, insert, literal, select
+from datetime import datetime
+
+GROUP_BY_PERIODS = ('day', 'week', 'month')
+
+class RevenueService:
+    
+    @staticmethod
+    def _upsert():
+        """Dialect-specific INSERT that supports ON CONFLICT DO UPDATE"""
+        if db.session.get_bind().dialect.name == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        return dialect_insert(RevenueDaily)
+    
+    @staticmethod
+    def add_to_rollup(billing_id, payment_time, amount, count=1):
+        """Add (or with a negative amount and count, remove) a payment in the daily rollup
+
+        Runs in the caller's transaction so the rollup commits together with
+        the payment status change.
+        """
+        lot_id = db.session.query(ParkingSpace.lot_id).join(
+            Occupancy, Occupancy.space_id == ParkingSpace.id
+        ).join(
+            Billing, Billing.occupancy_id == Occupancy.id
+        ).filter(Billing.id == billing_id).scalar()
+        
+        if lot_id is None or payment_time is None:
+            return
+        
+        now = datetime.utcnow()
+        statement = RevenueService._upsert().values(
+            day=payment_time.date(),
+            lot_id=lot_id,
+            total_amount=amount,
+            transaction_count=count,
+            created_at=now,
+            updated_at=now
+        )
+        statement = statement.on_conflict_do_update(
+            index_elements=['day', 'lot_id'],
+            set_={
+                'total_amount': RevenueDaily.total_amount + statement.excluded.total_amount,
+                'transaction_count': RevenueDaily.transaction_count + statement.excluded.transaction_count,
+                'updated_at': now
+            }
+        )
+        db.session.execute(statement)
+    
+    @staticmethod
+    def record_status_change(billing, old_status, old_payment_time):
+        """Keep the daily rollup in step with a billing record's payment status"""
+        if old_status == PaymentStatus.PAID:
+            RevenueService.add_to_rollup(billing.id, old_payment_time, -billing.amount, count=-1)
+        if billing.payment_status == PaymentStatus.PAID:
+            RevenueService.add_to_rollup(billing.id, billing.payment_time, billing.amount)
+    
+    @staticmethod
+    def rebuild_daily_rollups(start_date=None, end_date=None):
+        """Recompute the daily rollup rows in a date range from billing in one INSERT ... SELECT"""
+        day = func.date(Billing.payment_time)
+        now = datetime.utcnow()
+        
+        source = select(
+            day,
+            ParkingSpace.lot_id,
+            func.sum(Billing.amount),
+            func.count(Billing.id),
+            literal(now),
+            literal(now)
+        ).join(
+            Occupancy, Occupancy.id == Billing.occupancy_id
+        ).join(
+            ParkingSpace, ParkingSpace.id == Occupancy.space_id
+        ).where(
+            Billing.payment_status == PaymentStatus.PAID,
+            Billing.payment_time.isnot(None)
+        ).group_by(day, ParkingSpace.lot_id)
+        
+        clear = delete(RevenueDaily)
+        if start_date:
+            source = source.where(day >= start_date)
+            clear = clear.where(RevenueDaily.day >= start_date)
+        if end_date:
+            source = source.where(day <= end_date)
+            clear = clear.where(RevenueDaily.day <= end_date)
+        
+        db.session.execute(clear)
+        db.session.execute(insert(RevenueDaily).from_select(
+            ['day', 'lot_id', 'total_amount', 'transaction_count', 'created_at', 'updated_at'],
+            source
+        ))
+        db.session.commit()
+    
+    @staticmethod
+    def get_revenue_summary(group_by='day', start_date=None, end_date=None, lot_id=None, by_lot=True):
+        """Group paid revenue by day, week or month (and optionally by lot) from the daily rollup"""
+        if group_by not in GROUP_BY_PERIODS:
+            raise ValueError(f"group_by must be one of: {', '.join(GROUP_BY_PERIODS)}")
+        
+        if group_by == 'day':
+            period = RevenueDaily.day
+        else:
+            period = func.date_trunc(group_by, RevenueDaily.day)
+        
+        columns = [period.label('period')]
+        if by_lot:
+            columns += [RevenueDaily.lot_id, ParkingLot.name]
+        
+        query = db.session.query(
+            *columns,
+            func.sum(RevenueDaily.total_amount),
+            func.sum(RevenueDaily.transaction_count)
+        )
+        if by_lot:
+            query = query.join(ParkingLot, ParkingLot.id == RevenueDaily.lot_id)
+        
+        if start_date:
+            query = query.filter(RevenueDaily.day >= start_date)
+        if end_date:
+            query = query.filter(RevenueDaily.day <= end_date)
+        if lot_id:
+            query = query.filter(RevenueDaily.lot_id == lot_id)
+        
+        query = query.group_by(*columns).having(
+            func.sum(RevenueDaily.transaction_count) > 0
+        ).order_by(period)
+        
+        periods = []
+        for row in query:
+            period_value = row[0]
+            if isinstance(period_value, datetime):
+                period_value = period_value.date()
+            entry = {
+                'period': period_value.isoformat(),
+                'total_revenue': float(row[-2] or 0),
+                'transaction_count': int(row[-1] or 0)
+            }
+            if by_lot:
+                entry['lot_id'] = row[1]
+                entry['lot_name'] = row[2]
+            periods.append(entry)
+        
+        return {
+            'group_by': group_by,
+            'total_revenue': sum(entry['total_revenue'] for entry in periods),
+            'transaction_count': sum(entry['transaction_count'] for entry in periods),
+            'periods': periods
+        }
@@ -0,0 +1,98 @@
+from app.extensions import db
+from app.models.parking_space import ParkingSpace, SpaceState
+from app.services import space_events
+from flask import current_app
+from collections import deque
+import threading
+import time
+
+class SpaceAllocator:
+    """In-memory per-lot, per-SpaceType free lists of unoccupied spaces
+
+    A lot's free lists are built from parking_spaces on first use and then
+    kept in step with committed state changes published by space_events.
+    Changes committed by other processes are not seen, so a lot is rebuilt
+    once it is older than SPACE_ALLOCATOR_MAX_AGE seconds; a stale entry is
+    harmless because check-in re-validates the space against the database.
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._free = {}  # (lot_id, space_type) -> deque of space ids
+        self._members = {}  # (lot_id, space_type) -> set of space ids still free
+        self._loaded_at = {}  # lot_id -> time.monotonic() of last rebuild
+    
+    def _is_fresh(self, lot_id):
+        loaded_at = self._loaded_at.get(lot_id)
+        if loaded_at is None:
+            return False
+        max_age = current_app.config.get('SPACE_ALLOCATOR_MAX_AGE', 60)
+        return time.monotonic() - loaded_at < max_age
+    
+    def _load_lot(self, lot_id):
+        """Rebuild the free lists of a lot from the database"""
+        rows = db.session.query(ParkingSpace.id, ParkingSpace.space_type).filter(
+            ParkingSpace.lot_id == lot_id,
+            ParkingSpace.state == SpaceState.UNOCCUPIED
+        ).order_by(ParkingSpace.id).all()
+        
+        with self._lock:
+            for key in [key for key in self._free if key[0] == lot_id]:
+                del self._free[key]
+                del self._members[key]
+            for space_id, space_type in rows:
+                self._free.setdefault((lot_id, space_type), deque()).append(space_id)
+                self._members.setdefault((lot_id, space_type), set()).add(space_id)
+            self._loaded_at[lot_id] = time.monotonic()
+    
+    def acquire(self, lot_id, space_type):
+        """Take a free space id of the given type from a lot, or None if the lot is full"""
+        if not self._is_fresh(lot_id):
+            self._load_lot(lot_id)
+        
+        with self._lock:
+            free = self._free.get((lot_id, space_type))
+            members = self._members.get((lot_id, space_type))
+            while free:
+                space_id = free.popleft()
+                # Entries removed by apply_changes() are skipped lazily here
+                if space_id in members:
+                    members.discard(space_id)
+                    return space_id
+        return None
+    
+    def release(self, lot_id, space_type, space_id):
+        """Put a space handed out by acquire() back on its free list"""
+        with self._lock:
+            if lot_id not in self._loaded_at:
+                return
+            members = self._members.setdefault((lot_id, space_type), set())
+            if space_id not in members:
+                members.add(space_id)
+                self._free.setdefault((lot_id, space_type), deque()).append(space_id)
+    
+    def invalidate(self, lot_id=None):
+        """Force a rebuild of one lot, or of every lot, on next use"""
+        with self._lock:
+            if lot_id is None:
+                self._loaded_at.clear()
+            else:
+                self._loaded_at.pop(lot_id, None)
+    
+    def apply_changes(self, changes):
+        """Apply committed space changes to the free lists of loaded lots"""
+        with self._lock:
+            for change in changes:
+                if change.lot_id not in self._loaded_at:
+                    continue
+                key = (change.lot_id, change.space_type)
+                members = self._members.setdefault(key, set())
+                if change.new_state == SpaceState.UNOCCUPIED:
+                    if change.space_id not in members:
+                        members.add(change.space_id)
+                        self._free.setdefault(key, deque()).append(change.space_id)
+                else:
+                    members.discard(change.space_id)
+
+space_allocator = SpaceAllocator()
+space_events.subscribe(space_allocator.apply_changes)
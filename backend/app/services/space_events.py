@@ -0,0 +1,79 @@
+from app.models.parking_space import ParkingSpace
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+from collections import namedtuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+# One committed change to a parking space. old_state is None for newly
+# created spaces and new_state is None for deleted ones.
+SpaceChange = namedtuple('SpaceChange', ['space_id', 'lot_id', 'space_type', 'old_state', 'new_state'])
+
+_listeners = []
+
+def subscribe(listener):
+    """Register a callable that receives the list of SpaceChange objects of every commit"""
+    _listeners.append(listener)
+    return listener
+
+def record_change(session, space_id, lot_id, space_type, old_state, new_state):
+    """Record a space change made outside the ORM unit of work (e.g. bulk inserts)"""
+    session.info.setdefault('space_changes', []).append(
+        SpaceChange(space_id, lot_id, space_type, old_state, new_state)
+    )
+
+def mark(session):
+    """Return a marker that discard_since() can roll the pending changes back to"""
+    return len(session.info.get('space_changes', []))
+
+def discard_since(session, marker):
+    """Forget changes recorded after marker, e.g. when a savepoint is rolled back"""
+    del session.info.get('space_changes', [])[marker:]
+
+def _history(obj, attr):
+    history = inspect(obj).attrs[attr].history
+    if history.deleted:
+        return history.deleted[0]
+    return getattr(obj, attr)
+
+@event.listens_for(Session, 'after_flush')
+def _collect_space_changes(session, flush_context):
+    for obj in session.new:
+        if isinstance(obj, ParkingSpace):
+            record_change(session, obj.id, obj.lot_id, obj.space_type, None, obj.state)
+    
+    for obj in session.dirty:
+        if not isinstance(obj, ParkingSpace) or not session.is_modified(obj):
+            continue
+        old_lot_id = _history(obj, 'lot_id')
+        old_type = _history(obj, 'space_type')
+        old_state = _history(obj, 'state')
+        if old_lot_id != obj.lot_id or old_type != obj.space_type:
+            # Moving a space between lots or types is a removal plus an addition
+            record_change(session, obj.id, old_lot_id, old_type, old_state, None)
+            record_change(session, obj.id, obj.lot_id, obj.space_type, None, obj.state)
+        elif old_state != obj.state:
+            record_change(session, obj.id, obj.lot_id, obj.space_type, old_state, obj.state)
+    
+    for obj in session.deleted:
+        if isinstance(obj, ParkingSpace):
+            record_change(session, obj.id, obj.lot_id, obj.space_type, obj.state, None)
+
+@event.listens_for(Session, 'after_commit')
+def _publish_space_changes(session):
+    changes = session.info.pop('space_changes', None)
+    if not changes:
+        return
+    for listener in _listeners:
+        try:
+            listener(changes)
+        except Exception:
+            logger.exception('Space change listener %r failed', listener)
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _discard_space_changes(session, previous_transaction):
+    # Savepoint rollbacks are handled by discard_since(); only a rollback of
+    # the outermost transaction throws every pending change away
+    if not previous_transaction.nested:
+        session.info.pop('space_changes', None)
@@ -0,0 +1,242 @@
+from app.extensions import db
+from app.models.parking_lot import ParkingLot
+from app.models.tariff import Tariff
+from flask import current_app
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+from bisect import bisect_right
+from datetime import timezone
+from zoneinfo import ZoneInfo
+import threading
+import time
+
+MINUTES_PER_DAY = 24 * 60
+MINUTES_PER_WEEK = 7 * MINUTES_PER_DAY
+DAY_NAMES = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
+
+def _parse_time(value):
+    """'HH:MM' (00:00 to 24:00) to minutes after midnight"""
+    try:
+        hours, minutes = (int(part) for part in str(value).split(':'))
+    except ValueError:
+        raise ValueError(f'Invalid time {value!r}, expected HH:MM')
+    if not (0 <= minutes < 60 and 0 <= hours * 60 + minutes <= MINUTES_PER_DAY):
+        raise ValueError(f'Invalid time {value!r}, expected HH:MM between 00:00 and 24:00')
+    return hours * 60 + minutes
+
+def _rule_segments(rule):
+    """Week-minute segments [start, end) covered by one rule"""
+    days = rule.get('days', list(range(7)))
+    if not days or any(day not in range(7) for day in days):
+        raise ValueError('Rule days must be weekday numbers from 0 (Monday) to 6 (Sunday)')
+    start = _parse_time(rule.get('start', '00:00'))
+    end = _parse_time(rule.get('end', '24:00'))
+    if start == end:
+        raise ValueError('Rule start and end must differ')
+    length = end - start if end > start else MINUTES_PER_DAY - start + end  # end < start runs past midnight
+    
+    segments = []
+    for day in days:
+        begin = day * MINUTES_PER_DAY + start
+        finish = begin + length
+        if finish <= MINUTES_PER_WEEK:
+            segments.append((begin, finish))
+        else:
+            # Sunday night bands wrap round to Monday morning
+            segments.append((begin, MINUTES_PER_WEEK))
+            segments.append((0, finish - MINUTES_PER_WEEK))
+    return segments
+
+class CompiledTariff:
+    """A lot's tariff as a sorted table of weekly rate breakpoints
+    
+    starts[i] is the minute of the week (Monday 00:00 = 0) at which the
+    hourly rate rates[i] begins and cumulative[i] the charge of parking from
+    Monday 00:00 up to starts[i]. The charge of any stay is then a
+    difference of two cumulative values, each found by bisection, instead
+    of a walk over every hour of the stay.
+    """
+    
+    def __init__(self, starts, rates, grace_minutes=0, daily_cap=None):
+        self.starts = starts
+        self.rates = rates
+        self.grace_minutes = grace_minutes
+        self.daily_cap = daily_cap
+        self.cumulative = [0.0]
+        for i in range(1, len(starts)):
+            self.cumulative.append(self.cumulative[-1] + rates[i - 1] * (starts[i] - starts[i - 1]) / 60)
+        self.week_cost = self.cumulative[-1] + rates[-1] * (MINUTES_PER_WEEK - starts[-1]) / 60
+    
+    @classmethod
+    def compile(cls, rules, base_rate, grace_minutes=0, daily_cap=None):
+        """Build the breakpoint table; time not covered by any rule is charged at base_rate"""
+        if not isinstance(rules, list):
+            raise ValueError('rules must be a list')
+        if grace_minutes < 0:
+            raise ValueError('grace_minutes cannot be negative')
+        if daily_cap is not None and daily_cap < 0:
+            raise ValueError('daily_cap cannot be negative')
+        
+        bands = []
+        for rule in rules:
+            if not isinstance(rule, dict) or 'rate' not in rule:
+                raise ValueError('Every rule needs a rate')
+            rate = float(rule['rate'])
+            if rate < 0:
+                raise ValueError('Rule rates cannot be negative')
+            bands.append((_rule_segments(rule), rate))
+        
+        boundaries = sorted({0} | {point for segments, _ in bands for segment in segments for point in segment})
+        boundaries = [point for point in boundaries if point < MINUTES_PER_WEEK]
+        
+        starts, rates = [], []
+        for start in boundaries:
+            rate = float(base_rate)
+            # Later rules take precedence over earlier ones
+            for segments, band_rate in reversed(bands):
+                if any(begin <= start < end for begin, end in segments):
+                    rate = band_rate
+                    break
+            if not rates or rates[-1] != rate:
+                starts.append(start)
+                rates.append(rate)
+        
+        return cls(starts, rates, grace_minutes, float(daily_cap) if daily_cap is not None else None)
+    
+    def _cost_until(self, minute):
+        """Charge from Monday 00:00 to minute (0 <= minute <= one week)"""
+        i = bisect_right(self.starts, minute) - 1
+        return self.cumulative[i] + self.rates[i] * (minute - self.starts[i]) / 60
+    
+    def _cost(self, position, minutes):
+        """Charge of parking minutes starting at a week position"""
+        weeks, remainder = divmod(minutes, MINUTES_PER_WEEK)
+        cost = weeks * self.week_cost
+        end = position + remainder
+        if end <= MINUTES_PER_WEEK:
+            return cost + self._cost_until(end) - self._cost_until(position)
+        return cost + self.week_cost - self._cost_until(position) + self._cost_until(end - MINUTES_PER_WEEK)
+    
+    def price(self, entry_time, exit_time, extra_charge=0.0, tz=timezone.utc):
+        """Charge of a stay; naive times are UTC, bands are read in tz
+        
+        As with the flat rate (BillingService.compute_charge), the stay is
+        billed as max(1, round(hours)) whole hours from entry; the bands
+        price those hours.
+        """
+        if entry_time.tzinfo is None:
+            entry_time = entry_time.replace(tzinfo=timezone.utc)
+        if exit_time.tzinfo is None:
+            exit_time = exit_time.replace(tzinfo=timezone.utc)
+        
+        minutes = max(0.0, (exit_time - entry_time).total_seconds() / 60)
+        if minutes <= self.grace_minutes:
+            return 0.0
+        minutes = max(1, round(minutes / 60)) * 60
+        
+        local = entry_time.astimezone(tz)
+        position = local.weekday() * MINUTES_PER_DAY + local.hour * 60 + local.minute + local.second / 60
+        extra_per_minute = float(extra_charge or 0.0) / 60
+        
+        if self.daily_cap is None:
+            return round(self._cost(position, minutes) + extra_per_minute * minutes, 2)
+        
+        # The cap applies to every 24 hours counted from entry. Full days
+        # repeat weekly, so at most seven of them are priced, plus the rest
+        days, remainder = divmod(minutes, MINUTES_PER_DAY)
+        day_charges = [
+            min(self.daily_cap, self._cost((position + day * MINUTES_PER_DAY) % MINUTES_PER_WEEK, MINUTES_PER_DAY)
+                + extra_per_minute * MINUTES_PER_DAY)
+            for day in range(min(days, 7))
+        ]
+        weeks, days_left = divmod(days, 7)
+        total = weeks * sum(day_charges) + sum(day_charges[:days_left])
+        if remainder:
+            start = (position + days * MINUTES_PER_DAY) % MINUTES_PER_WEEK
+            total += min(self.daily_cap, self._cost(start, remainder) + extra_per_minute * remainder)
+        return round(total, 2)
+    
+    def bands(self):
+        """Human readable breakpoint table"""
+        return [{
+            'from': f'{DAY_NAMES[start // MINUTES_PER_DAY]} {start % MINUTES_PER_DAY // 60:02d}:{start % 60:02d}',
+            'rate': rate
+        } for start, rate in zip(self.starts, self.rates)]
+
+def tariff_timezone():
+    """Zone in which tariff bands are read"""
+    return ZoneInfo(current_app.config.get('TARIFF_TIMEZONE', 'UTC'))
+
+class TariffCache:
+    """Per-process cache of compiled tariffs by lot id
+    
+    Lots without a tariff are cached too, so pricing a check-out needs no
+    query once its lot has been seen. Entries are dropped after commits
+    that change a lot's tariff or base_rate and expire after
+    TARIFF_CACHE_TTL seconds to pick up edits made by other processes.
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._compiled = {}  # lot_id -> (CompiledTariff or None, time.monotonic() when loaded)
+        self._generation = 0  # bumped by every invalidation
+    
+    def get(self, lot_id):
+        """The compiled tariff of a lot, or None when the lot uses the flat hourly rate"""
+        ttl = current_app.config.get('TARIFF_CACHE_TTL', 300)
+        with self._lock:
+            entry = self._compiled.get(lot_id)
+            if entry is not None and time.monotonic() - entry[1] < ttl:
+                return entry[0]
+            generation = self._generation
+        
+        row = db.session.query(ParkingLot.base_rate, Tariff).outerjoin(
+            Tariff, Tariff.lot_id == ParkingLot.id
+        ).filter(ParkingLot.id == lot_id).first()
+        
+        compiled = None
+        if row is not None and row[1] is not None:
+            base_rate, tariff = row
+            compiled = CompiledTariff.compile(tariff.rules, base_rate, tariff.grace_minutes, tariff.daily_cap)
+        
+        with self._lock:
+            # A tariff read while an edit committed may already be stale
+            if generation == self._generation:
+                self._compiled[lot_id] = (compiled, time.monotonic())
+        return compiled
+    
+    def invalidate(self, lot_ids=None):
+        """Drop the compiled tariffs of the given lots, or of every lot"""
+        with self._lock:
+            self._generation += 1
+            if lot_ids is None:
+                self._compiled.clear()
+            for lot_id in lot_ids or ():
+                self._compiled.pop(lot_id, None)
+
+@event.listens_for(Session, 'after_flush')
+def _collect_tariff_changes(session, flush_context):
+    lot_ids = session.info.setdefault('tariff_changes', set())
+    for obj in session.new | session.dirty | session.deleted:
+        if isinstance(obj, Tariff):
+            lot_ids.add(obj.lot_id)
+            lot_ids.update(inspect(obj).attrs.lot_id.history.deleted)
+        elif isinstance(obj, ParkingLot) and (
+            obj in session.deleted or inspect(obj).attrs.base_rate.history.has_changes()
+        ):
+            lot_ids.add(obj.id)
+    if not lot_ids:
+        session.info.pop('tariff_changes')
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_tariffs(session):
+    lot_ids = session.info.pop('tariff_changes', None)
+    if lot_ids:
+        tariff_cache.invalidate(lot_ids)
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _discard_tariff_changes(session, previous_transaction):
+    if not previous_transaction.nested:
+        session.info.pop('tariff_changes', None)
+
+tariff_cache = TariffCache()
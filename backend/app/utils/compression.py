@@ -0,0 +1,75 @@
+from flask import current_app, request
+import gzip
+
+try:
+    import brotli
+except ImportError:  # optional: only gzip is offered without it
+    brotli = None
+
+DEFAULT_MIMETYPES = ('application/json', 'text/html', 'text/plain', 'text/csv')
+
+def compress_body(data, encoding, gzip_level=6, brotli_quality=4):
+    """Compress a response body with 'br' or 'gzip'"""
+    if encoding == 'br':
+        return brotli.compress(data, quality=brotli_quality)
+    # mtime=0 keeps the output identical for identical bodies
+    return gzip.compress(data, compresslevel=gzip_level, mtime=0)
+
+class ResponseCompressor:
+    """Brotli or gzip compression of buffered responses, negotiated from Accept-Encoding
+    
+    Only bodies of at least COMPRESS_MIN_SIZE bytes with one of the
+    COMPRESS_MIMETYPES are compressed. Streamed responses, such as the
+    availability stream and ?stream=true listings, are passed through
+    unchanged so their chunks still reach the client as they are produced.
+    """
+    
+    def init_app(self, app):
+        app.config.setdefault('COMPRESS_ENABLED', True)
+        app.config.setdefault('COMPRESS_MIN_SIZE', 1024)
+        app.config.setdefault('COMPRESS_GZIP_LEVEL', 6)
+        app.config.setdefault('COMPRESS_BROTLI_QUALITY', 4)
+        app.config.setdefault('COMPRESS_MIMETYPES', DEFAULT_MIMETYPES)
+        if not app.config['COMPRESS_ENABLED']:
+            return
+        
+        app.after_request(self._compress)
+    
+    @staticmethod
+    def choose_encoding(accept_encodings):
+        """'br' or 'gzip', whichever the client accepts with the higher quality, or None"""
+        offered = (['br'] if brotli is not None else []) + ['gzip']
+        qualities = {encoding: accept_encodings.quality(encoding) for encoding in offered}
+        best = max(offered, key=lambda encoding: qualities[encoding])  # br wins ties
+        return best if qualities[best] > 0 else None
+    
+    @staticmethod
+    def _compress(response):
+        config = current_app.config
+        
+        if (response.direct_passthrough or response.is_streamed or request.method == 'HEAD'
+                or not 200 <= response.status_code < 300 or response.status_code == 204
+                or response.mimetype not in config['COMPRESS_MIMETYPES']
+                or 'Content-Encoding' in response.headers):
+            return response
+        
+        # The body depends on Accept-Encoding from here on, compressed or not
+        response.vary.add('Accept-Encoding')
+        if response.content_length is not None and response.content_length < config['COMPRESS_MIN_SIZE']:
+            return response
+        encoding = ResponseCompressor.choose_encoding(request.accept_encodings)
+        if encoding is None:
+            return response
+        
+        data = response.get_data()
+        compressed = compress_body(data, encoding, config['COMPRESS_GZIP_LEVEL'], config['COMPRESS_BROTLI_QUALITY'])
+        if len(compressed) >= len(data):
+            return response
+        
+        response.set_data(compressed)
+        response.headers['Content-Encoding'] = encoding
+        # A strong ETag promises byte-identical bodies, which no longer holds
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(etag, weak=True)
+        return response
@@ -0,0 +1,49 @@
+from flask import request
+from datetime import date
+from decimal import Decimal
+import enum
+
+def parse_fields(value, model, extra=()):
+    """Names from a ?fields=a,b,c value, checked against the model's columns and extra names
+    
+    Returns None when no fields were asked for, meaning the full
+    representation.
+    """
+    if value is None:
+        return None
+    fields = list(dict.fromkeys(name.strip() for name in value.split(',') if name.strip()))
+    available = list(model.__mapper__.column_attrs.keys()) + list(extra)
+    unknown = [name for name in fields if name not in available]
+    if not fields or unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown) or '(none given)'}. "
+                         f"Available fields: {', '.join(available)}")
+    return fields
+
+def get_fields_arg(model, extra=()):
+    """parse_fields() for the fields query argument of the current request"""
+    return parse_fields(request.args.get('fields'), model, extra)
+
+def field_columns(model, fields, required=()):
+    """Columns to SELECT for fields, plus the required columns (e.g. the pagination keys)"""
+    names = [name for name in fields if name in model.__mapper__.column_attrs]
+    names += [column.key for column in required if column.key not in names]
+    return [getattr(model, name) for name in names]
+
+def serialize_value(value):
+    """A column value as to_dict() renders it"""
+    if isinstance(value, enum.Enum):
+        return value.value
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, date):
+        return value.isoformat()
+    return value
+
+def row_serializer(fields):
+    """Serializer of rows of selected columns into dicts of just the requested fields"""
+    return lambda row: {name: serialize_value(getattr(row, name)) for name in fields}
+
+def select_fields(query, model, fields, required=()):
+    """Restrict a query to the columns behind fields and return (query, serializer of those columns)"""
+    columns = [name for name in fields if name in model.__mapper__.column_attrs]
+    return query.with_entities(*field_columns(model, fields, required)), row_serializer(columns)
@@ -0,0 +1,79 @@
+from flask import Response, request
+from app.extensions import db
+from app.models.parking_lot import ParkingLot
+from app.services import lot_versions  # noqa: F401 (keeps ParkingLot.version current)
+from datetime import datetime, timezone
+from sqlalchemy import func
+from werkzeug.http import http_date, parse_date, parse_etags, quote_etag
+import hashlib
+
+def collection_aggregate(model, *criteria):
+    """Scalar subqueries of the row count and latest updated_at of the rows of model matching criteria"""
+    return (
+        db.select(func.count(model.id)).where(*criteria).scalar_subquery(),
+        db.select(func.max(model.updated_at)).where(*criteria).scalar_subquery()
+    )
+
+def summed_lot_version(*criteria):
+    """Scalar subquery of the summed version of the lots matching criteria
+    
+    Every commit that changes a lot or one of its spaces bumps the lot's
+    version, so this changes with each of them, in whatever order
+    concurrent transactions commit. Spaces need not be counted.
+    """
+    return (db.select(func.sum(ParkingLot.version)).where(*criteria).scalar_subquery(),)
+
+def latest_update(model, *criteria):
+    """Scalar subquery of the latest updated_at alone, for Last-Modified of tables too large to count"""
+    return (db.select(func.max(model.updated_at)).where(*criteria).scalar_subquery(),)
+
+def validators_query(*aggregates):
+    """One SELECT of all the aggregates"""
+    return db.select(*(column for aggregate in aggregates for column in aggregate))
+
+def validators_from_row(row):
+    """(etag, last_modified) from the counts, versions and latest updated_at values of the aggregates
+    
+    Collections of lots and spaces include summed_lot_version(), which every
+    commit changes, so their ETag does too. Last-Modified is only the
+    latest updated_at: stamped at flush time with one second resolution,
+    it can miss deletes and transactions that commit out of order.
+    """
+    fingerprint = '|'.join(value.isoformat() if hasattr(value, 'isoformat') else str(value) for value in row)
+    etag = hashlib.blake2b(fingerprint.encode(), digest_size=12).hexdigest()
+    
+    timestamps = [value for value in row if isinstance(value, datetime)]
+    last_modified = max(timestamps).replace(tzinfo=timezone.utc, microsecond=0) if timestamps else None
+    return etag, last_modified
+
+def collection_validators(*aggregates):
+    """(etag, last_modified) of the collections summarized by collection_aggregate(), in one query"""
+    return validators_from_row(db.session.execute(validators_query(*aggregates)).one())
+
+def validator_headers(etag, last_modified):
+    """Response headers carrying the validators; clients must revalidate before reusing the response"""
+    # Weak: compressed and uncompressed bodies carry the same validator
+    headers = {'ETag': quote_etag(etag, weak=True), 'Cache-Control': 'no-cache'}
+    if last_modified:
+        headers['Last-Modified'] = http_date(last_modified)
+    return headers
+
+def is_fresh(headers, etag, last_modified):
+    """Whether the copy the client holds, per its request headers, is still current"""
+    # If-Modified-Since only counts without If-None-Match (RFC 9110)
+    if_none_match = headers.get('If-None-Match')
+    if if_none_match:
+        return parse_etags(if_none_match).contains_weak(etag)
+    
+    if_modified_since = parse_date(headers.get('If-Modified-Since'))
+    return bool(last_modified and if_modified_since and last_modified <= if_modified_since)
+
+def add_validators(response, etag, last_modified):
+    response.headers.update(validator_headers(etag, last_modified))
+    return response
+
+def not_modified_response(etag, last_modified):
+    """A 304 response if the client's cached copy is still current, else None"""
+    if not is_fresh(request.headers, etag, last_modified):
+        return None
+    return add_validators(Response(status=304), etag, last_modified)
@@ -0,0 +1,54 @@
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # optional: the stdlib provider is used without it
+    orjson = None
+
+class OrjsonProvider(DefaultJSONProvider):
+    """DefaultJSONProvider with orjson doing the encoding and decoding
+    
+    Documents match the stdlib provider: sorted keys, dates as HTTP dates
+    and Decimal, UUID and dataclasses through the same default hook.
+    Non-ASCII text is sent as UTF-8 instead of \\u escapes. Calls passing
+    json.dumps keyword arguments fall back to the stdlib encoder.
+    """
+    
+    def __init__(self, app):
+        super().__init__(app)
+        self.option = (orjson.OPT_SORT_KEYS if self.sort_keys else 0) | orjson.OPT_NON_STR_KEYS \
+            | orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS
+    
+    def _encode(self, obj, indent=False):
+        return orjson.dumps(obj, default=self.default,
+                            option=self.option | (orjson.OPT_INDENT_2 if indent else 0))
+    
+    def dumps(self, obj, **kwargs):
+        if kwargs:
+            return super().dumps(obj, **kwargs)
+        return self._encode(obj).decode()
+    
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+    
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        return self._app.response_class(self._encode(obj, indent) + b'\n', mimetype=self.mimetype)
+
+JSON_PROVIDERS = {
+    'stdlib': DefaultJSONProvider,
+    'orjson': OrjsonProvider,
+}
+
+def create_json_provider(app):
+    """The JSON provider named by JSON_PROVIDER, falling back to the stdlib one without orjson"""
+    name = app.config.get('JSON_PROVIDER', 'orjson')
+    if name not in JSON_PROVIDERS:
+        raise ValueError(f'Unknown JSON_PROVIDER {name!r}, expected one of {sorted(JSON_PROVIDERS)}')
+    if name == 'orjson' and orjson is None:
+        app.logger.info('orjson is not installed, using the stdlib JSON provider')
+        name = 'stdlib'
+    return JSON_PROVIDERS[name](app)
@@ -0,0 +1,167 @@
+from flask import Response, current_app, g, request
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess
+)
+from prometheus_client.core import GaugeMetricFamily
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool
+import os
+import threading
+import time
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+REQUESTS = Counter(
+    'http_requests_total', 'HTTP requests served',
+    ['blueprint', 'endpoint', 'method', 'status']
+)
+REQUEST_LATENCY = Histogram(
+    'http_request_duration_seconds', 'HTTP request latency',
+    ['blueprint', 'endpoint', 'method', 'status'], buckets=LATENCY_BUCKETS
+)
+
+# Pool gauges are per process; livesum adds up the live workers
+POOL_SIZE = Gauge('db_pool_size', 'Configured connection pool size', multiprocess_mode='livesum')
+POOL_MAX_OVERFLOW = Gauge('db_pool_max_overflow', 'Configured pool max_overflow', multiprocess_mode='livesum')
+POOL_CHECKED_OUT = Gauge('db_pool_checked_out', 'Connections checked out of the pool', multiprocess_mode='livesum')
+POOL_OVERFLOW = Gauge('db_pool_overflow', 'Overflow connections open beyond pool_size', multiprocess_mode='livesum')
+POOL_CHECKOUT_WAIT = Histogram(
+    'db_pool_checkout_seconds', 'Time to check a connection out of the pool (including pre-ping)',
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0)
+)
+POOL_TIMEOUTS = Counter('db_pool_timeouts_total', 'Checkouts that hit pool_timeout')
+
+def observe_request(blueprint, endpoint, method, status, seconds):
+    """Count one served request and its latency"""
+    labels = (blueprint, endpoint, method, str(status))
+    REQUESTS.labels(*labels).inc()
+    REQUEST_LATENCY.labels(*labels).observe(seconds)
+
+def observe_pool(pool):
+    """Publish this process's pool occupancy"""
+    POOL_SIZE.set(pool.size())
+    POOL_MAX_OVERFLOW.set(getattr(pool, '_max_overflow', 0))
+    POOL_CHECKED_OUT.set(pool.checkedout())
+    POOL_OVERFLOW.set(max(0, pool.overflow()))
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that times checkouts; kept by engine.dispose(), which recreates the same class"""
+    
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            connection = super().connect()
+        except PoolTimeoutError:
+            POOL_TIMEOUTS.inc()
+            raise
+        finally:
+            POOL_CHECKOUT_WAIT.observe(time.perf_counter() - started)
+        observe_pool(self)
+        return connection
+
+class DomainCollector:
+    """Parking gauges computed at scrape time from two aggregate queries, cached briefly"""
+    
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._cached = None
+        self._cached_at = 0.0
+    
+    def _load(self):
+        from app.extensions import db
+        from app.models.occupancy import Occupancy, OccupancyStatus
+        from app.models.parking_lot import ParkingLot
+        
+        active = db.session.query(db.func.count(Occupancy.id)).filter(
+            Occupancy.status == OccupancyStatus.ACTIVE
+        ).scalar()
+        # Every lot, so a full lot's series reads 0 instead of disappearing
+        return active, ParkingLot.get_availability_by_lot(all_lots=True)
+    
+    def describe(self):
+        # Nothing to describe up front, so registering does not run the queries
+        return []
+    
+    def collect(self):
+        with self._lock:
+            if self._cached is None or time.monotonic() - self._cached_at >= self.ttl:
+                self._cached = self._load()
+                self._cached_at = time.monotonic()
+            active, availability = self._cached
+        
+        occupancies = GaugeMetricFamily('parking_active_occupancies', 'Vehicles currently checked in')
+        occupancies.add_metric([], active)
+        yield occupancies
+        
+        free = GaugeMetricFamily('parking_free_spaces', 'Unoccupied spaces', labels=['lot_id', 'space_type'])
+        for lot_id, counts in availability.items():
+            free.add_metric([str(lot_id), '2W'], counts['available_2w_spaces'])
+            free.add_metric([str(lot_id), '4W'], counts['available_4w_spaces'])
+        yield free
+
+class PrometheusMetrics:
+    """Prometheus /metrics endpoint with request, pool and parking metrics
+    
+    Call init_app before db.init_app so the engine is built with the
+    instrumented pool. With several worker processes, point
+    PROMETHEUS_MULTIPROC_DIR at an empty directory before the app is
+    imported so every worker's counters are merged on each scrape.
+    """
+    
+    def init_app(self, app):
+        app.config.setdefault('METRICS_ENABLED', True)
+        app.config.setdefault('METRICS_DOMAIN_CACHE_SECONDS', 10)
+        if not app.config['METRICS_ENABLED']:
+            return
+        
+        # Copy before changing: the options dict is shared with the config class
+        options = dict(app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {}))
+        options.setdefault('poolclass', InstrumentedQueuePool)
+        app.config['SQLALCHEMY_ENGINE_OPTIONS'] = options
+        
+        app.extensions['metrics'] = DomainCollector(app.config['METRICS_DOMAIN_CACHE_SECONDS'])
+        app.before_request(self._start_request)
+        app.after_request(self._finish_request)
+        app.add_url_rule('/metrics', 'metrics', self.metrics_view, methods=['GET'])
+    
+    @staticmethod
+    def _start_request():
+        g.metrics_started = time.perf_counter()
+    
+    @staticmethod
+    def _finish_request(response):
+        started = g.pop('metrics_started', None)
+        if started is None:
+            return response
+        
+        observe_request(
+            request.blueprint or '',
+            request.endpoint or 'unmatched',
+            request.method,
+            response.status_code,
+            time.perf_counter() - started
+        )
+        
+        from app.extensions import db
+        pool = db.engine.pool
+        if isinstance(pool, QueuePool):
+            observe_pool(pool)
+        return response
+    
+    @staticmethod
+    def metrics_view():
+        """Expose all metrics in the Prometheus text format"""
+        if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+            process_registry = CollectorRegistry()
+            multiprocess.MultiProcessCollector(process_registry)
+        else:
+            process_registry = REGISTRY
+        
+        domain_registry = CollectorRegistry()
+        domain_registry.register(current_app.extensions['metrics'])
+        
+        return Response(
+            generate_latest(process_registry) + generate_latest(domain_registry),
+            content_type=CONTENT_TYPE_LATEST
+        )
@@ -0,0 +1,77 @@
+from flask import current_app, request, Response, stream_with_context
+from sqlalchemy import tuple_
+from datetime import datetime
+import base64
+import json
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+STREAM_BATCH_SIZE = 500
+
+def encode_cursor(sort_value, row_id):
+    """Encode the sort key of the last row of a page as an opaque cursor"""
+    payload = json.dumps([sort_value.isoformat(), row_id])
+    return base64.urlsafe_b64encode(payload.encode()).decode()
+
+def decode_cursor(cursor):
+    """Decode a cursor produced by encode_cursor()"""
+    try:
+        sort_value, row_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return datetime.fromisoformat(sort_value), int(row_id)
+    except (ValueError, TypeError):
+        raise ValueError('Invalid cursor')
+
+def get_page_args():
+    """Read limit, cursor and stream from the query string"""
+    limit = request.args.get('limit', DEFAULT_PAGE_SIZE, type=int)
+    if limit < 1:
+        raise ValueError('limit must be a positive integer')
+    cursor = request.args.get('cursor')
+    if cursor:
+        decode_cursor(cursor)
+    stream = request.args.get('stream', 'false').lower() in ('1', 'true', 'yes')
+    return min(limit, MAX_PAGE_SIZE), cursor, stream
+
+def apply_keyset(query, sort_column, id_column, cursor=None):
+    """Order a query newest first by (sort_column, id_column) and resume after cursor"""
+    query = query.order_by(sort_column.desc(), id_column.desc())
+    if cursor:
+        sort_value, row_id = decode_cursor(cursor)
+        query = query.filter(tuple_(sort_column, id_column) < tuple_(sort_value, row_id))
+    return query
+
+def paginate(query, sort_column, id_column, serialize, limit, cursor=None):
+    """Fetch one keyset page and return (items, next_cursor)"""
+    rows = apply_keyset(query, sort_column, id_column, cursor).limit(limit + 1).all()
+    
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(getattr(last, sort_column.key), getattr(last, id_column.key))
+    
+    return [serialize(row) for row in rows], next_cursor
+
+def stream_response(query, sort_column, id_column, serialize, cursor=None, head=None, tail=None):
+    """Stream every row after cursor as one JSON document without buffering the result set
+
+    head is the JSON text before the array and tail(count) the text after
+    it; they default to the {"success": true, "data": [...], "count": n}
+    envelope used by the list endpoints.
+    """
+    if head is None:
+        head = '{"success": true, "data": ['
+    if tail is None:
+        tail = lambda count: f'], "count": {count}}}'
+    
+    query = apply_keyset(query, sort_column, id_column, cursor).yield_per(STREAM_BATCH_SIZE)
+    
+    def generate():
+        yield head
+        count = 0
+        for row in query:
+            yield (',' if count else '') + current_app.json.dumps(serialize(row))
+            count += 1
+        yield tail(count)
+    
+    return Response(stream_with_context(generate()), mimetype='application/json')
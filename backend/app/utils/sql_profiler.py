@@ -0,0 +1,192 @@
+from collections import Counter, deque
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from flask import current_app, g, has_request_context, request
+from sqlalchemy import event
+import re
+import threading
+import time
+
+WHITESPACE = re.compile(r'\s+')
+# Collapse IN lists so "IN (?, ?)" and "IN (?, ?, ?)" share one signature
+IN_LIST = re.compile(r'IN \((?:[^()]*)\)', re.IGNORECASE)
+
+# Profile of the async request being served (app.asgi), which has no Flask g
+async_profile = ContextVar('async_sql_profile', default=None)
+
+def statement_signature(statement):
+    """Normalize a parameterized statement so repeats of the same query compare equal"""
+    return IN_LIST.sub('IN (...)', WHITESPACE.sub(' ', statement).strip())
+
+class RequestProfile:
+    """SQL statements executed while serving one request"""
+    
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.statements = 0
+        self.db_seconds = 0.0
+        self.slowest = (0.0, None)
+        self.signatures = Counter()
+        self.signature_seconds = Counter()
+    
+    def record(self, statement, seconds):
+        signature = statement_signature(statement)
+        self.statements += 1
+        self.db_seconds += seconds
+        self.signatures[signature] += 1
+        self.signature_seconds[signature] += seconds
+        if seconds > self.slowest[0]:
+            self.slowest = (seconds, signature)
+    
+    def repeated(self, threshold):
+        """Statements run at least threshold times: likely N+1 lookups"""
+        return [{
+            'statement': signature,
+            'count': count,
+            'total_ms': round(self.signature_seconds[signature] * 1000, 3)
+        } for signature, count in self.signatures.most_common() if count >= threshold]
+
+class SQLProfiler:
+    """Per-request SQL statistics from SQLAlchemy engine events
+    
+    Records statement count, database time, the slowest statement and
+    repeated statement signatures for every request. The numbers are sent
+    back in a Server-Timing header and kept in a bounded in-memory buffer of
+    recent requests; the async handlers of app.asgi report there too. Statements run while a streamed response body is being
+    generated are not attributed to the request.
+    """
+    
+    def init_app(self, app):
+        app.config.setdefault('SQL_PROFILING', False)
+        app.config.setdefault('SQL_PROFILE_BUFFER_SIZE', 500)
+        app.config.setdefault('SQL_N_PLUS_ONE_THRESHOLD', 5)
+        if not app.config['SQL_PROFILING']:
+            return
+        
+        app.extensions['sql_profiler'] = {
+            'recent': deque(maxlen=app.config['SQL_PROFILE_BUFFER_SIZE']),
+            'lock': threading.Lock()
+        }
+        
+        from app.extensions import db
+        with app.app_context():
+            self.listen(db.engine)
+        
+        app.before_request(self._start_request)
+        app.after_request(self._finish_request)
+    
+    @staticmethod
+    def listen(engine):
+        """Time the statements of engine (the sync_engine of an async engine)"""
+        event.listen(engine, 'before_cursor_execute', SQLProfiler._before_cursor_execute)
+        event.listen(engine, 'after_cursor_execute', SQLProfiler._after_cursor_execute)
+    
+    @staticmethod
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if context is not None:
+            context._profiler_started = time.perf_counter()
+    
+    @staticmethod
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        profile = g.get('sql_profile') if has_request_context() else async_profile.get()
+        if profile is None:
+            return
+        started = getattr(context, '_profiler_started', None)
+        if started is not None:
+            profile.record(statement, time.perf_counter() - started)
+    
+    @staticmethod
+    def _start_request():
+        g.sql_profile = RequestProfile()
+    
+    @staticmethod
+    def _finish_request(response):
+        profile = g.pop('sql_profile', None)
+        if profile is None:
+            return response
+        
+        response.headers.add('Server-Timing', SQLProfiler.report(
+            current_app, profile, request.method, request.full_path.rstrip('?'), request.endpoint, response.status_code
+        ))
+        return response
+    
+    @staticmethod
+    def report(app, profile, method, path, endpoint, status):
+        """Buffer a finished request's profile, warn of repeated statements and return its Server-Timing value"""
+        threshold = app.config['SQL_N_PLUS_ONE_THRESHOLD']
+        duration = time.perf_counter() - profile.started
+        slowest_seconds, slowest_statement = profile.slowest
+        repeated = profile.repeated(threshold)
+        
+        entry = {
+            'timestamp': datetime.now(timezone.utc).isoformat(),
+            'method': method,
+            'path': path,
+            'endpoint': endpoint,
+            'status': status,
+            'duration_ms': round(duration * 1000, 3),
+            'statements': profile.statements,
+            'db_ms': round(profile.db_seconds * 1000, 3),
+            'slowest': {
+                'ms': round(slowest_seconds * 1000, 3),
+                'statement': slowest_statement
+            },
+            'repeated': repeated
+        }
+        state = app.extensions['sql_profiler']
+        with state['lock']:
+            state['recent'].append(entry)
+        
+        if repeated:
+            app.logger.warning(
+                'Possible N+1 on %s %s: %s', method, path.partition('?')[0],
+                '; '.join(f"{item['count']}x {item['statement'][:120]}" for item in repeated)
+            )
+        
+        return ', '.join([
+            f'db;desc="{profile.statements} statements";dur={profile.db_seconds * 1000:.2f}',
+            f'db-slowest;dur={slowest_seconds * 1000:.2f}',
+            f'app;dur={duration * 1000:.2f}'
+        ])
+    
+    @staticmethod
+    def _buffered():
+        state = current_app.extensions['sql_profiler']
+        with state['lock']:
+            return list(state['recent'])
+    
+    @staticmethod
+    def recent(limit=None, endpoint=None, n_plus_one=False):
+        """Most recent request profiles, newest first"""
+        entries = SQLProfiler._buffered()
+        entries.reverse()
+        if endpoint:
+            entries = [entry for entry in entries if entry['endpoint'] == endpoint]
+        if n_plus_one:
+            entries = [entry for entry in entries if entry['repeated']]
+        return entries[:limit] if limit else entries
+    
+    @staticmethod
+    def summary():
+        """Aggregate the buffered profiles per endpoint, heaviest database time first"""
+        routes = {}
+        for entry in SQLProfiler._buffered():
+            route = routes.setdefault(entry['endpoint'], {
+                'endpoint': entry['endpoint'],
+                'requests': 0,
+                'statements': 0,
+                'db_ms': 0.0,
+                'max_statements': 0,
+                'n_plus_one_requests': 0
+            })
+            route['requests'] += 1
+            route['statements'] += entry['statements']
+            route['db_ms'] += entry['db_ms']
+            route['max_statements'] = max(route['max_statements'], entry['statements'])
+            route['n_plus_one_requests'] += 1 if entry['repeated'] else 0
+        
+        for route in routes.values():
+            route['avg_statements'] = round(route['statements'] / route['requests'], 2)
+            route['avg_db_ms'] = round(route['db_ms'] / route['requests'], 3)
+            route['db_ms'] = round(route['db_ms'], 3)
+        return sorted(routes.values(), key=lambda route: route['db_ms'], reverse=True)
@@ -0,0 +1,14 @@
+import os
+import sys
+from dotenv import load_dotenv
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '.')))
+
+# Load environment variables from .env file
+load_dotenv()
+
+from app.asgi import create_asgi_app
+
+# Serve with an ASGI server, e.g. uvicorn asgi:app --port 5000
+app = create_asgi_app(os.getenv('FLASK_CONFIG') or 'default')
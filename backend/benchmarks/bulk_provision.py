@@ -0,0 +1,74 @@
+"""Bulk parking-space provisioning benchmark.
+
+Creates a throwaway lot, provisions --spaces spaces through
+POST /api/parking-spaces/bulk (in chunks of the endpoint's maximum) and
+reports the time taken.
+
+Usage:
+    TEST_NEON_DATABASE_URL=postgresql://localhost/parking_test \
+        python benchmarks/bulk_provision.py --spaces 10000
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import create_app
+from app.extensions import db
+from app.models.parking_lot import ParkingLot
+from app.models.parking_space import ParkingSpace
+from app.routes.parking_spaces import MAX_BULK_SPACES
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--config', default='testing')
+    parser.add_argument('--spaces', type=int, default=10000)
+    parser.add_argument('--space-type', default='4W')
+    parser.add_argument('--keep', action='store_true', help='keep the generated rows')
+    args = parser.parse_args()
+
+    app = create_app(args.config)
+    client = app.test_client()
+
+    with app.app_context():
+        lot = ParkingLot(
+            name=f'bulk-{int(time.time() * 1000)}',
+            location='Bulk provisioning benchmark',
+            capacity=args.spaces,
+            base_rate=1
+        )
+        db.session.add(lot)
+        db.session.commit()
+        lot_id = lot.id
+
+    began = time.perf_counter()
+    created = 0
+    while created < args.spaces:
+        count = min(MAX_BULK_SPACES, args.spaces - created)
+        response = client.post('/api/parking-spaces/bulk', json={
+            'lot_id': lot_id,
+            'count': count,
+            'space_type': args.space_type,
+            'extra_charge': 0.5
+        })
+        if response.status_code != 201:
+            print(f'❌ {response.status_code}: {response.get_json()}')
+            return 1
+        created += response.get_json()['data']['count']
+    elapsed = time.perf_counter() - began
+
+    with app.app_context():
+        stored = ParkingSpace.query.filter_by(lot_id=lot_id).count()
+        if not args.keep:
+            ParkingSpace.query.filter_by(lot_id=lot_id).delete(synchronize_session=False)
+            ParkingLot.query.filter_by(id=lot_id).delete(synchronize_session=False)
+            db.session.commit()
+
+    print(f'provisioned {created} spaces ({stored} stored) in {elapsed:.3f} s '
+          f'({created / elapsed:,.0f} spaces/s)')
+    return 0 if stored == args.spaces else 1
+
+if __name__ == '__main__':
+    sys.exit(main())
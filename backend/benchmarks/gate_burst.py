@@ -0,0 +1,105 @@
+"""Gate latency during an exit burst: synchronous check-outs vs the gate event queue.
+
+Fills a throwaway lot with --vehicles parked vehicles, then lets --gates
+threads send all of their exits at once, either as synchronous
+POST /api/occupancy/<id>/check-out requests or as queued
+POST /api/occupancy/gate-events. Reports how long the gates waited per
+event and, for the queue, how long it took until every exit was applied.
+
+Usage:
+    TEST_NEON_DATABASE_URL=postgresql://localhost/parking_test \
+        python benchmarks/gate_burst.py --vehicles 500 --gates 16 --mode both
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# A journal of its own, created before the app reads its configuration
+os.environ['GATE_QUEUE_ENABLED'] = 'true'
+os.environ.setdefault('GATE_QUEUE_PATH', os.path.join(tempfile.mkdtemp(prefix='gate-burst-'), 'gate_queue.sqlite3'))
+
+from app import create_app
+from app.services.gate_queue import gate_queue
+from app.services.parking_service import ParkingService
+from stress_check_in import cleanup, create_lot
+
+def park(space_ids, plate_prefix):
+    """Check a vehicle into every space; returns the occupancy ids"""
+    occupancy_ids = []
+    for start in range(0, len(space_ids), 500):
+        results = ParkingService.process_batch([
+            {'type': 'check_in', 'space_id': space_id, 'vehicle_registration': f'{plate_prefix}{space_id}'}
+            for space_id in space_ids[start:start + 500]
+        ])
+        occupancy_ids += [result['data']['occupancy']['id'] for result in results if result['success']]
+    return occupancy_ids
+
+def gate(client, mode, occupancy_ids, results, start):
+    start.wait()
+    for occupancy_id in occupancy_ids:
+        began = time.perf_counter()
+        if mode == 'sync':
+            response = client.post(f'/api/occupancy/{occupancy_id}/check-out', json={})
+        else:
+            response = client.post('/api/occupancy/gate-events', json={'type': 'check_out', 'occupancy_id': occupancy_id})
+        results.append((response.status_code, time.perf_counter() - began))
+
+def run(app, mode, vehicles, gates):
+    plate_prefix = f'GB{int(time.time()) % 100000}-'
+    with app.app_context():
+        lot_id, space_ids = create_lot(vehicles)
+        occupancy_ids = park(space_ids, plate_prefix)
+
+    client = app.test_client()
+    results = []
+    start = threading.Barrier(gates + 1)
+    threads = [
+        threading.Thread(target=gate, args=(client, mode, occupancy_ids[i::gates], results, start))
+        for i in range(gates)
+    ]
+    for thread in threads:
+        thread.start()
+    start.wait()
+    began = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    acknowledged = time.perf_counter() - began
+
+    applied = acknowledged
+    if mode == 'queue':
+        while gate_queue.journal.depth():
+            time.sleep(0.05)
+        applied = time.perf_counter() - began
+
+    with app.app_context():
+        cleanup(lot_id, plate_prefix)
+
+    latencies = sorted(duration for _, duration in results)
+    statuses = sorted({status for status, _ in results})
+    print(f'mode={mode} gates={gates} exits={len(results)} statuses={statuses}')
+    print(f'  gate wait p50: {latencies[len(latencies) // 2] * 1000:.1f} ms, '
+          f'p99: {latencies[int(len(latencies) * 0.99)] * 1000:.1f} ms')
+    print(f'  all exits acknowledged after {acknowledged:.2f} s, applied after {applied:.2f} s')
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--config', default='testing')
+    parser.add_argument('--mode', choices=['sync', 'queue', 'both'], default='both')
+    parser.add_argument('--vehicles', type=int, default=500)
+    parser.add_argument('--gates', type=int, default=16, help='threads sending exits concurrently')
+    args = parser.parse_args()
+
+    app = create_app(args.config)
+    gate_queue.start_workers()  # as gunicorn's post_fork does in each worker
+    for mode in (['sync', 'queue'] if args.mode == 'both' else [args.mode]):
+        run(app, mode, args.vehicles, args.gates)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
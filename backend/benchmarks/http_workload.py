@@ -0,0 +1,448 @@
+"""End-to-end HTTP benchmark with weighted workload mixes.
+
+Seeds a throwaway data set (lots x spaces x historical occupancies), serves
+create_app() from a threaded WSGI server and drives a weighted mix of the
+real endpoints from many concurrent keep-alive clients. Reports p50/p95/p99
+latency and throughput per route and saves the results as JSON so runs can
+be compared.
+
+Mixes:
+    lots     - lot listing and available spaces only, the reads served
+               asynchronously with --server asgi
+    read     - lot listing, availability and history only
+    mixed    - dashboard reads with a steady stream of check-ins, check-outs
+               and payments
+    write    - mostly check-in, check-out and pay
+
+Usage:
+    TEST_NEON_DATABASE_URL=postgresql://localhost/parking_test \
+        python benchmarks/http_workload.py --lots 20 --spaces 200 --history 5000 \
+        --clients 32 --duration 30 --mix mixed --output results.json
+
+Pass --server asgi to serve the async read mode (app.asgi) from uvicorn
+instead, and compare the two runs on the same database. Pass --base-url to
+drive an already running server that uses the same database instead of the
+built-in one.
+"""
+import argparse
+import collections
+import http.client
+import json
+import os
+import random
+import socket
+import sys
+import threading
+import time
+import urllib.parse
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import create_app
+from app.extensions import db
+from app.models.billing import Billing, PaymentStatus
+from app.models.occupancy import Occupancy, OccupancyStatus
+from app.models.parking_lot import ParkingLot
+from app.models.parking_space import ParkingSpace, SpaceType, SpaceState
+from app.models.revenue import RevenueDaily
+from app.models.user import User
+from app.models.vehicle import Vehicle, VehicleType
+from sqlalchemy import insert
+from werkzeug.serving import WSGIRequestHandler, make_server
+
+MIXES = {
+    'lots': {
+        'list_lots': 50,
+        'available_spaces': 50,
+    },
+    'read': {
+        'list_lots': 40,
+        'available_spaces': 35,
+        'history': 25,
+    },
+    'mixed': {
+        'list_lots': 30,
+        'available_spaces': 25,
+        'history': 10,
+        'check_in': 12,
+        'check_out': 12,
+        'pay': 11,
+    },
+    'write': {
+        'list_lots': 5,
+        'available_spaces': 5,
+        'check_in': 32,
+        'check_out': 30,
+        'pay': 28,
+    },
+}
+
+SEED_CHUNK = 5000
+
+def seed(tag, lots, spaces, history, rng):
+    """Create the benchmark data set and return the ids the workload needs"""
+    user = User(name=f'benchmark-{tag}', contact_no=tag)
+    db.session.add(user)
+    db.session.flush()
+
+    lot_ids = []
+    space_ids = {}
+    for index in range(lots):
+        lot = ParkingLot(
+            name=f'bench-{tag}-{index}',
+            location='HTTP benchmark',
+            capacity=spaces,
+            base_rate=rng.choice([2, 5, 8])
+        )
+        db.session.add(lot)
+        db.session.flush()
+        lot_ids.append(lot.id)
+        space_ids[lot.id] = db.session.execute(
+            insert(ParkingSpace).returning(ParkingSpace.id, sort_by_parameter_order=True),
+            [{
+                'lot_id': lot.id,
+                'space_type': SpaceType.TWO_WHEELER if i % 4 == 0 else SpaceType.FOUR_WHEELER,
+                'state': SpaceState.UNOCCUPIED,
+                'extra_charge': rng.choice([0, 0.5, 1])
+            } for i in range(spaces)]
+        ).scalars().all()
+
+    # A pool of returning vehicles to hang the history on
+    vehicle_count = max(1, min(history, 1000))
+    vehicle_ids = db.session.execute(
+        insert(Vehicle).returning(Vehicle.id, sort_by_parameter_order=True),
+        [{
+            'vehicle_id': f'{tag}H{i}',
+            'owner_id': user.id,
+            'vehicle_type': VehicleType.FOUR_WHEELER
+        } for i in range(vehicle_count)]
+    ).scalars().all()
+
+    now = datetime.utcnow()
+    for lot_id in lot_ids:
+        remaining = history
+        while remaining > 0:
+            chunk = min(SEED_CHUNK, remaining)
+            remaining -= chunk
+            stays = []
+            for _ in range(chunk):
+                entry = now - timedelta(days=rng.uniform(1, 90))
+                stays.append({
+                    'space_id': rng.choice(space_ids[lot_id]),
+                    'vehicle_id': rng.choice(vehicle_ids),
+                    'user_id': user.id,
+                    'entry_time': entry,
+                    'exit_time': entry + timedelta(minutes=rng.randint(10, 600)),
+                    'status': OccupancyStatus.COMPLETED
+                })
+            occupancy_ids = db.session.execute(
+                insert(Occupancy).returning(Occupancy.id, sort_by_parameter_order=True),
+                stays
+            ).scalars().all()
+            db.session.execute(insert(Billing), [{
+                'occupancy_id': occupancy_id,
+                'user_id': user.id,
+                'amount': rng.randint(2, 80),
+                'payment_time': stay['exit_time'],
+                'payment_status': PaymentStatus.PAID
+            } for occupancy_id, stay in zip(occupancy_ids, stays)])
+
+    db.session.commit()
+    return {
+        'user_id': user.id,
+        'lot_ids': lot_ids,
+        'vehicle_ids': vehicle_ids,
+    }
+
+def cleanup(tag, lot_ids, user_id):
+    space_ids = db.session.query(ParkingSpace.id).filter(ParkingSpace.lot_id.in_(lot_ids))
+    occupancy_ids = db.session.query(Occupancy.id).filter(Occupancy.space_id.in_(space_ids))
+    Billing.query.filter(Billing.occupancy_id.in_(occupancy_ids)).delete(synchronize_session=False)
+    Occupancy.query.filter(Occupancy.space_id.in_(space_ids)).delete(synchronize_session=False)
+    Vehicle.query.filter(Vehicle.vehicle_id.like(f'{tag}%')).delete(synchronize_session=False)
+    RevenueDaily.query.filter(RevenueDaily.lot_id.in_(lot_ids)).delete(synchronize_session=False)
+    ParkingSpace.query.filter(ParkingSpace.lot_id.in_(lot_ids)).delete(synchronize_session=False)
+    ParkingLot.query.filter(ParkingLot.id.in_(lot_ids)).delete(synchronize_session=False)
+    User.query.filter(User.id == user_id).delete(synchronize_session=False)
+    db.session.commit()
+
+class Workload:
+    """Shared state of the run: the seeded ids and the live occupancies and bills"""
+
+    def __init__(self, tag, seeded):
+        self.tag = tag
+        self.user_id = seeded['user_id']
+        self.lot_ids = seeded['lot_ids']
+        self.vehicle_ids = seeded['vehicle_ids']
+        self.active = collections.deque()
+        self.unpaid = collections.deque()
+        self._plates = iter(range(10 ** 9))
+        self._lock = threading.Lock()
+
+    def next_plate(self):
+        with self._lock:
+            return f'{self.tag}C{next(self._plates)}'
+
+    def request(self, operation, rng):
+        """Build (route, method, path, body, on_success) for one operation"""
+        if operation == 'check_out':
+            try:
+                occupancy_id = self.active.popleft()
+            except IndexError:
+                operation = 'check_in'
+            else:
+                return ('POST /occupancy/<id>/check-out', 'POST',
+                        f'/api/occupancy/{occupancy_id}/check-out', {},
+                        lambda data: self.unpaid.append(data['billing']['id']))
+
+        if operation == 'pay':
+            try:
+                billing_id = self.unpaid.popleft()
+            except IndexError:
+                operation = 'list_lots'
+            else:
+                return ('POST /billing/<id>/pay', 'POST', f'/api/billing/{billing_id}/pay', {}, None)
+
+        if operation == 'check_in':
+            lot_id = rng.choice(self.lot_ids)
+            return ('POST /occupancy/lots/<id>/check-in', 'POST',
+                    f'/api/occupancy/lots/{lot_id}/check-in',
+                    {'vehicle_registration': self.next_plate(), 'space_type': '4W', 'user_id': self.user_id},
+                    lambda data: self.active.append(data['occupancy']['id']))
+
+        if operation == 'available_spaces':
+            lot_id = rng.choice(self.lot_ids)
+            return ('GET /parking-spaces/available', 'GET',
+                    f'/api/parking-spaces/available?lot_id={lot_id}&space_type=4W', None, None)
+
+        if operation == 'history':
+            vehicle_id = rng.choice(self.vehicle_ids)
+            return ('GET /occupancy/history', 'GET',
+                    f'/api/occupancy/history?vehicle_id={vehicle_id}&limit=50', None, None)
+
+        return ('GET /parking-lots/', 'GET', '/api/parking-lots/', None, None)
+
+class Client(threading.Thread):
+    """One concurrent user on a persistent HTTP/1.1 connection"""
+
+    def __init__(self, base_url, workload, mix, seed, start, deadline_holder, samples):
+        super().__init__(daemon=True)
+        url = urllib.parse.urlsplit(base_url)
+        self.host = url.hostname
+        self.port = url.port or 80
+        self.prefix = url.path.rstrip('/')
+        self.workload = workload
+        self.operations = list(mix)
+        self.weights = [mix[name] for name in self.operations]
+        self.rng = random.Random(seed)
+        self.start_barrier = start
+        self.deadline_holder = deadline_holder
+        self.samples = samples
+        self.connection = None
+
+    def send(self, method, path, body):
+        if self.connection is None:
+            self.connection = http.client.HTTPConnection(self.host, self.port, timeout=60)
+        headers = {}
+        payload = None
+        if body is not None:
+            payload = json.dumps(body)
+            headers['Content-Type'] = 'application/json'
+        try:
+            self.connection.request(method, self.prefix + path, body=payload, headers=headers)
+            response = self.connection.getresponse()
+            return response.status, response.read()
+        except (http.client.HTTPException, OSError):
+            self.connection.close()
+            self.connection = None
+            raise
+
+    def run(self):
+        self.start_barrier.wait()
+        while time.perf_counter() < self.deadline_holder['deadline']:
+            operation = self.rng.choices(self.operations, self.weights)[0]
+            route, method, path, body, on_success = self.workload.request(operation, self.rng)
+
+            began = time.perf_counter()
+            try:
+                status, raw = self.send(method, path, body)
+            except (http.client.HTTPException, OSError):
+                status, raw = 0, b''
+            elapsed = time.perf_counter() - began
+
+            if on_success and status in (200, 201):
+                on_success(json.loads(raw)['data'])
+
+            if time.perf_counter() >= self.deadline_holder['measure_from']:
+                self.samples.append((route, status, elapsed))
+
+        if self.connection is not None:
+            self.connection.close()
+
+def drive(base_url, workload, mix, clients, warmup, duration, seed):
+    """Run the clients against base_url and return the samples of the measured window"""
+    samples = []
+    start = threading.Barrier(clients + 1)
+    window = {'measure_from': float('inf'), 'deadline': float('inf')}
+    threads = [
+        Client(base_url, workload, mix, seed + i, start, window, samples)
+        for i in range(clients)
+    ]
+    for thread in threads:
+        thread.start()
+
+    window['measure_from'] = time.perf_counter() + warmup
+    window['deadline'] = window['measure_from'] + duration
+    start.wait()
+    for thread in threads:
+        thread.join()
+    return samples
+
+def percentile(ordered, fraction):
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+def summarize(samples, elapsed):
+    by_route = collections.defaultdict(list)
+    for route, status, duration in samples:
+        by_route[route].append((status, duration))
+
+    routes = {}
+    for route, results in sorted(by_route.items()):
+        latencies = sorted(duration for _, duration in results)
+        statuses = collections.Counter(str(status) for status, _ in results)
+        routes[route] = {
+            'requests': len(results),
+            'throughput_rps': round(len(results) / elapsed, 2),
+            'errors': sum(count for status, count in statuses.items() if not status.startswith('2')),
+            'status_codes': dict(statuses),
+            'latency_ms': {
+                'mean': round(sum(latencies) / len(latencies) * 1000, 3),
+                'p50': round(percentile(latencies, 0.50) * 1000, 3),
+                'p95': round(percentile(latencies, 0.95) * 1000, 3),
+                'p99': round(percentile(latencies, 0.99) * 1000, 3),
+                'max': round(latencies[-1] * 1000, 3),
+            }
+        }
+
+    return {
+        'requests': len(samples),
+        'throughput_rps': round(len(samples) / elapsed, 2),
+        'routes': routes,
+    }
+
+class QuietRequestHandler(WSGIRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_request(self, *args, **kwargs):
+        pass
+
+def serve(app):
+    """Start a threaded keep-alive WSGI server on a free port and return (stop, base_url)"""
+    server = make_server('127.0.0.1', 0, app, threaded=True, request_handler=QuietRequestHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server.shutdown, f'http://127.0.0.1:{server.server_port}'
+
+def serve_asgi(app):
+    """Start uvicorn on a free port in a background thread and return (stop, base_url)"""
+    import uvicorn
+
+    sock = socket.socket()
+    sock.bind(('127.0.0.1', 0))
+    server = uvicorn.Server(uvicorn.Config(app, log_level='warning', access_log=False))
+    thread = threading.Thread(target=server.run, kwargs={'sockets': [sock]}, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+
+    def stop():
+        server.should_exit = True
+        thread.join()
+
+    return stop, f'http://127.0.0.1:{sock.getsockname()[1]}'
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--config', default='testing')
+    parser.add_argument('--mix', choices=sorted(MIXES), default='mixed')
+    parser.add_argument('--server', choices=['wsgi', 'asgi'], default='wsgi',
+                        help='threaded Flask server or the async read mode on uvicorn')
+    parser.add_argument('--lots', type=int, default=10)
+    parser.add_argument('--spaces', type=int, default=100, help='spaces per lot')
+    parser.add_argument('--history', type=int, default=1000, help='historical occupancies per lot')
+    parser.add_argument('--clients', type=int, default=16)
+    parser.add_argument('--duration', type=float, default=20, help='measured seconds')
+    parser.add_argument('--warmup', type=float, default=3, help='unmeasured seconds before the measurement')
+    parser.add_argument('--seed', type=int, default=1, help='random seed for the data set and the clients')
+    parser.add_argument('--base-url', help='drive an already running server instead of the built-in one')
+    parser.add_argument('--output', help='write the results as JSON to this file')
+    parser.add_argument('--keep', action='store_true', help='keep the generated rows')
+    args = parser.parse_args()
+
+    if args.server == 'asgi':
+        from app.asgi import create_asgi_app
+        server_app = create_asgi_app(args.config)
+        app = server_app.state.flask_app
+    else:
+        app = server_app = create_app(args.config)
+    tag = f'B{int(time.time()) % 100000}'
+    rng = random.Random(args.seed)
+
+    with app.app_context():
+        began = time.perf_counter()
+        seeded = seed(tag, args.lots, args.spaces, args.history, rng)
+        seed_seconds = time.perf_counter() - began
+        dialect = db.engine.dialect.name
+    print(f'seeded {args.lots} lots x {args.spaces} spaces x {args.history} stays in {seed_seconds:.1f} s')
+
+    stop = None
+    base_url = args.base_url
+    if not base_url:
+        stop, base_url = (serve_asgi if args.server == 'asgi' else serve)(server_app)
+
+    workload = Workload(tag, seeded)
+    samples = drive(base_url, workload, MIXES[args.mix], args.clients, args.warmup, args.duration, args.seed)
+
+    if stop is not None:
+        stop()
+
+    results = {
+        'timestamp': datetime.utcnow().isoformat(),
+        'database': dialect,
+        'base_url': args.base_url,
+        'parameters': {
+            'mix': args.mix,
+            'server': args.server,
+            'weights': MIXES[args.mix],
+            'lots': args.lots,
+            'spaces_per_lot': args.spaces,
+            'history_per_lot': args.history,
+            'clients': args.clients,
+            'duration': args.duration,
+            'warmup': args.warmup,
+            'seed': args.seed,
+        },
+        'seed_seconds': round(seed_seconds, 3),
+        **summarize(samples, args.duration)
+    }
+
+    with app.app_context():
+        if not args.keep:
+            cleanup(tag, seeded['lot_ids'], seeded['user_id'])
+
+    print(f'server={args.server} mix={args.mix} clients={args.clients} duration={args.duration:g}s '
+          f'requests={results["requests"]} throughput={results["throughput_rps"]:.1f} req/s')
+    print(f'{"route":40} {"req":>7} {"rps":>8} {"err":>5} {"p50 ms":>8} {"p95 ms":>8} {"p99 ms":>8}')
+    for route, stats in results['routes'].items():
+        latency = stats['latency_ms']
+        print(f'{route:40} {stats["requests"]:>7} {stats["throughput_rps"]:>8.1f} {stats["errors"]:>5} '
+              f'{latency["p50"]:>8.1f} {latency["p95"]:>8.1f} {latency["p99"]:>8.1f}')
+
+    if args.output:
+        with open(args.output, 'w') as output:
+            json.dump(results, output, indent=2)
+        print(f'results written to {args.output}')
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,127 @@
+"""CPU time and response size of large list payloads per JSON provider and encoding.
+
+Builds list responses of --rows parking spaces, occupancies (with vehicle
+and owner) and bills from in-memory model objects, then times serializing
+them with each JSON provider (app.utils.json_provider) and compressing the
+result with each content encoding the app negotiates
+(app.utils.compression). No database is needed.
+
+Usage:
+    python benchmarks/json_payload.py --rows 10000 --repeat 20 --output payloads.json
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from flask import Flask
+from app.models.billing import Billing, PaymentStatus
+from app.models.occupancy import Occupancy, OccupancyStatus
+from app.models.parking_space import ParkingSpace, SpaceType, SpaceState
+from app.models.user import User, UserRole
+from app.models.vehicle import Vehicle, VehicleType
+from app.utils import compression
+from app.utils.compression import compress_body
+from app.utils.json_provider import JSON_PROVIDERS, orjson
+
+def build_payloads(rows):
+    """List response bodies shaped like the space, occupancy and billing listings"""
+    started = datetime(2026, 1, 1, 8, 0)
+    owner = User(id=1, name='Benchmark Owner', contact_no='5550100', role=UserRole.CUSTOMER)
+
+    spaces, occupancies, bills = [], [], []
+    for i in range(rows):
+        stamp = started + timedelta(minutes=i)
+        spaces.append(ParkingSpace(
+            id=i + 1, lot_id=i % 50 + 1, space_type=SpaceType.FOUR_WHEELER if i % 3 else SpaceType.TWO_WHEELER,
+            state=SpaceState.OCCUPIED if i % 4 == 0 else SpaceState.UNOCCUPIED, extra_charge=1.5,
+            created_at=stamp, updated_at=stamp
+        ).to_dict())
+        vehicle = Vehicle(id=i + 1, vehicle_id=f'KA01AB{i:05d}', vehicle_type=VehicleType.FOUR_WHEELER, owner=owner)
+        occupancies.append(Occupancy(
+            id=i + 1, space_id=i + 1, vehicle_id=vehicle.id, vehicle=vehicle, user_id=owner.id,
+            entry_time=stamp, exit_time=stamp + timedelta(hours=2), status=OccupancyStatus.COMPLETED,
+            created_at=stamp, updated_at=stamp
+        ).to_dict())
+        bills.append(Billing(
+            id=i + 1, occupancy_id=i + 1, user_id=owner.id, amount=13.0,
+            payment_time=stamp + timedelta(hours=2), payment_status=PaymentStatus.PAID,
+            created_at=stamp, updated_at=stamp
+        ).to_dict())
+
+    return {
+        name: {'success': True, 'data': data, 'count': len(data)}
+        for name, data in (('spaces', spaces), ('occupancies', occupancies), ('billing', bills))
+    }
+
+def cpu_ms(function, repeat):
+    """Mean process CPU time of one call in milliseconds"""
+    started = time.process_time()
+    for _ in range(repeat):
+        result = function()
+    return (time.process_time() - started) / repeat * 1000, result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=20, help='calls averaged per measurement')
+    parser.add_argument('--gzip-level', type=int, default=6)
+    parser.add_argument('--brotli-quality', type=int, default=4)
+    parser.add_argument('--output', help='write the results as JSON to this file')
+    args = parser.parse_args()
+
+    payloads = build_payloads(args.rows)
+    providers = [name for name in JSON_PROVIDERS if name != 'orjson' or orjson is not None]
+    encodings = ['identity', 'gzip'] + (['br'] if compression.brotli is not None else [])
+
+    app = Flask(__name__)
+    results = []
+    print(f'{"payload":12} {"provider":8} {"encoding":9} {"encode ms":>10} {"compress ms":>12} '
+          f'{"total ms":>9} {"bytes":>10}')
+    for payload_name, payload in payloads.items():
+        for provider_name in providers:
+            provider = JSON_PROVIDERS[provider_name](app)
+            with app.app_context():
+                encode_ms, response = cpu_ms(lambda: provider.response(payload), args.repeat)
+            body = response.get_data()
+
+            for encoding in encodings:
+                compress_ms, compressed = 0.0, body
+                if encoding != 'identity':
+                    compress_ms, compressed = cpu_ms(
+                        lambda: compress_body(body, encoding, args.gzip_level, args.brotli_quality), args.repeat
+                    )
+                result = {
+                    'payload': payload_name,
+                    'provider': provider_name,
+                    'encoding': encoding,
+                    'encode_ms': round(encode_ms, 3),
+                    'compress_ms': round(compress_ms, 3),
+                    'total_ms': round(encode_ms + compress_ms, 3),
+                    'bytes': len(compressed),
+                }
+                results.append(result)
+                print(f'{payload_name:12} {provider_name:8} {encoding:9} {result["encode_ms"]:>10.2f} '
+                      f'{result["compress_ms"]:>12.2f} {result["total_ms"]:>9.2f} {result["bytes"]:>10}')
+
+    if args.output:
+        with open(args.output, 'w') as output:
+            json.dump({
+                'timestamp': datetime.utcnow().isoformat(),
+                'parameters': {
+                    'rows': args.rows,
+                    'repeat': args.repeat,
+                    'gzip_level': args.gzip_level,
+                    'brotli_quality': args.brotli_quality,
+                },
+                'results': results
+            }, output, indent=2)
+        print(f'results written to {args.output}')
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
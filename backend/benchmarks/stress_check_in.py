@@ -0,0 +1,145 @@
+"""Concurrent check-in stress test.
+
+Creates a throwaway lot, lets many threads check vehicles in at the same
+time and then verifies that no space was handed to two vehicles. Reports
+the check-in throughput reached.
+
+Modes:
+    lot    - every thread uses the auto-assign lot check-in
+    space  - every thread races for random spaces of the lot by id
+
+Usage:
+    TEST_NEON_DATABASE_URL=postgresql://localhost/parking_test \
+        python benchmarks/stress_check_in.py --threads 32 --spaces 500 --mode lot
+"""
+import argparse
+import os
+import random
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import create_app
+from app.extensions import db
+from app.models.billing import Billing
+from app.models.occupancy import Occupancy, OccupancyStatus
+from app.models.parking_lot import ParkingLot
+from app.models.parking_space import ParkingSpace, SpaceType, SpaceState
+from app.models.vehicle import Vehicle
+from app.services.parking_service import ParkingService
+from sqlalchemy import func, insert
+
+def create_lot(spaces):
+    lot = ParkingLot(
+        name=f'stress-{int(time.time() * 1000)}',
+        location='Stress test',
+        capacity=spaces,
+        base_rate=1
+    )
+    db.session.add(lot)
+    db.session.flush()
+    db.session.execute(insert(ParkingSpace), [
+        {'lot_id': lot.id, 'space_type': SpaceType.FOUR_WHEELER, 'state': SpaceState.UNOCCUPIED, 'extra_charge': 0}
+        for _ in range(spaces)
+    ])
+    db.session.commit()
+    space_ids = [space_id for (space_id,) in db.session.query(ParkingSpace.id).filter_by(lot_id=lot.id)]
+    return lot.id, space_ids
+
+def cleanup(lot_id, plate_prefix):
+    space_ids = db.session.query(ParkingSpace.id).filter(ParkingSpace.lot_id == lot_id)
+    occupancy_ids = db.session.query(Occupancy.id).filter(Occupancy.space_id.in_(space_ids))
+    Billing.query.filter(Billing.occupancy_id.in_(occupancy_ids)).delete(synchronize_session=False)
+    Occupancy.query.filter(Occupancy.space_id.in_(space_ids)).delete(synchronize_session=False)
+    Vehicle.query.filter(Vehicle.vehicle_id.like(f'{plate_prefix}%')).delete(synchronize_session=False)
+    ParkingSpace.query.filter(ParkingSpace.lot_id == lot_id).delete(synchronize_session=False)
+    ParkingLot.query.filter(ParkingLot.id == lot_id).delete(synchronize_session=False)
+    db.session.commit()
+
+def worker(app, mode, lot_id, space_ids, plates, results, start):
+    rng = random.Random()
+    with app.app_context():
+        start.wait()
+        for plate in plates:
+            began = time.perf_counter()
+            if mode == 'lot':
+                occupancy, message = ParkingService.check_in_to_lot(
+                    lot_id=lot_id,
+                    vehicle_registration=plate,
+                    space_type=SpaceType.FOUR_WHEELER
+                )
+            else:
+                occupancy, message = ParkingService.check_in_vehicle(
+                    space_id=rng.choice(space_ids),
+                    vehicle_registration=plate,
+                    claimable_states=(SpaceState.UNOCCUPIED,)
+                )
+            results.append((occupancy is not None, time.perf_counter() - began))
+        db.session.remove()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--config', default='testing')
+    parser.add_argument('--mode', choices=['lot', 'space'], default='lot')
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--spaces', type=int, default=200)
+    parser.add_argument('--attempts', type=int, default=None,
+                        help='total check-in attempts (default: 2x the number of spaces)')
+    parser.add_argument('--keep', action='store_true', help='keep the generated rows')
+    args = parser.parse_args()
+
+    app = create_app(args.config)
+    attempts = args.attempts or args.spaces * 2
+    plate_prefix = f'ST{int(time.time()) % 100000}-'
+    plates = [f'{plate_prefix}{i}' for i in range(attempts)]
+
+    with app.app_context():
+        lot_id, space_ids = create_lot(args.spaces)
+
+    results = []
+    start = threading.Barrier(args.threads + 1)
+    threads = [
+        threading.Thread(target=worker, args=(
+            app, args.mode, lot_id, space_ids, plates[i::args.threads], results, start
+        ))
+        for i in range(args.threads)
+    ]
+    for thread in threads:
+        thread.start()
+    start.wait()
+    began = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - began
+
+    with app.app_context():
+        double_booked = db.session.query(Occupancy.space_id).join(
+            ParkingSpace, ParkingSpace.id == Occupancy.space_id
+        ).filter(
+            ParkingSpace.lot_id == lot_id,
+            Occupancy.status == OccupancyStatus.ACTIVE
+        ).group_by(Occupancy.space_id).having(func.count(Occupancy.id) > 1).count()
+        occupied = ParkingSpace.query.filter_by(lot_id=lot_id, state=SpaceState.OCCUPIED).count()
+
+        if not args.keep:
+            cleanup(lot_id, plate_prefix)
+
+    succeeded = sum(1 for ok, _ in results if ok)
+    latencies = sorted(duration for _, duration in results)
+    print(f'mode={args.mode} threads={args.threads} spaces={args.spaces} attempts={attempts}')
+    print(f'check-ins succeeded: {succeeded} (spaces occupied: {occupied})')
+    print(f'double-booked spaces: {double_booked}')
+    print(f'throughput: {len(results) / elapsed:.1f} attempts/s, {succeeded / elapsed:.1f} check-ins/s')
+    print(f'p50 latency: {latencies[len(latencies) // 2] * 1000:.1f} ms, '
+          f'p99 latency: {latencies[int(len(latencies) * 0.99)] * 1000:.1f} ms')
+
+    if double_booked or succeeded != occupied or succeeded > args.spaces:
+        print('❌ Double booking detected')
+        return 1
+    print('✅ No double bookings')
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,157 @@
+"""Throughput of the production server (gunicorn.conf.py) as workers are added.
+
+Seeds one data set, then for every worker count starts gunicorn with
+WEB_CONCURRENCY workers on the same database, drives the same weighted
+workload as http_workload.py against it and stops it again. Prints
+throughput and latency per worker count and saves them as JSON.
+
+Usage:
+    TEST_NEON_DATABASE_URL=postgresql://localhost/parking_test \
+        python benchmarks/worker_scaling.py --workers 1,2,4,8 --clients 64 --duration 20 --mix read
+"""
+import argparse
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+BACKEND = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, BACKEND)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app import create_app
+from app.extensions import db
+from http_workload import MIXES, Workload, cleanup, drive, percentile, seed, summarize
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+def start_server(workers, threads, port, config, max_connections):
+    """Start gunicorn with the production settings and wait until it accepts connections"""
+    env = dict(
+        os.environ,
+        WEB_CONCURRENCY=str(workers),
+        GUNICORN_THREADS=str(threads),
+        GUNICORN_BIND=f'127.0.0.1:{port}',
+        FLASK_CONFIG=config,
+        DATABASE_MAX_CONNECTIONS=str(max_connections)
+    )
+    env.pop('PROMETHEUS_MULTIPROC_DIR', None)
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'wsgi:app'],
+        cwd=BACKEND, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE
+    )
+
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f'gunicorn exited: {process.stderr.read().decode()[-2000:]}')
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=1).close()
+            return process
+        except OSError:
+            time.sleep(0.2)
+    process.kill()
+    raise RuntimeError('gunicorn did not start within 60 s')
+
+def stop_server(process):
+    process.terminate()
+    try:
+        process.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--config', default='testing')
+    parser.add_argument('--workers', default='1,2,4', help='comma separated worker counts')
+    parser.add_argument('--threads', type=int, default=4, help='threads per worker')
+    parser.add_argument('--max-connections', type=int, default=100,
+                        help='DATABASE_MAX_CONNECTIONS shared by all workers')
+    parser.add_argument('--mix', choices=sorted(MIXES), default='read')
+    parser.add_argument('--lots', type=int, default=10)
+    parser.add_argument('--spaces', type=int, default=100, help='spaces per lot')
+    parser.add_argument('--history', type=int, default=1000, help='historical occupancies per lot')
+    parser.add_argument('--clients', type=int, default=32)
+    parser.add_argument('--duration', type=float, default=15, help='measured seconds per worker count')
+    parser.add_argument('--warmup', type=float, default=3, help='unmeasured seconds before each measurement')
+    parser.add_argument('--seed', type=int, default=1, help='random seed for the data set and the clients')
+    parser.add_argument('--output', help='write the results as JSON to this file')
+    args = parser.parse_args()
+
+    worker_counts = [int(count) for count in args.workers.split(',')]
+    app = create_app(args.config)
+    tag = f'W{int(time.time()) % 100000}'
+
+    with app.app_context():
+        seeded = seed(tag, args.lots, args.spaces, args.history, random.Random(args.seed))
+        dialect = db.engine.dialect.name
+    print(f'seeded {args.lots} lots x {args.spaces} spaces x {args.history} stays')
+
+    runs = []
+    try:
+        for workers in worker_counts:
+            port = free_port()
+            process = start_server(workers, args.threads, port, args.config, args.max_connections)
+            try:
+                samples = drive(f'http://127.0.0.1:{port}', Workload(tag, seeded), MIXES[args.mix],
+                                args.clients, args.warmup, args.duration, args.seed)
+            finally:
+                stop_server(process)
+
+            summary = summarize(samples, args.duration)
+            latencies = sorted(duration for _, _, duration in samples)
+            run = {
+                'workers': workers,
+                'requests': summary['requests'],
+                'throughput_rps': summary['throughput_rps'],
+                'errors': sum(route['errors'] for route in summary['routes'].values()),
+                'p50_ms': round(percentile(latencies, 0.50) * 1000, 3) if latencies else None,
+                'p99_ms': round(percentile(latencies, 0.99) * 1000, 3) if latencies else None,
+                'routes': summary['routes']
+            }
+            runs.append(run)
+            print(f'workers={workers:<3} throughput={run["throughput_rps"]:>8.1f} req/s '
+                  f'p50={run["p50_ms"]} ms p99={run["p99_ms"]} ms errors={run["errors"]}')
+    finally:
+        with app.app_context():
+            cleanup(tag, seeded['lot_ids'], seeded['user_id'])
+
+    baseline = runs[0]['throughput_rps'] if runs and runs[0]['throughput_rps'] else None
+    for run in runs:
+        run['speedup'] = round(run['throughput_rps'] / baseline, 2) if baseline else None
+
+    results = {
+        'timestamp': datetime.utcnow().isoformat(),
+        'database': dialect,
+        'parameters': {
+            'mix': args.mix,
+            'threads': args.threads,
+            'max_connections': args.max_connections,
+            'clients': args.clients,
+            'duration': args.duration,
+            'warmup': args.warmup,
+            'seed': args.seed,
+        },
+        'runs': runs
+    }
+
+    print(f'{"workers":>8} {"rps":>9} {"speedup":>8}')
+    for run in runs:
+        print(f'{run["workers"]:>8} {run["throughput_rps"]:>9.1f} {run["speedup"]:>8}')
+
+    if args.output:
+        with open(args.output, 'w') as output:
+            json.dump(results, output, indent=2)
+        print(f'results written to {args.output}')
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
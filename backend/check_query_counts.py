@@ -0,0 +1,110 @@
+"""Query-count check for the occupancy listings (no N+1 lazy loads).
+
+Seeds a throwaway SQLite database with one active and one completed stay,
+counts the SQL statements each occupancy endpoint issues, then grows the
+data to --rows stays of each kind and counts again. Each stay has its own
+vehicle and owner, so a lazy load per row would show up as extra
+statements. Exits non-zero when any count grows with the number of rows.
+
+Usage:
+    python check_query_counts.py [--rows 50]
+"""
+import argparse
+import os
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+# A database of its own, chosen before the app reads its configuration
+DATABASE = os.path.join(tempfile.mkdtemp(prefix='query-counts-'), 'check.db')
+os.environ['TEST_NEON_DATABASE_URL'] = f'sqlite:///{DATABASE}'
+
+from app import create_app
+from app.extensions import db
+from app.models import Occupancy, ParkingLot, ParkingSpace, User, Vehicle
+from app.models.occupancy import OccupancyStatus
+from app.models.parking_space import SpaceState, SpaceType
+from app.models.vehicle import VehicleType
+from sqlalchemy import event
+
+CHECKS = [
+    '/api/occupancy/',
+    '/api/occupancy/?status=active',
+    '/api/occupancy/?stream=true',
+    '/api/occupancy/active',
+    '/api/occupancy/history',
+    '/api/occupancy/history?stream=true',
+    '/api/occupancy/{occupancy_id}',
+]
+
+def add_stays(lot, start, count):
+    """Add count active and count completed stays, each with its own vehicle and owner"""
+    entry = datetime(2026, 1, 1, 8, 0)
+    for n in range(start, start + count):
+        for status in (OccupancyStatus.ACTIVE, OccupancyStatus.COMPLETED):
+            active = status == OccupancyStatus.ACTIVE
+            owner = User(name=f'Owner {n} {status.value}', contact_no=f'{n:05d}{int(active)}')
+            vehicle = Vehicle(vehicle_id=f'QC{n:05d}{int(active)}', vehicle_type=VehicleType.FOUR_WHEELER, owner=owner)
+            space = ParkingSpace(
+                parking_lot=lot, space_type=SpaceType.FOUR_WHEELER,
+                state=SpaceState.OCCUPIED if active else SpaceState.UNOCCUPIED, extra_charge=0
+            )
+            db.session.add(Occupancy(
+                parking_space=space, vehicle=vehicle, user=owner, entry_time=entry,
+                exit_time=None if active else entry + timedelta(hours=2), status=status
+            ))
+    db.session.commit()
+
+def count_statements(client, url):
+    """Request url and return (status code, number of statements executed)"""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        response = client.get(url)
+        response.get_data()
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+    return response.status_code, len(statements)
+
+def count_all(client):
+    occupancy_id = db.session.execute(db.select(Occupancy.id).limit(1)).scalar()
+    return {url: count_statements(client, url.format(occupancy_id=occupancy_id)) for url in CHECKS}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=50, help='stays of each kind in the second run')
+    args = parser.parse_args()
+
+    app = create_app('testing')
+    with app.app_context():
+        db.create_all()
+        lot = ParkingLot(name='Query count lot', location='Check', capacity=2 * args.rows, base_rate=5)
+        db.session.add(lot)
+
+        client = app.test_client()
+        add_stays(lot, 0, 1)
+        small = count_all(client)
+        add_stays(lot, 1, args.rows - 1)
+        large = count_all(client)
+
+    failures = 0
+    print(f'{"endpoint":40} {"1 row":>6} {args.rows:>4} rows')
+    for url in CHECKS:
+        (small_status, small_count), (large_status, large_count) = small[url], large[url]
+        ok = small_status == large_status == 200 and small_count == large_count
+        failures += not ok
+        print(f'{"✓" if ok else "✗"} {url:38} {small_count:>6} {large_count:>9}'
+              + ('' if small_status == large_status == 200 else f'  (HTTP {small_status}/{large_status})'))
+
+    if failures:
+        print(f'\n❌ {failures} endpoint(s) issue more statements as rows grow')
+        return 1
+    print('\n✅ Query counts are independent of the number of rows')
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
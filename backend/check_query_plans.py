@@ -0,0 +1,172 @@
+"""Query-plan regression check for the hot service and route queries.
+
+Runs each hot endpoint against a seeded local Postgres, captures every SQL
+statement it issues and EXPLAINs it. Exits non-zero when any plan contains
+a sequential scan on a table large enough that an index should be used.
+
+A seeded table is far smaller than in production, so the planner may read
+all of it into a hash join where it would probe it by index at full size.
+Such a scan only fails when the table is still not reached through an index
+condition once sequential scans, hash and merge joins are disabled.
+
+Usage:
+    TEST_NEON_DATABASE_URL=postgresql://localhost/parking_test \
+        python check_query_plans.py [--min-rows 10000]
+"""
+import argparse
+import json
+import sys
+from app import create_app
+from app.extensions import db
+from sqlalchemy import event
+
+# Hot read paths; placeholders are filled with ids sampled from the database
+CHECKS = [
+    '/api/parking-lots/{lot_id}',
+    '/api/parking-lots/{lot_id}/spaces',
+    '/api/parking-spaces/available?lot_id={lot_id}&space_type=4W',
+    '/api/occupancy/?status=active',
+    '/api/occupancy/?vehicle_id={vehicle_id}',
+    '/api/occupancy/?space_id={space_id}&status=active',
+    '/api/occupancy/active',
+    '/api/occupancy/history?vehicle_id={vehicle_id}',
+    '/api/billing/?payment_status=paid',
+    '/api/billing/?occupancy_id={occupancy_id}',
+    '/api/billing/pending',
+    '/api/billing/revenue?start_date=2000-01-01&end_date=2000-01-31',
+    '/api/users/{user_id}/vehicles',
+]
+
+LARGE_TABLE_CANDIDATES = ['parking_spaces', 'vehicles', 'occupancies', 'billing']
+
+def sample_ids():
+    """Pick ids that exist in the seeded database for the URL placeholders"""
+    def first(sql):
+        return db.session.execute(db.text(sql)).scalar()
+
+    return {
+        'lot_id': first('SELECT lot_id FROM parking_spaces GROUP BY lot_id ORDER BY count(*) DESC LIMIT 1'),
+        'space_id': first('SELECT space_id FROM occupancies ORDER BY id DESC LIMIT 1'),
+        'vehicle_id': first('SELECT vehicle_id FROM occupancies WHERE vehicle_id IS NOT NULL ORDER BY id DESC LIMIT 1'),
+        'occupancy_id': first('SELECT occupancy_id FROM billing ORDER BY id DESC LIMIT 1'),
+        'user_id': first('SELECT owner_id FROM vehicles WHERE owner_id IS NOT NULL ORDER BY id DESC LIMIT 1'),
+    }
+
+def large_tables(min_rows):
+    """Tables whose planner row estimate is at least min_rows"""
+    rows = db.session.execute(
+        db.text('SELECT relname, reltuples FROM pg_class WHERE relname = ANY(:names)'),
+        {'names': LARGE_TABLE_CANDIDATES}
+    ).all()
+    return {name for name, estimate in rows if estimate >= min_rows}
+
+def capture_statements(client, url):
+    """Request url and return the (statement, parameters) pairs it executed"""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith('SELECT'):
+            statements.append((statement, parameters))
+
+    event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        response = client.get(url)
+        response.get_data()
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+
+    return response.status_code, statements
+
+def seq_scans(plan, tables):
+    """Yield the large relations scanned sequentially anywhere in a JSON plan"""
+    if plan.get('Node Type') == 'Seq Scan' and plan.get('Relation Name') in tables:
+        yield plan['Relation Name']
+    for child in plan.get('Plans', []):
+        yield from seq_scans(child, tables)
+
+def index_lookups(plan):
+    """Yield the relations read through an index condition anywhere in a JSON plan"""
+    if plan.get('Node Type') in ('Index Scan', 'Index Only Scan') and 'Index Cond' in plan:
+        yield plan['Relation Name']
+    elif plan.get('Node Type') == 'Bitmap Heap Scan':
+        yield plan['Relation Name']
+    for child in plan.get('Plans', []):
+        yield from index_lookups(child)
+
+def unindexed_scans(statement, parameters, tables):
+    """Large relations sequentially scanned by the statement that no index condition can reach"""
+    scanned = set(seq_scans(explain(statement, parameters), tables))
+    if scanned:
+        scanned -= set(index_lookups(explain(statement, parameters, full_size=True)))
+    return sorted(scanned)
+
+def explain(statement, parameters, full_size=False):
+    """JSON plan of statement; full_size plans it as if every table were too large to read whole"""
+    connection = db.engine.raw_connection()
+    try:
+        cursor = connection.cursor()
+        if full_size:
+            # SET LOCAL is undone by the rollback on return to the pool
+            for setting in ('enable_seqscan', 'enable_hashjoin', 'enable_mergejoin'):
+                cursor.execute(f'SET LOCAL {setting} = off')
+        cursor.execute('EXPLAIN (FORMAT JSON) ' + statement, parameters)
+        plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return plan[0]['Plan']
+    finally:
+        connection.close()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--config', default='testing', help='create_app() configuration name')
+    parser.add_argument('--min-rows', type=int, default=10000,
+                        help='tables with at least this many rows must not be sequentially scanned')
+    args = parser.parse_args()
+
+    app = create_app(args.config)
+
+    with app.app_context():
+        if db.engine.dialect.name != 'postgresql':
+            print('❌ Query plans can only be checked against PostgreSQL')
+            return 2
+
+        db.session.execute(db.text('ANALYZE'))
+        db.session.commit()
+
+        tables = large_tables(args.min_rows)
+        ids = sample_ids()
+        print(f'Large tables (>= {args.min_rows} rows): {", ".join(sorted(tables)) or "none"}')
+
+        client = app.test_client()
+        failures = 0
+
+        for template in CHECKS:
+            missing = [name for name, value in ids.items() if value is None and '{%s}' % name in template]
+            if missing:
+                print(f'⏩ {template}: no sample row for {", ".join(missing)}')
+                continue
+            url = template.format(**ids)
+
+            status, statements = capture_statements(client, url)
+            url_failures = 0
+            for statement, parameters in statements:
+                scanned = unindexed_scans(statement, parameters, tables)
+                if scanned:
+                    url_failures += 1
+                    print(f'❌ {url} [{status}]: Seq Scan on {", ".join(scanned)}')
+                    print(f'   {" ".join(statement.split())[:300]}')
+
+            if not url_failures:
+                print(f'✅ {url} [{status}]: {len(statements)} statement(s) use indexes')
+            failures += url_failures
+
+        if failures:
+            print(f'\n{failures} statement(s) fell back to sequential scans')
+            return 1
+
+        print('\nAll hot query plans use indexes')
+        return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
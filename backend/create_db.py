@@ -25,7 +25,7 @@ def add_vehicle_for_user15():
             ]
 
             for v in vehicles_to_add:
-                existing = Vehicle.query.filter_by(vehicle_id=v["vehicle_id"]).first()
+                existing = Vehicle.find_by_plate(v["vehicle_id"])
 
                 if not existing:
                     new_vehicle = Vehicle(
@@ -0,0 +1,68 @@
+"""Gunicorn settings for wsgi:app
+
+The app is imported once in the master and forked into WEB_CONCURRENCY
+workers. Each worker drops the connections inherited from the master and
+opens its own, from a pool sized so that all workers together stay below
+DATABASE_MAX_CONNECTIONS (see app.config.worker_pool_limits).
+"""
+import glob
+import multiprocessing
+import os
+import tempfile
+
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+# The server drains the gate event queue; other entry points leave it off
+os.environ.setdefault('GATE_QUEUE_ENABLED', 'true')
+os.environ.setdefault('DATABASE_MAX_CONNECTIONS', '100')
+
+# Threads of one worker that may hold a database connection at the same time:
+# request threads, gate queue drain threads and the availability snapshot thread
+connections_per_worker = threads + 1
+if os.environ['GATE_QUEUE_ENABLED'].lower() in ('1', 'true', 'yes'):
+    connections_per_worker += int(os.environ.get('GATE_QUEUE_WORKERS', 2))
+
+# By default as many workers as the connection budget gives each of them
+# connections_per_worker; an explicit WEB_CONCURRENCY is taken as is
+workers = multiprocessing.cpu_count() * 2 + 1
+if int(os.environ['DATABASE_MAX_CONNECTIONS']):
+    workers = max(1, min(workers, int(os.environ['DATABASE_MAX_CONNECTIONS']) // connections_per_worker))
+workers = int(os.environ.get('WEB_CONCURRENCY', workers))
+worker_class = 'gthread'
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:5000')
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 30))
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE', 5))
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 0))
+max_requests_jitter = max_requests // 10
+preload_app = True
+accesslog = os.environ.get('GUNICORN_ACCESS_LOG')  # e.g. '-' for stdout
+errorlog = '-'
+
+# Read by app.config while the app is preloaded, before any engine is built
+os.environ['WEB_CONCURRENCY'] = str(workers)
+os.environ['GUNICORN_THREADS'] = str(threads)
+
+# Workers write their Prometheus samples here so /metrics can merge them;
+# it has to be set before the app (and prometheus_client) is imported
+if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+    # Samples left by a previous run would be merged into this one
+    for leftover in glob.glob(os.path.join(os.environ['PROMETHEUS_MULTIPROC_DIR'], '*.db')):
+        os.remove(leftover)
+else:
+    os.environ['PROMETHEUS_MULTIPROC_DIR'] = tempfile.mkdtemp(prefix='prometheus-')
+
+def post_fork(server, worker):
+    from app.extensions import db
+    from app.services.gate_queue import gate_queue
+    from wsgi import app
+    
+    # Connections opened in the master must not be shared with the workers
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=False)
+    
+    # Every worker drains the gate event queue from the start, not only once it serves a request
+    gate_queue.start_workers()
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,54 @@
+"""Add composite and partial indexes for the hot query paths
+
+Revision ID: add_hot_path_indexes
+Revises: add_user_id_columns
+Create Date: 2026-10-18 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_hot_path_indexes'
+down_revision = 'add_user_id_columns'
+branch_labels = None
+depends_on = None
+
+
+# (name, table, columns, partial index predicate)
+INDEXES = [
+    # Active/completed lookups per space and per vehicle
+    ('ix_occupancies_status_space_id', 'occupancies', ['status', 'space_id'], None),
+    ('ix_occupancies_vehicle_id_status', 'occupancies', ['vehicle_id', 'status'], None),
+    # Keyset pagination of the occupancy list and history
+    ('ix_occupancies_entry_time_id', 'occupancies', ['entry_time', 'id'], None),
+    ('ix_occupancies_status_entry_time_id', 'occupancies', ['status', 'entry_time', 'id'], None),
+    # Space filters, plus a small index over free spaces only for availability
+    ('ix_parking_spaces_lot_id_state_space_type', 'parking_spaces', ['lot_id', 'state', 'space_type'], None),
+    ('ix_parking_spaces_free_lot_id_space_type', 'parking_spaces', ['lot_id', 'space_type'], "state = 'UNOCCUPIED'"),
+    # Pending/paid billing listings and revenue ranges
+    ('ix_billing_payment_status_created_at_id', 'billing', ['payment_status', 'created_at', 'id'], None),
+    ('ix_billing_payment_status_payment_time_id', 'billing', ['payment_status', 'payment_time', 'id'], None),
+    ('ix_billing_created_at_id', 'billing', ['created_at', 'id'], None),
+    ('ix_billing_occupancy_id', 'billing', ['occupancy_id'], None),
+    # Vehicles of a user
+    ('ix_vehicles_owner_id', 'vehicles', ['owner_id'], None),
+]
+
+
+def upgrade():
+    # Build concurrently so large tables stay writable during the migration
+    with op.get_context().autocommit_block():
+        for name, table, columns, where in INDEXES:
+            op.create_index(
+                name, table, columns,
+                postgresql_concurrently=True,
+                postgresql_where=sa.text(where) if where else None
+            )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name, table, columns, where in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True)
@@ -0,0 +1,35 @@
+"""Add per-lot tariff rules
+
+Revision ID: add_lot_tariffs
+Revises: add_revenue_daily_rollup
+Create Date: 2026-10-18 12:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_lot_tariffs'
+down_revision = 'add_revenue_daily_rollup'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('tariffs',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('lot_id', sa.Integer(), nullable=False),
+    sa.Column('rules', sa.JSON(), nullable=False),
+    sa.Column('grace_minutes', sa.Integer(), nullable=False),
+    sa.Column('daily_cap', sa.Numeric(precision=10, scale=2), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['lot_id'], ['parking_lots.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('lot_id')
+    )
+
+
+def downgrade():
+    op.drop_table('tariffs')
@@ -0,0 +1,25 @@
+"""Add parking_lots.version, bumped by every commit changing a lot or its spaces
+
+Revision ID: add_lot_version
+Revises: add_processed_gate_events
+Create Date: 2026-10-18 20:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_lot_version'
+down_revision = 'add_processed_gate_events'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # A constant server default: no table rewrite on PostgreSQL 11+
+    op.add_column('parking_lots', sa.Column('version', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade():
+    op.drop_column('parking_lots', 'version')
@@ -0,0 +1,39 @@
+"""Add vehicles.plate_normalized with a unique index for registration lookups
+
+Revision ID: add_plate_normalized
+Revises: add_space_updated_at_index
+Create Date: 2026-10-18 15:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_plate_normalized'
+down_revision = 'add_space_updated_at_index'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('vehicles', sa.Column('plate_normalized', sa.String(length=20), nullable=True))
+    # Same as app.models.vehicle.normalize_plate: upper case without spaces or dashes
+    op.execute(
+        "UPDATE vehicles SET plate_normalized = "
+        "UPPER(REGEXP_REPLACE(vehicle_id, '[[:space:]-]+', '', 'g'))"
+    )
+    op.alter_column('vehicles', 'plate_normalized', nullable=False)
+
+    # Fails if two registrations differ only in spacing or case: merge those vehicles first
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_vehicles_plate_normalized', 'vehicles', ['plate_normalized'],
+            unique=True, postgresql_concurrently=True
+        )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_vehicles_plate_normalized', table_name='vehicles', postgresql_concurrently=True)
+    op.drop_column('vehicles', 'plate_normalized')
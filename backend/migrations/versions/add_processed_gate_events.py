@@ -0,0 +1,34 @@
+"""Add processed_gate_events so redelivered gate queue events are applied once
+
+Revision ID: add_processed_gate_events
+Revises: add_space_updated_at_global_index
+Create Date: 2026-10-18 18:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_processed_gate_events'
+down_revision = 'add_space_updated_at_global_index'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('processed_gate_events',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('event_key', sa.String(length=64), nullable=False),
+    sa.Column('result', sa.JSON(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('event_key')
+    )
+    op.create_index('ix_processed_gate_events_created_at', 'processed_gate_events', ['created_at'])
+
+
+def downgrade():
+    op.drop_index('ix_processed_gate_events_created_at', table_name='processed_gate_events')
+    op.drop_table('processed_gate_events')
@@ -0,0 +1,46 @@
+"""Add daily per-lot revenue rollup table
+
+Revision ID: add_revenue_daily_rollup
+Revises: add_hot_path_indexes
+Create Date: 2026-10-18 11:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_revenue_daily_rollup'
+down_revision = 'add_hot_path_indexes'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('revenue_daily',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('lot_id', sa.Integer(), nullable=False),
+    sa.Column('total_amount', sa.Numeric(precision=12, scale=2), nullable=False),
+    sa.Column('transaction_count', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['lot_id'], ['parking_lots.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('day', 'lot_id', name='_revenue_day_lot_uc')
+    )
+    
+    # Backfill from existing paid bills
+    op.execute("""
+        INSERT INTO revenue_daily (day, lot_id, total_amount, transaction_count, created_at, updated_at)
+        SELECT date(b.payment_time), s.lot_id, sum(b.amount), count(b.id), now(), now()
+        FROM billing b
+        JOIN occupancies o ON o.id = b.occupancy_id
+        JOIN parking_spaces s ON s.id = o.space_id
+        WHERE b.payment_status = 'PAID' AND b.payment_time IS NOT NULL
+        GROUP BY date(b.payment_time), s.lot_id
+    """)
+
+
+def downgrade():
+    op.drop_table('revenue_daily')
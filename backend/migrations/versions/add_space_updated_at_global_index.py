@@ -0,0 +1,30 @@
+"""Index parking spaces by updated_at for the listing validators
+
+Revision ID: add_space_updated_at_global_index
+Revises: add_plate_normalized
+Create Date: 2026-10-18 17:00:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_space_updated_at_global_index'
+down_revision = 'add_plate_normalized'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # max(updated_at) over every space from one end of the index
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_parking_spaces_updated_at', 'parking_spaces', ['updated_at'],
+            postgresql_concurrently=True
+        )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_parking_spaces_updated_at', table_name='parking_spaces',
+                      postgresql_concurrently=True)
@@ -0,0 +1,30 @@
+"""Index parking spaces by lot and updated_at for conditional GET validators
+
+Revision ID: add_space_updated_at_index
+Revises: add_lot_tariffs
+Create Date: 2026-10-18 13:00:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_space_updated_at_index'
+down_revision = 'add_lot_tariffs'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # count(*) and max(updated_at) of one lot's spaces answered from the index alone
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_parking_spaces_lot_id_updated_at', 'parking_spaces', ['lot_id', 'updated_at'],
+            postgresql_concurrently=True
+        )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_parking_spaces_lot_id_updated_at', table_name='parking_spaces',
+                      postgresql_concurrently=True)
@@ -0,0 +1,14 @@
+import os
+import sys
+from dotenv import load_dotenv
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '.')))
+
+# Load environment variables from .env file
+load_dotenv()
+
+from app import create_app
+
+# Production entry point, served by gunicorn: gunicorn -c gunicorn.conf.py wsgi:app
+app = create_app(os.getenv('FLASK_CONFIG') or 'production')